@@ -0,0 +1,5 @@
+import sys
+
+from conda_forge_metadata.cli import main
+
+sys.exit(main())
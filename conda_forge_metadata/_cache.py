@@ -0,0 +1,412 @@
+"""Thread-safe memoization with time-based expiry.
+
+The remote data sources used in this package (feedstock-outputs, bot data,
+anaconda.org labels) change slowly, but long-running services still need to
+see updates. ``ttl_cache`` memoizes a function like ``functools.lru_cache``,
+but entries expire after ``ttl`` seconds. For another ``stale_ttl`` seconds an
+expired entry is still returned while a background thread refreshes it, so
+callers never stall on the refetch. Concurrent misses for the same key are
+coalesced into a single call of the wrapped function.
+
+Memoized functions register themselves by name, so that
+``conda_forge_metadata.caches`` can report on, bound and clear all of them.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import _make_key, partial, update_wrapper
+from logging import getLogger
+from types import FunctionType, ModuleType
+from typing import Any, Generic, NamedTuple, TypeVar
+
+from conda_forge_metadata import instrumentation
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# indirection so tests can control the clock
+_clock = time.monotonic
+
+# the memoized functions (TTLCaches or functools.lru_cache wrappers) by name
+_registry: weakref.WeakValueDictionary[str, Any] = weakref.WeakValueDictionary()
+
+_SIZE_RE = re.compile(r"\s*(\d+)\s*([kmg]?)i?b?\s*", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_size(size: str) -> int:
+    """Parse a number of bytes like ``"1048576"``, ``"512M"`` or ``"2GiB"``."""
+    m = _SIZE_RE.fullmatch(size)
+    if m is None:
+        raise ValueError(f"Invalid size {size!r}")
+    return int(m.group(1)) * _SIZE_UNITS[m.group(2).lower()]
+
+
+def _budget_from_env() -> int | None:
+    value = os.environ.get("CONDA_FORGE_METADATA_CACHE_MEMORY")
+    return parse_size(value) if value else None
+
+
+# the memory budget of all TTLCaches in bytes, or None; see caches.set_memory_budget
+_budget: int | None = _budget_from_env()
+_budget_lock = threading.Lock()
+
+
+def register(func: Any) -> Any:
+    """Register a memoized function under ``{module}.{qualname}``.
+
+    ``func`` is a ``TTLCache`` (registered on creation) or a function wrapped
+    with ``functools.lru_cache``. It is returned, so this works as a decorator.
+    """
+    _registry[f"{func.__module__}.{func.__qualname__}"] = func
+    return func
+
+
+def sizeof(obj: Any) -> int:
+    """Approximate the memory used by ``obj`` and the objects it references.
+
+    Containers, instance dictionaries and slots are followed, functions,
+    classes and modules are not. Objects referenced several times are counted
+    once.
+    """
+    seen: set[int] = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, (str, bytes, int, float, type, FunctionType, ModuleType)):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            if hasattr(o, "__dict__"):
+                stack.append(vars(o))
+            slots = getattr(type(o), "__slots__", ())
+            for slot in (slots,) if isinstance(slots, str) else slots:
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return size
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    stale_hits: int
+    refreshes: int
+    refresh_errors: int
+    maxsize: int | None
+    currsize: int
+
+
+class _Entry:
+    __slots__ = ("value", "created", "used", "size")
+
+    def __init__(self, value: Any, created: float, size: int | None) -> None:
+        self.value = value
+        self.created = created
+        self.used = created
+        # approximate bytes, computed when needed
+        self.size = size
+
+
+class _Call:
+    """An in-flight call that other threads can wait on."""
+
+    __slots__ = ("event", "value", "exc")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = None
+        self.exc: BaseException | None = None
+
+    def result(self) -> Any:
+        self.event.wait()
+        if self.exc is not None:
+            raise self.exc
+        return self.value
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    While a call for a key is running, other callers for the same key wait for
+    it and receive its result (or its exception) instead of starting their own.
+    Nothing is remembered once the call completes; combine with a cache for that.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+    def _join(self, key: Hashable) -> tuple[_Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _execute(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> None:
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.exc = exc
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run ``fn`` unless a call for ``key`` is running, then wait for its result."""
+        call, leader = self._join(key)
+        if leader:
+            self._execute(key, call, fn)
+        return call.result()
+
+    def do_async(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        on_error: Callable[[BaseException], None] | None = None,
+    ) -> bool:
+        """Run ``fn`` in a background thread unless a call for ``key`` is running.
+
+        Returns whether a new call was started. ``on_error`` is called with the
+        exception if the background call fails.
+        """
+        call, leader = self._join(key)
+        if not leader:
+            return False
+
+        def target() -> None:
+            self._execute(key, call, fn)
+            if call.exc is not None and on_error is not None:
+                on_error(call.exc)
+
+        threading.Thread(target=target, daemon=True).start()
+        return True
+
+
+class TTLCache(Generic[T]):
+    """Memoize ``func`` with expiry, stale-while-revalidate and single-flight misses.
+
+    Parameters
+    ----------
+    func : callable
+        The function to memoize. Arguments must be hashable.
+    ttl : float or None
+        Seconds an entry is considered fresh. ``None`` never expires entries.
+    stale_ttl : float
+        Seconds after ``ttl`` during which the expired value is still returned
+        while it is refreshed in a background thread. Past ``ttl + stale_ttl``
+        the next call refetches synchronously.
+    maxsize : int or None
+        Maximum number of entries; least recently used entries are evicted
+        first. ``None`` means unbounded.
+    warm : bool
+        Whether ``caches.warm_up`` preloads the cache by calling ``func``
+        without arguments.
+
+    The ``ttl``, ``stale_ttl`` and ``maxsize`` attributes can be changed at
+    runtime. Entries are also evicted to keep all caches within the memory
+    budget set with ``caches.set_memory_budget``.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., T],
+        ttl: float | None,
+        stale_ttl: float = 0.0,
+        maxsize: int | None = 128,
+        warm: bool = False,
+    ) -> None:
+        update_wrapper(self, func)
+        self._func = func
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.warm = warm
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._flight = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+        self._refreshes = 0
+        self._refresh_errors = 0
+        register(self)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> T:
+        key = _make_key(args, kwargs, False)
+        now = _clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                age = now - entry.created
+                if self.ttl is None or age < self.ttl:
+                    self._hits += 1
+                    entry.used = now
+                    self._data.move_to_end(key)
+                    result = "hit"
+                elif age < self.ttl + self.stale_ttl:
+                    self._stale_hits += 1
+                    entry.used = now
+                    self._data.move_to_end(key)
+                    if self._flight.do_async(
+                        key,
+                        partial(self._load, key, args, kwargs),
+                        on_error=self._refresh_failed,
+                    ):
+                        self._refreshes += 1
+                    result = "stale"
+                else:
+                    del self._data[key]
+                    entry = None
+            if entry is None:
+                self._misses += 1
+                result = "miss"
+        # outside of the lock, as observers may call back into the cache
+        if instrumentation._observers:
+            instrumentation.emit("cache", self.__qualname__, result=result)
+        if entry is not None:
+            return entry.value
+        return self._flight.do(key, partial(self._load, key, args, kwargs))
+
+    def _load(self, key: Hashable, args: tuple[Any, ...], kwargs: dict[str, Any]) -> T:
+        value = self._func(*args, **kwargs)
+        budget = _budget
+        size = None if budget is None else sizeof(value)
+        with self._lock:
+            self._store(key, value, size)
+        if budget is not None:
+            _enforce_budget()
+        return value
+
+    def _refresh_failed(self, exc: BaseException) -> None:
+        with self._lock:
+            self._refresh_errors += 1
+        logger.warning(
+            "Background refresh of %s failed; serving stale data",
+            self._func.__qualname__,
+            exc_info=exc,
+        )
+
+    def _store(self, key: Hashable, value: Any, size: int | None) -> None:
+        # must be called with the lock held
+        now = _clock()
+        self._data[key] = _Entry(value, now, size)
+        self._data.move_to_end(key)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            if self.ttl is not None:
+                limit = self.ttl + self.stale_ttl
+                for k in [k for k, e in self._data.items() if now - e.created >= limit]:
+                    del self._data[k]
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _entries(self) -> list[tuple[Hashable, _Entry]]:
+        with self._lock:
+            return list(self._data.items())
+
+    def _evict(self, key: Hashable, entry: _Entry) -> bool:
+        # evict the entry unless it was replaced in the meantime
+        with self._lock:
+            if self._data.get(key) is not entry:
+                return False
+            del self._data[key]
+            return True
+
+    def cache_bytes(self) -> int:
+        """Approximate the memory used by the cached values, in bytes."""
+        total = 0
+        for _, entry in self._entries():
+            if entry.size is None:
+                entry.size = sizeof(entry.value)
+            total += entry.size
+        return total
+
+    def cache_info(self) -> CacheInfo:
+        """Report cache statistics."""
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._stale_hits,
+                self._refreshes,
+                self._refresh_errors,
+                self.maxsize,
+                len(self._data),
+            )
+
+    def cache_clear(self) -> None:
+        """Clear the cache and its statistics."""
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._stale_hits = 0
+            self._refreshes = self._refresh_errors = 0
+
+
+def ttl_cache(
+    ttl: float | None,
+    stale_ttl: float = 0.0,
+    maxsize: int | None = 128,
+    warm: bool = False,
+) -> Callable[[Callable[..., T]], TTLCache[T]]:
+    """Decorator version of ``TTLCache``. See its docstring for the parameters."""
+
+    def decorator(func: Callable[..., T]) -> TTLCache[T]:
+        return TTLCache(func, ttl=ttl, stale_ttl=stale_ttl, maxsize=maxsize, warm=warm)
+
+    return decorator
+
+
+def ttl_caches() -> list[TTLCache[Any]]:
+    """The registered ``TTLCache`` instances."""
+    return [c for c in list(_registry.values()) if isinstance(c, TTLCache)]
+
+
+def _enforce_budget() -> None:
+    """Evict the least recently used entries of all caches beyond the budget."""
+    with _budget_lock:
+        budget = _budget
+        if budget is None:
+            return
+        entries = []
+        total = 0
+        for cache in ttl_caches():
+            for key, entry in cache._entries():
+                if entry.size is None:
+                    entry.size = sizeof(entry.value)
+                total += entry.size
+                entries.append((entry.used, cache, key, entry))
+        if total <= budget:
+            return
+        entries.sort(key=lambda e: e[0])
+        for _, cache, key, entry in entries:
+            if total <= budget:
+                break
+            if cache._evict(key, entry):
+                total -= entry.size or 0
+                logger.debug(
+                    "Evicted an entry of %s to stay in budget", cache.__qualname__
+                )
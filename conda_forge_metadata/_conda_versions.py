@@ -0,0 +1,178 @@
+"""Minimal conda version ordering and version spec matching.
+
+This follows the rules of ``conda.models.version`` closely enough for querying
+repodata, without depending on conda:
+
+- versions are compared component by component after splitting on ``.``
+  (and ``_``), numbers compare numerically, ``dev`` sorts before any other
+  string, other strings sort before numbers and ``post`` sorts after them;
+  missing components count as zero, so ``1.0 == 1.0.0``;
+- an epoch (``1!2.0``) and a local version (``2.0+local``) are supported;
+- specs support ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``~=``, ``=``
+  and trailing ``.*`` prefix matches, ``*``, ``,`` (and) and ``|`` (or).
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from functools import lru_cache, total_ordering
+
+from conda_forge_metadata._cache import register
+
+_SPLIT_RE = re.compile(r"\d+|[^\d]+")
+_OP_RE = re.compile(r"^(==|!=|<=|>=|~=|<|>|=)?\s*(.+)$")
+
+# sort ranks of the kinds of version component elements
+_DEV, _STR, _NUM, _POST = 0, 1, 2, 3
+
+
+def _parse_component(part: str) -> tuple[tuple[int, int | str], ...]:
+    items: list[tuple[int, int | str]] = []
+    for i, item in enumerate(_SPLIT_RE.findall(part)):
+        if item.isdigit():
+            items.append((_NUM, int(item)))
+            continue
+        if i == 0:
+            # components starting with a string sort as if prefixed with 0
+            items.append((_NUM, 0))
+        if item == "dev":
+            items.append((_DEV, ""))
+        elif item == "post":
+            items.append((_POST, 0))
+        else:
+            items.append((_STR, item))
+    return tuple(items) or ((_NUM, 0),)
+
+
+def _parse_parts(version: str) -> tuple[tuple[tuple[int, int | str], ...], ...]:
+    return tuple(_parse_component(p) for p in version.replace("_", ".").split("."))
+
+
+def _cmp_parts(a: tuple, b: tuple) -> int:
+    """Compare two parsed version parts, padding missing components with zero."""
+    zero = ((_NUM, 0),)
+    for i in range(max(len(a), len(b))):
+        ca = a[i] if i < len(a) else zero
+        cb = b[i] if i < len(b) else zero
+        for j in range(max(len(ca), len(cb))):
+            ea = ca[j] if j < len(ca) else (_NUM, 0)
+            eb = cb[j] if j < len(cb) else (_NUM, 0)
+            if ea != eb:
+                return -1 if ea < eb else 1
+    return 0
+
+
+@total_ordering
+class VersionOrder:
+    """A comparable conda version."""
+
+    __slots__ = ("version", "_epoch", "_main", "_local")
+
+    def __init__(self, version: str) -> None:
+        self.version = version
+        v = version.strip().lower()
+        epoch, _, v = v.rpartition("!")
+        self._epoch = int(epoch) if epoch else 0
+        v, _, local = v.partition("+")
+        self._main = _parse_parts(v)
+        self._local = _parse_parts(local) if local else ()
+
+    def _cmp(self, other: VersionOrder) -> int:
+        if self._epoch != other._epoch:
+            return -1 if self._epoch < other._epoch else 1
+        return _cmp_parts(self._main, other._main) or _cmp_parts(
+            self._local, other._local
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, VersionOrder):
+            return NotImplemented
+        return self._cmp(other) == 0
+
+    def __lt__(self, other: VersionOrder) -> bool:
+        return self._cmp(other) < 0
+
+    def __repr__(self) -> str:
+        return f"VersionOrder({self.version!r})"
+
+    def startswith(self, prefix: VersionOrder) -> bool:
+        """Whether the components of ``prefix`` are a prefix of this version's."""
+        if self._epoch != prefix._epoch or len(prefix._main) > len(self._main):
+            return False
+        head = self._main[: len(prefix._main)]
+        if head[:-1] != prefix._main[:-1]:
+            return False
+        # the last component may be partial, e.g. 1.1 matches 1.10 only for
+        # string prefixes, so compare elements instead
+        last, plast = head[-1], prefix._main[-1]
+        return last[: len(plast)] == plast
+
+
+@register
+@lru_cache(maxsize=4096)
+def version_order(version: str) -> VersionOrder:
+    """Parse a version, caching the result."""
+    return VersionOrder(version)
+
+
+def _single_matcher(spec: str) -> Callable[[VersionOrder], bool]:
+    spec = spec.strip()
+    if spec in ("", "*"):
+        return lambda v: True
+    m = _OP_RE.match(spec)
+    if m is None:
+        raise ValueError(f"Invalid version spec {spec!r}")
+    op, value = m.groups()
+    value = value.strip()
+    if value.endswith(".*"):
+        if op in (None, "=", "=="):
+            prefix = version_order(value[:-2])
+            return lambda v: v.startswith(prefix)
+        if op == "!=":
+            prefix = version_order(value[:-2])
+            return lambda v: not v.startswith(prefix)
+        # e.g. >=1.2.* is the same as >=1.2
+        value = value[:-2]
+    elif value.endswith("*"):
+        if op not in (None, "=", "=="):
+            raise ValueError(f"Invalid version spec {spec!r}")
+        prefix_str = value[:-1]
+        return lambda v: v.version.startswith(prefix_str)
+    target = version_order(value)
+    if op == "=":
+        return lambda v: v.startswith(target)
+    if op is None or op == "==":
+        return lambda v: v == target
+    if op == "!=":
+        return lambda v: v != target
+    if op == "<":
+        return lambda v: v < target
+    if op == "<=":
+        return lambda v: v <= target
+    if op == ">":
+        return lambda v: v > target
+    if op == ">=":
+        return lambda v: v >= target
+    # ~=, compatible release
+    parts = value.split(".")
+    if len(parts) < 2:
+        raise ValueError(f"Invalid version spec {spec!r}")
+    prefix = version_order(".".join(parts[:-1]))
+    return lambda v: v >= target and v.startswith(prefix)
+
+
+@register
+@lru_cache(maxsize=1024)
+def version_spec_matcher(spec: str) -> Callable[[VersionOrder], bool]:
+    """Compile a conda version spec like ``>=1.2,<2|3.*`` into a predicate."""
+    alternatives = []
+    for alternative in spec.split("|"):
+        matchers = [_single_matcher(s) for s in alternative.split(",")]
+        alternatives.append(matchers)
+    return lambda v: any(all(m(v) for m in ms) for ms in alternatives)
+
+
+def version_matches(version: str, spec: str) -> bool:
+    """Whether ``version`` satisfies the conda version ``spec``."""
+    return version_spec_matcher(spec)(version_order(version))
@@ -0,0 +1,190 @@
+"""Throttled, atomic file downloads.
+
+Downloads are streamed to a temporary file next to the destination and moved
+into place with ``os.replace`` once complete, so readers never see a partial
+file and an interrupted download leaves nothing behind. Bandwidth can be
+capped with a shared ``TokenBucket`` and concurrency per host with a
+``HostLimiter``; ``Progress`` aggregates throughput across threads.
+"""
+
+from __future__ import annotations
+
+import bz2
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from conda_forge_metadata import instrumentation
+
+logger = getLogger(__name__)
+
+_CHUNK_SIZE = 1 << 16
+
+
+class TokenBucket:
+    """A thread-safe token bucket limiting throughput to ``rate`` units per second.
+
+    Up to ``burst`` units (one second worth by default) can be consumed at
+    once after an idle period. Requests larger than the bucket are allowed
+    and put it in debt, so chunks of any size are throttled correctly.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float) -> None:
+        """Take ``amount`` tokens, sleeping until the bucket allows it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """Limit the number of concurrent requests to each host."""
+
+    def __init__(self, per_host: int) -> None:
+        if per_host < 1:
+            raise ValueError("per_host must be at least 1")
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.Semaphore] = {}
+
+    @contextmanager
+    def __call__(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.Semaphore(self.per_host)
+        with semaphore:
+            yield
+
+
+class Progress:
+    """Thread-safe counters of completed files and transferred bytes."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.nbytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_bytes(self, n: int) -> None:
+        with self._lock:
+            self.nbytes += n
+
+    def finish(self, name: str, ok: bool = True) -> None:
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+            n = self.done + self.failed
+        logger.info(
+            "[%d/%d] %s %s (%.1f MB at %.1f MB/s)",
+            n,
+            self.total,
+            "fetched" if ok else "FAILED",
+            name,
+            self.nbytes / 1e6,
+            self.throughput / 1e6,
+        )
+
+    @property
+    def throughput(self) -> float:
+        """The average number of bytes transferred per second."""
+        elapsed = time.monotonic() - self.started
+        return self.nbytes / elapsed if elapsed > 0 else 0.0
+
+
+def download(
+    url: str,
+    dest: str | Path,
+    decompress_bz2: bool = False,
+    bucket: TokenBucket | None = None,
+    progress: Progress | None = None,
+    timeout: float = 60,
+) -> int:
+    """Download ``url`` to ``dest`` atomically.
+
+    Parameters
+    ----------
+    url : str
+        The URL to download.
+    dest : str or Path
+        The destination file. It is only replaced once the download completed.
+    decompress_bz2 : bool, optional
+        Whether to decompress the bz2 stream on the fly.
+    bucket : TokenBucket, optional
+        A bucket limiting the (compressed) bytes read per second.
+    progress : Progress, optional
+        Counters to add the transferred bytes to.
+    timeout : float, optional
+        The socket timeout in seconds.
+
+    Returns
+    -------
+    nbytes : int
+        The number of bytes transferred.
+    """
+    from urllib.request import urlopen
+
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.part")
+    decompressor = bz2.BZ2Decompressor() if decompress_bz2 else None
+    nbytes = 0
+    decompress_time = 0.0
+    try:
+        with (
+            instrumentation.span("fetch", "download", url=url) as span,
+            urlopen(url, timeout=timeout) as response,
+            open(tmp, "wb") as f,
+        ):
+            while chunk := response.read(_CHUNK_SIZE):
+                if bucket is not None:
+                    bucket.consume(len(chunk))
+                if progress is not None:
+                    progress.add_bytes(len(chunk))
+                nbytes += len(chunk)
+                if decompressor is None:
+                    f.write(chunk)
+                elif span:
+                    start = time.perf_counter()
+                    data = decompressor.decompress(chunk)
+                    decompress_time += time.perf_counter() - start
+                    f.write(data)
+                else:
+                    f.write(decompressor.decompress(chunk))
+            span.set(bytes=nbytes)
+        if decompressor is not None and not decompressor.eof:
+            raise EOFError(f"Truncated bz2 stream from {url}")
+        if decompressor is not None:
+            instrumentation.emit(
+                "decompress", "bz2", duration=decompress_time, url=url, bytes=nbytes
+            )
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return nbytes
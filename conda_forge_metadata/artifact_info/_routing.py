@@ -0,0 +1,116 @@
+"""Latency- and error-aware ordering of the artifact metadata backends."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+# indirection so tests can control the clock
+_clock = time.monotonic
+
+# the preferred backends before anything was measured: .conda artifacts are
+# cheap to range-stream, .tar.bz2 artifacts can only come from the OCI mirror
+_PRIORS = {".conda": ("streamed", "oci"), ".tar.bz2": ("oci",)}
+
+
+class _Stats:
+    __slots__ = ("latency", "error_rate", "last_used")
+
+    def __init__(self) -> None:
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.last_used = float("-inf")
+
+
+_NEVER_USED = _Stats()
+
+
+class BackendStats:
+    """Exponentially weighted latency and error rate of each backend.
+
+    Parameters
+    ----------
+    alpha : float, optional
+        The weight of the newest measurement. The default is 0.2.
+    error_penalty : float, optional
+        How much an error rate of 100% multiplies the expected latency.
+        The default is 10.
+    explore_after : float, optional
+        A backend that was not used for this many seconds, or never, is tried
+        first once, so a backend that is faster than the one that keeps
+        succeeding, or that recovered, gets a chance to be preferred. The
+        default is 60.
+    """
+
+    def __init__(
+        self, alpha: float = 0.2, error_penalty: float = 10.0, explore_after: float = 60
+    ) -> None:
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.explore_after = explore_after
+        self._lock = threading.Lock()
+        self._stats: dict[str, _Stats] = {}
+
+    def record(self, backend: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(backend, _Stats())
+            if stats.latency is None:
+                stats.latency = seconds
+            else:
+                stats.latency += self.alpha * (seconds - stats.latency)
+            stats.error_rate += self.alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+            stats.last_used = _clock()
+
+    def _cost(self, backend: str) -> float | None:
+        stats = self._stats.get(backend)
+        if stats is None or stats.latency is None:
+            return None
+        return stats.latency * (1 + self.error_penalty * stats.error_rate)
+
+    def order(self, artifact: str) -> list[str]:
+        """The backends to try for ``artifact``, cheapest first."""
+        candidates = next(
+            (backends for ext, backends in _PRIORS.items() if artifact.endswith(ext)),
+            None,
+        )
+        if candidates is None:
+            raise ValueError(f"Artifact '{artifact}' is not a conda package")
+        with self._lock:
+            now = _clock()
+            costs = {b: self._cost(b) for b in candidates}
+            if all(cost is None for cost in costs.values()):
+                # nothing measured yet, so trust the prior
+                return list(candidates)
+            # measured backends cheapest first, then the others in prior order
+            ordered = sorted(
+                candidates, key=lambda b: (costs[b] is None, costs[b] or 0.0)
+            )
+            # backends that were never tried, or not for a while, are due for
+            # exploration: the first backend usually succeeds, so the others
+            # would otherwise never be measured
+            due = [
+                b
+                for b in ordered[1:]
+                if now - self._stats.get(b, _NEVER_USED).last_used > self.explore_after
+            ]
+            if due:
+                # claim the exploration so concurrent callers do not all take it
+                self._stats.setdefault(due[0], _Stats()).last_used = now
+                ordered.remove(due[0])
+                ordered.insert(0, due[0])
+            return ordered
+
+    def snapshot(self) -> dict[str, dict[str, float | None]]:
+        """The current latency (in seconds) and error rate of each backend."""
+        with self._lock:
+            return {
+                backend: {"latency": s.latency, "error_rate": s.error_rate}
+                for backend, s in self._stats.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+STATS = BackendStats()
@@ -0,0 +1,244 @@
+"""An on-disk index of which artifacts ship which files."""
+
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+from conda_forge_metadata.artifact_info.info_json import get_artifact_info_as_json
+from conda_forge_metadata.repodata import list_artifacts
+
+logger = getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    rpath TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paths_rpath ON paths (rpath);
+CREATE TABLE IF NOT EXISTS files (
+    path_id INTEGER NOT NULL,
+    artifact_id INTEGER NOT NULL,
+    PRIMARY KEY (path_id, artifact_id)
+) WITHOUT ROWID;
+"""
+
+
+def _prefix_bounds(prefix: str) -> tuple[str, str | None]:
+    """Turn a prefix into a half-open range usable with the B-tree indexes."""
+    if not prefix:
+        return "", None
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class FileIndex:
+    """An inverted index from installed paths to the artifacts that ship them.
+
+    The index is a SQLite database. Every distinct path is stored once and
+    files are stored as pairs of integer ids, so the index stays compact even
+    with millions of artifact/path pairs. Exact, prefix and suffix lookups
+    are served by B-tree indexes.
+
+    Artifacts are identified by ``"{channel}/{subdir}/{artifact}"`` strings,
+    e.g. ``"conda-forge/linux-64/openssl-3.3.1-h4ab18f5_0.conda"``.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path to the database file. It is created if it does not exist.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> FileIndex:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+
+    def __contains__(self, key: object) -> bool:
+        return (
+            self._conn.execute(
+                "SELECT 1 FROM artifacts WHERE key = ?", (key,)
+            ).fetchone()
+            is not None
+        )
+
+    def add_artifact(self, key: str, files: Iterable[str], commit: bool = True) -> None:
+        """Add (or replace) the files shipped by an artifact.
+
+        Parameters
+        ----------
+        key : str
+            The artifact, as ``"{channel}/{subdir}/{artifact}"``.
+        files : iterable of str
+            The paths of the files in the artifact.
+        commit : bool, optional
+            Whether to commit the transaction right away. Pass False when
+            adding many artifacts and call ``commit`` at the end.
+        """
+        cur = self._conn.cursor()
+        cur.execute("INSERT OR IGNORE INTO artifacts (key) VALUES (?)", (key,))
+        (artifact_id,) = cur.execute(
+            "SELECT id FROM artifacts WHERE key = ?", (key,)
+        ).fetchone()
+        cur.execute("DELETE FROM files WHERE artifact_id = ?", (artifact_id,))
+        files = list(dict.fromkeys(files))
+        cur.executemany(
+            "INSERT OR IGNORE INTO paths (path, rpath) VALUES (?, ?)",
+            ((f, f[::-1]) for f in files),
+        )
+        cur.executemany(
+            "INSERT OR IGNORE INTO files (path_id, artifact_id) "
+            "SELECT id, ? FROM paths WHERE path = ?",
+            ((artifact_id, f) for f in files),
+        )
+        if commit:
+            self._conn.commit()
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def artifacts_for_path(self, path: str) -> list[str]:
+        """Get the sorted artifacts that ship ``path``."""
+        rows = self._conn.execute(
+            "SELECT a.key FROM paths p "
+            "JOIN files f ON f.path_id = p.id "
+            "JOIN artifacts a ON a.id = f.artifact_id "
+            "WHERE p.path = ? ORDER BY a.key",
+            (path,),
+        )
+        return [row[0] for row in rows]
+
+    def _search(
+        self, column: str, value: str, limit: int | None
+    ) -> dict[str, list[str]]:
+        low, high = _prefix_bounds(value)
+        where = f"p.{column} >= ?" + (f" AND p.{column} < ?" if high else "")
+        params: list[Any] = [low] + ([high] if high else [])
+        subquery = f"SELECT id, path FROM paths p WHERE {where} ORDER BY p.{column}"
+        if limit is not None:
+            subquery += " LIMIT ?"
+            params.append(limit)
+        rows = self._conn.execute(
+            f"SELECT p.path, a.key FROM ({subquery}) p "
+            "JOIN files f ON f.path_id = p.id "
+            "JOIN artifacts a ON a.id = f.artifact_id "
+            "ORDER BY p.path, a.key",
+            params,
+        )
+        result: dict[str, list[str]] = {}
+        for path, key in rows:
+            result.setdefault(path, []).append(key)
+        return result
+
+    def search_prefix(
+        self, prefix: str, limit: int | None = None
+    ) -> dict[str, list[str]]:
+        """Find paths starting with ``prefix``.
+
+        Returns a dict of path to the sorted artifacts that ship it, limited
+        to ``limit`` paths if given.
+        """
+        return self._search("path", prefix, limit)
+
+    def search_suffix(
+        self, suffix: str, limit: int | None = None
+    ) -> dict[str, list[str]]:
+        """Find paths ending with ``suffix`` (e.g. ``"/libssl.so.3"``).
+
+        Returns a dict of path to the sorted artifacts that ship it, limited
+        to ``limit`` paths if given.
+        """
+        return self._search("rpath", suffix[::-1], limit)
+
+    def update_from_repodata(
+        self,
+        repodata_jsons: Iterable[str | Path],
+        channel: str = "conda-forge",
+        backend: str = "oci",
+        max_workers: int = 10,
+        commit_every: int = 100,
+    ) -> int:
+        """Index the artifacts listed in repodata that are not indexed yet.
+
+        Artifacts are fetched concurrently with ``get_artifact_info_as_json``
+        and committed in batches, so an interrupted update resumes where it
+        stopped. Artifacts without metadata are recorded with no files so
+        they are not fetched again.
+
+        Parameters
+        ----------
+        repodata_jsons : iterable of str or Path
+            Repodata files as returned by
+            ``conda_forge_metadata.repodata.fetch_repodata``.
+        channel : str, optional
+            The channel of the artifacts. The default is "conda-forge".
+        backend : str, optional
+            The backend for ``get_artifact_info_as_json``. The default is "oci".
+        max_workers : int, optional
+            The number of concurrent fetches. The default is 10.
+        commit_every : int, optional
+            The number of artifacts per transaction. The default is 100.
+
+        Returns
+        -------
+        n_added : int
+            The number of artifacts added to the index.
+        """
+        todo = []
+        for artifact in list_artifacts(repodata_jsons, include_broken=False):
+            subdir, fn = artifact.split("/", 1)
+            if f"{channel}/{subdir}/{fn}" not in self:
+                todo.append((subdir, fn))
+
+        n_added = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    get_artifact_info_as_json,
+                    channel,
+                    subdir,
+                    fn,
+                    backend=backend,
+                    skip_files_suffixes=(),
+                    packed_files=True,
+                ): (subdir, fn)
+                for subdir, fn in todo
+            }
+            for future in as_completed(futures):
+                subdir, fn = futures.pop(future)
+                try:
+                    data = future.result()
+                except Exception as exc:
+                    logger.warning(
+                        "Could not fetch %s/%s; skipping", subdir, fn, exc_info=exc
+                    )
+                    continue
+                files = data["files"] if data is not None else []
+                self.add_artifact(f"{channel}/{subdir}/{fn}", files, commit=False)
+                n_added += 1
+                if n_added % commit_every == 0:
+                    self.commit()
+                    logger.info("Indexed %d/%d artifacts", n_added, len(todo))
+        self.commit()
+        return n_added
@@ -4,19 +4,25 @@ import json
 import tarfile
 import warnings
 from collections.abc import Generator
+from logging import getLogger
 from pathlib import Path
-from typing import Any
-
-import requests
-from ruamel import yaml
+from typing import TYPE_CHECKING, Any
 
+from conda_forge_metadata import instrumentation
+from conda_forge_metadata.artifact_info import _routing
+from conda_forge_metadata.artifact_info.paths_json import PackedPaths, iter_paths_json
 from conda_forge_metadata.deprecations import deprecated
-from conda_forge_metadata.libcfgraph import get_libcfgraph_artifact_data
 from conda_forge_metadata.types import ArtifactData
 
-VALID_BACKENDS = ("oci", "streamed")
+if TYPE_CHECKING:
+    import requests
+
+logger = getLogger(__name__)
 
+VALID_BACKENDS = ("oci", "streamed", "auto")
 
+
+@instrumentation.instrumented
 def get_artifact_info_as_json(
     channel: str,
     subdir: str,
@@ -24,6 +30,10 @@ def get_artifact_info_as_json(
     backend: str = "oci",
     skip_files_suffixes: tuple[str, ...] = (".pyc", ".txt"),
     session: requests.Session | None = None,
+    packed_files: bool = False,
+    packed_files_metadata: bool = False,
+    check_oci_tags: bool = False,
+    fallback_to_streamed: bool = False,
 ) -> ArtifactData | None:
     """Get a blob of artifact data from the conda info directory.
 
@@ -38,7 +48,11 @@ def get_artifact_info_as_json(
         "21cmfast-3.0.2-py36h13dd421_0.tar.bz2").
     backend : str, optional
         The backend information source to use for the metadata. Valid
-        backends are "oci" and "streamed". The default is "oci".
+        backends are "oci", "streamed" and "auto". The default is "oci".
+        "auto" tries the backends that support the artifact, cheapest first,
+        and falls back to the next one on errors or missing data. The cost of
+        each backend is estimated from the recent latency and error rate of
+        the calls made with "auto".
     skip_files_suffixes : Tuple[str, ...], optional
         A tuple of suffixes to skip when reporting the files in the
         artifact. The default is (".pyc", ".txt").
@@ -47,6 +61,20 @@ def get_artifact_info_as_json(
         session object is used.
         Note: Currently, this is only used for the "streamed" backend. If the
         backend is "oci", this parameter is ignored.
+    packed_files : bool, optional
+        If True, "files" is returned as a compact ``PackedPaths`` sequence
+        instead of a list of strings. The default is False.
+    packed_files_metadata : bool, optional
+        If True, "files" is returned as a ``PackedPaths`` sequence that also
+        keeps the sha256 and size of each file from info/paths.json.
+        The default is False.
+    check_oci_tags : bool, optional
+        For the "oci" backend, check the cached list of mirrored tags of the
+        package first and skip artifacts that are not mirrored, instead of
+        failing a request for each of them. The default is False.
+    fallback_to_streamed : bool, optional
+        For the "oci" backend, get .conda artifacts that are not mirrored with
+        the "streamed" backend instead of returning None. The default is False.
 
     Returns
     -------
@@ -72,9 +100,22 @@ def get_artifact_info_as_json(
             "files": a list of files in the recipe from info/paths.json
                 (or fallback to info/files if info/paths.json doesn't exist) with
                 elements ending in .pyc or .txt filtered out.
+                A ``PackedPaths`` sequence if ``packed_files`` or
+                ``packed_files_metadata`` is True.
 
     """
-    if backend == "libcfgraph":
+    if backend == "auto":
+        return _get_artifact_info_auto(
+            channel,
+            subdir,
+            artifact,
+            skip_files_suffixes=skip_files_suffixes,
+            session=session,
+            packed_files=packed_files,
+            packed_files_metadata=packed_files_metadata,
+            check_oci_tags=check_oci_tags,
+        )
+    elif backend == "libcfgraph":
         deprecated.topic(
             deprecate_in="0.7.0",
             remove_in="2026.7.1",
@@ -83,16 +124,34 @@ def get_artifact_info_as_json(
                 "will be removed in a future release. Use 'oci' or 'streamed' instead."
             ),
         )
+        from conda_forge_metadata.libcfgraph import get_libcfgraph_artifact_data
+
         return get_libcfgraph_artifact_data(channel, subdir, artifact)
     elif backend == "oci":
         from conda_forge_metadata.oci import get_oci_artifact_data
 
-        tar = get_oci_artifact_data(channel, subdir, artifact)
-        if tar is not None:
-            return info_json_from_tar_generator(
-                tar,
+        tar = get_oci_artifact_data(
+            channel, subdir, artifact, check_tags=check_oci_tags
+        )
+        data = info_json_from_tar_generator(
+            tar,
+            skip_files_suffixes=skip_files_suffixes,
+            packed_files=packed_files,
+            packed_files_metadata=packed_files_metadata,
+        )
+        if data is None and fallback_to_streamed and artifact.endswith(".conda"):
+            logger.debug("%s/%s is not mirrored, streaming it", subdir, artifact)
+            return get_artifact_info_as_json(
+                channel,
+                subdir,
+                artifact,
+                backend="streamed",
                 skip_files_suffixes=skip_files_suffixes,
+                session=session,
+                packed_files=packed_files,
+                packed_files_metadata=packed_files_metadata,
             )
+        return data
     elif backend == "streamed":
         if artifact.endswith(".tar.bz2"):
             raise ValueError("streamed backend does not support .tar.bz2 artifacts")
@@ -101,6 +160,8 @@ def get_artifact_info_as_json(
         return info_json_from_tar_generator(
             get_streamed_artifact_data(channel, subdir, artifact, session=session),
             skip_files_suffixes=skip_files_suffixes,
+            packed_files=packed_files,
+            packed_files_metadata=packed_files_metadata,
         )
     else:
         raise ValueError(
@@ -108,11 +169,40 @@ def get_artifact_info_as_json(
         )
 
 
+def _get_artifact_info_auto(
+    channel: str, subdir: str, artifact: str, **kwargs: Any
+) -> ArtifactData | None:
+    error = None
+    for backend in _routing.STATS.order(artifact):
+        start = _routing._clock()
+        try:
+            data = get_artifact_info_as_json(
+                channel, subdir, artifact, backend=backend, **kwargs
+            )
+        except Exception as exc:
+            _routing.STATS.record(backend, _routing._clock() - start, ok=False)
+            logger.debug("%s failed for %s/%s", backend, subdir, artifact, exc_info=exc)
+            error = exc
+            continue
+        _routing.STATS.record(backend, _routing._clock() - start, ok=True)
+        if data is not None:
+            return data
+    if error is not None:
+        raise error
+    return None
+
+
 def info_json_from_tar_generator(
     tar_tuples: Generator[tuple[tarfile.TarFile, tarfile.TarInfo], None, None],
     skip_files_suffixes: tuple[str, ...] = (".pyc", ".txt"),
+    packed_files: bool = False,
+    packed_files_metadata: bool = False,
 ) -> ArtifactData | None:
     # https://github.com/regro/libcflib/blob/062858e90af/libcflib/harvester.py#L14
+    from ruamel import yaml
+
+    packed_files = packed_files or packed_files_metadata
+
     data = {
         "metadata_version": 1,
         "name": "",
@@ -142,26 +232,45 @@ def info_json_from_tar_generator(
         elif path.name == "about.json":
             data["about"] = json.loads(_extract_read(tar, member, default="{}"))
         elif path.name == "conda_build_config.yaml":
-            data["conda_build_config"] = YAML.load(
-                _extract_read(tar, member, default="{}")
+            data["conda_build_config"] = _load_yaml(
+                YAML, _extract_read(tar, member, default="{}"), path.name
             )
         elif path.name == "variant_config.yaml":
-            data["conda_build_config"] = YAML.load(
-                _extract_read(tar, member, default="{}")
+            data["conda_build_config"] = _load_yaml(
+                YAML, _extract_read(tar, member, default="{}"), path.name
             )
         elif path.name == "paths.json":
-            paths = json.loads(_extract_read(tar, member, default="{}"))
-            paths_version = paths.get("paths_version", 1)
+            files: list[str] | PackedPaths
+            text = _extract_read(tar, member, default="{}")
+            with instrumentation.span("parse", "paths_json", bytes=len(text)):
+                if packed_files:
+                    # parse entries one by one, so the list of dicts is never
+                    # held in memory at once
+                    meta: dict[str, Any] = {}
+                    files = PackedPaths(with_metadata=packed_files_metadata)
+                    for entry in iter_paths_json(text, meta):
+                        f = entry.get("_path", "")
+                        if skip_files_suffixes and f.lower().endswith(
+                            skip_files_suffixes
+                        ):
+                            continue
+                        files.append(f, entry.get("sha256"), entry.get("size_in_bytes"))
+                else:
+                    # json.loads is faster when the dicts are not kept
+                    meta = json.loads(text)
+                    files = [p.get("_path", "") for p in meta.get("paths", [])]
+                    if skip_files_suffixes:
+                        files = [
+                            f
+                            for f in files
+                            if not f.lower().endswith(skip_files_suffixes)
+                        ]
+            paths_version = meta.get("paths_version", 1)
             if paths_version != 1:
                 warnings.warn(
                     f"Unrecognized paths_version {paths_version} in paths.json",
                     RuntimeWarning,
                 )
-            files = [p.get("_path", "") for p in paths.get("paths", [])]
-            if skip_files_suffixes:
-                files = [
-                    f for f in files if not f.lower().endswith(skip_files_suffixes)
-                ]
             data["files"] = files
         elif path.name == "files":
             # prefer files from paths.json if available
@@ -172,7 +281,11 @@ def info_json_from_tar_generator(
                 files = [
                     f for f in files if not f.lower().endswith(skip_files_suffixes)
                 ]
-            data["files"] = files
+            data["files"] = (
+                PackedPaths(files, with_metadata=packed_files_metadata)
+                if packed_files
+                else files
+            )
         elif path.name == "meta.yaml.template":
             data["raw_recipe"] = _extract_read(tar, member, default="")
         elif path.name == "meta.yaml":
@@ -180,15 +293,22 @@ def info_json_from_tar_generator(
             if ("{{" in x or "{%" in x) and not data["raw_recipe"]:
                 data["raw_recipe"] = x
             else:
-                data["rendered_recipe"] = YAML.load(x)
+                data["rendered_recipe"] = _load_yaml(YAML, x, path.name)
         elif path.name == "recipe.yaml":
             data["raw_recipe"] = _extract_read(tar, member, default="")
         elif path.name == "rendered_recipe.yaml":
-            data["rendered_recipe"] = YAML.load(_extract_read(tar, member, default=""))
+            data["rendered_recipe"] = _load_yaml(
+                YAML, _extract_read(tar, member, default=""), path.name
+            )
     if data["name"]:
         return data  # type: ignore
 
 
+def _load_yaml(yaml: Any, text: str, name: str) -> Any:
+    with instrumentation.span("parse", "yaml", file=name, bytes=len(text)):
+        return yaml.load(text)
+
+
 def _extract_read(
     tar: tarfile.TarFile, member: tarfile.TarInfo, default: Any = None
 ) -> str:
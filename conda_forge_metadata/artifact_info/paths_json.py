@@ -0,0 +1,227 @@
+"""Memory-efficient handling of the file lists in ``info/paths.json``."""
+
+from __future__ import annotations
+
+import json
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, overload
+
+_DECODER = json.JSONDecoder()
+_WS = " \t\n\r"
+
+
+def _skip_ws(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WS:
+        pos += 1
+    return pos
+
+
+def _expect(text: str, pos: int, chars: str) -> tuple[str, int]:
+    pos = _skip_ws(text, pos)
+    if pos >= len(text) or text[pos] not in chars:
+        raise json.JSONDecodeError(f"Expected one of {chars!r}", text, pos)
+    return text[pos], pos + 1
+
+
+def iter_paths_json(
+    text: str, meta: dict[str, Any] | None = None
+) -> Iterator[dict[str, Any]]:
+    """Iterate over the entries of the ``paths`` list in a ``paths.json`` document.
+
+    Entries are decoded one at a time, so the whole list of dicts is never
+    held in memory at once.
+
+    Parameters
+    ----------
+    text : str
+        The contents of ``info/paths.json``.
+    meta : dict, optional
+        If given, the other top-level keys (e.g., ``paths_version``) are stored
+        in it as they are encountered.
+
+    Yields
+    ------
+    entry : dict
+        An entry of the ``paths`` list, e.g. ``{"_path": ..., "sha256": ...}``.
+    """
+    _, pos = _expect(text, 0, "{")
+    pos = _skip_ws(text, pos)
+    if text.startswith("}", pos):
+        return
+    while True:
+        pos = _skip_ws(text, pos)
+        key, pos = _DECODER.raw_decode(text, pos)
+        _, pos = _expect(text, pos, ":")
+        pos = _skip_ws(text, pos)
+        if key == "paths" and text.startswith("[", pos):
+            pos = _skip_ws(text, pos + 1)
+            if text.startswith("]", pos):
+                pos += 1
+            else:
+                while True:
+                    entry, pos = _DECODER.raw_decode(text, _skip_ws(text, pos))
+                    yield entry
+                    char, pos = _expect(text, pos, ",]")
+                    if char == "]":
+                        break
+        else:
+            value, pos = _DECODER.raw_decode(text, pos)
+            if meta is not None:
+                meta[key] = value
+        char, pos = _expect(text, pos, ",}")
+        if char == "}":
+            return
+
+
+def _write_varint(buf: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(buf: bytearray, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+_NO_SHA256 = bytes(32)
+
+
+class PackedPaths(Sequence[str]):
+    """A compact, append-only sequence of file paths.
+
+    Paths are front coded: each one is stored as the length of the prefix it
+    shares with the previous path plus the remaining UTF-8 bytes, in a single
+    buffer. Every ``BLOCK_SIZE`` entries the full path is stored so random
+    access only needs to decode one block. File lists of packages are sorted
+    and share long directory prefixes, so this typically takes a fraction of
+    the memory of a list of ``str``.
+
+    Optionally the ``sha256`` and ``size_in_bytes`` of each path are kept in
+    packed columns as well.
+
+    Parameters
+    ----------
+    paths : iterable of str, optional
+        The initial paths.
+    with_metadata : bool, optional
+        Whether to keep the ``sha256`` and ``size_in_bytes`` columns.
+    """
+
+    BLOCK_SIZE = 16
+
+    def __init__(self, paths: Iterable[str] = (), with_metadata: bool = False):
+        self._buf = bytearray()
+        self._restarts = array("I")
+        self._len = 0
+        self._last = b""
+        self._sha256 = bytearray() if with_metadata else None
+        self._sizes = array("q") if with_metadata else None
+        for path in paths:
+            self.append(path)
+
+    @property
+    def with_metadata(self) -> bool:
+        return self._sha256 is not None
+
+    def append(
+        self,
+        path: str,
+        sha256: str | None = None,
+        size_in_bytes: int | None = None,
+    ) -> None:
+        """Append a path, with its metadata if the columns are kept."""
+        encoded = path.encode()
+        if self._len % self.BLOCK_SIZE == 0:
+            self._restarts.append(len(self._buf))
+            shared = 0
+        else:
+            last = self._last
+            limit = min(len(last), len(encoded))
+            shared = 0
+            while shared < limit and last[shared] == encoded[shared]:
+                shared += 1
+        _write_varint(self._buf, shared)
+        _write_varint(self._buf, len(encoded) - shared)
+        self._buf += encoded[shared:]
+        self._last = encoded
+        self._len += 1
+        if self._sha256 is not None and self._sizes is not None:
+            self._sha256 += bytes.fromhex(sha256) if sha256 else _NO_SHA256
+            self._sizes.append(-1 if size_in_bytes is None else size_in_bytes)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _iter_from(self, block: int) -> Iterator[bytes]:
+        buf = self._buf
+        pos = self._restarts[block] if block < len(self._restarts) else len(buf)
+        last = b""
+        while pos < len(buf):
+            shared, pos = _read_varint(buf, pos)
+            n, pos = _read_varint(buf, pos)
+            last = last[:shared] + buf[pos : pos + n]
+            pos += n
+            yield last
+
+    def __iter__(self) -> Iterator[str]:
+        for encoded in self._iter_from(0):
+            yield encoded.decode()
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("PackedPaths index out of range")
+        block, offset = divmod(index, self.BLOCK_SIZE)
+        for i, encoded in enumerate(self._iter_from(block)):
+            if i == offset:
+                return encoded.decode()
+        raise AssertionError("unreachable")
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (PackedPaths, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PackedPaths({list(self)!r})"
+
+    def sha256(self, index: int) -> str | None:
+        """Get the sha256 of the path at ``index``, if known."""
+        if self._sha256 is None:
+            raise ValueError("PackedPaths was created without metadata")
+        index = range(self._len)[index]
+        digest = bytes(self._sha256[32 * index : 32 * (index + 1)])
+        return None if digest == _NO_SHA256 else digest.hex()
+
+    def size_in_bytes(self, index: int) -> int | None:
+        """Get the size of the path at ``index``, if known."""
+        if self._sizes is None:
+            raise ValueError("PackedPaths was created without metadata")
+        size = self._sizes[range(self._len)[index]]
+        return None if size < 0 else size
+
+    @property
+    def nbytes(self) -> int:
+        """The approximate number of bytes used by the packed data."""
+        n = len(self._buf) + self._restarts.itemsize * len(self._restarts)
+        if self._sha256 is not None and self._sizes is not None:
+            n += len(self._sha256) + self._sizes.itemsize * len(self._sizes)
+        return n
@@ -0,0 +1,207 @@
+"""Resolve artifacts from repodata and prefetch their metadata to disk."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+from conda_forge_metadata.artifact_info.info_json import get_artifact_info_as_json
+from conda_forge_metadata.repodata import SUBDIRS, query
+from conda_forge_metadata.types import ArtifactData, ArtifactKey
+
+logger = getLogger(__name__)
+
+# repodata timestamps are in ms, but some old records use seconds
+_MS_THRESHOLD = 100_000_000_000
+
+
+def _timestamp_seconds(value: Any) -> float:
+    value = float(value or 0)
+    return value / 1000 if value >= _MS_THRESHOLD else value
+
+
+def resolve_artifacts(
+    names: Iterable[str] | None = None,
+    since: datetime | float | None = None,
+    channel: str = "conda-forge",
+    labels: Iterable[str] = ("main",),
+    subdirs: Iterable[str] = SUBDIRS,
+    cache_dir: str | Path | None = None,
+) -> list[ArtifactKey]:
+    """Find the artifacts of some packages, or uploaded since some time.
+
+    Parameters
+    ----------
+    names : iterable of str, optional
+        The package names. The default is every package.
+    since : datetime or float, optional
+        Only return artifacts whose repodata ``timestamp`` is at or after this
+        time, given as a datetime or as seconds since the epoch.
+    channel : str, optional
+        The channel set on the returned keys. The default is "conda-forge".
+    labels, subdirs, cache_dir
+        Which repodata to look at, as in ``conda_forge_metadata.repodata.query``.
+
+    Returns
+    -------
+    keys : list of ArtifactKey
+        The matching artifacts, sorted.
+    """
+    if isinstance(since, datetime):
+        since = since.timestamp()
+    labels, subdirs = tuple(labels), tuple(subdirs)
+    kwargs: dict[str, Any] = dict(labels=labels, subdirs=subdirs, cache_dir=cache_dir)
+    if names is None:
+        records = query(**kwargs)
+    else:
+        records = [r for name in names for r in query(name=name, **kwargs)]
+    keys = set()
+    for label, subdir, fn, record in records:
+        if since is not None and _timestamp_seconds(record.get("timestamp")) < since:
+            continue
+        try:
+            keys.add(ArtifactKey.parse(fn, subdir, channel, label))
+        except ValueError:
+            logger.warning("Skipping malformed artifact %s/%s in %s", subdir, fn, label)
+    return sorted(keys)
+
+
+class ArtifactInfoCache:
+    """A directory of ``ArtifactData`` stored as JSON files.
+
+    Artifacts without metadata are stored too (as ``null``), so they are not
+    fetched again. Files are written atomically, so the cache can be shared
+    by several processes.
+
+    Parameters
+    ----------
+    path : str or Path
+        The cache directory. It is created if it does not exist.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def _path(self, key: ArtifactKey) -> Path:
+        return self.path / key.channel / key.subdir / f"{key.filename}.json"
+
+    def __contains__(self, key: ArtifactKey) -> bool:
+        return self._path(key).exists()
+
+    def load(self, key: ArtifactKey) -> ArtifactData | None:
+        """Load the cached data of an artifact.
+
+        Raises ``KeyError`` if the artifact is not cached.
+        """
+        try:
+            return json.loads(self._path(key).read_text())
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def store(self, key: ArtifactKey, data: ArtifactData | None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        if data is not None:
+            data = {**data, "files": list(data["files"])}  # type: ignore
+        tmp.write_text(json.dumps(data, default=str))
+        os.replace(tmp, path)
+
+
+class Prefetcher:
+    """Fetch artifact metadata into an ``ArtifactInfoCache`` in the background.
+
+    ``prefetch`` queues artifacts on a bounded thread pool; ``get`` serves
+    artifacts from the cache, waits for a queued fetch of the same artifact,
+    or fetches it right away.
+
+    Parameters
+    ----------
+    cache : ArtifactInfoCache or str or Path
+        The cache, or its directory.
+    backend : str, optional
+        The backend for ``get_artifact_info_as_json``. The default is "oci".
+    max_workers : int, optional
+        The maximum number of concurrent fetches. The default is 4.
+    """
+
+    def __init__(
+        self,
+        cache: ArtifactInfoCache | str | Path,
+        backend: str = "oci",
+        max_workers: int = 4,
+    ) -> None:
+        if not isinstance(cache, ArtifactInfoCache):
+            cache = ArtifactInfoCache(cache)
+        self.cache = cache
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="prefetch"
+        )
+        self._lock = threading.Lock()
+        self._in_flight: dict[ArtifactKey, Future] = {}
+
+    def __enter__(self) -> Prefetcher:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers, waiting for the queued fetches unless ``wait`` is False."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _fetch(self, key: ArtifactKey) -> ArtifactData | None:
+        data = get_artifact_info_as_json(
+            key.channel, key.subdir, key.filename, backend=self.backend
+        )
+        self.cache.store(key, data)
+        # read back, so the data is the same whether it was waited for or cached
+        return self.cache.load(key)
+
+    def _done(self, key: ArtifactKey, future: Future) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if not future.cancelled() and (exc := future.exception()) is not None:
+            logger.warning("Could not prefetch %s", key, exc_info=exc)
+
+    def prefetch(self, keys: Iterable[ArtifactKey]) -> list[Future]:
+        """Queue the artifacts that are not cached or queued yet.
+
+        Returns the futures of the newly queued fetches.
+        """
+        futures = []
+        for key in keys:
+            # normalize the label, which does not change the artifact
+            key = key._replace(label="main")
+            if key in self.cache:
+                continue
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+                future = self._in_flight[key] = self._executor.submit(self._fetch, key)
+            future.add_done_callback(lambda f, key=key: self._done(key, f))
+            futures.append(future)
+        if futures:
+            logger.info("Queued %d artifacts for prefetching", len(futures))
+        return futures
+
+    def get(self, channel: str, subdir: str, artifact: str) -> ArtifactData | None:
+        """Get the metadata of an artifact, from the cache if possible."""
+        key = ArtifactKey.parse(artifact, subdir, channel)
+        try:
+            return self.cache.load(key)
+        except KeyError:
+            pass
+        with self._lock:
+            future = self._in_flight.get(key)
+        if future is not None:
+            return future.result()
+        return self._fetch(key)
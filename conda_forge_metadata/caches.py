@@ -0,0 +1,192 @@
+"""Inspect, bound, preload and clear the in-memory caches of this package.
+
+The fetchers of this package (``package_to_feedstock``, the bot data
+mappings, ``all_labels``, ...) and a few parsers memoize their results. Every
+cache is registered under the dotted name of its function, e.g.
+``conda_forge_metadata.feedstock_outputs._package_to_feedstock``, once its
+module is imported. The functions below accept either that name or its last
+components, e.g. ``"_package_to_feedstock"``.
+
+Long-running services can keep memory flat with ``set_memory_budget`` (or
+the ``CONDA_FORGE_METADATA_CACHE_MEMORY`` environment variable, e.g.
+``512M``), and preload the mappings they need at start-up with ``warm_up``.
+"""
+
+from __future__ import annotations
+
+import importlib
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Any, NamedTuple
+
+from conda_forge_metadata import _cache
+from conda_forge_metadata._cache import parse_size, register
+
+__all__ = [
+    "CacheStats",
+    "clear",
+    "memory_budget",
+    "names",
+    "parse_size",
+    "register",
+    "set_memory_budget",
+    "stats",
+    "total_bytes",
+    "warm_up",
+]
+
+logger = getLogger(__name__)
+
+# the modules with the caches that warm_up preloads
+_FETCHER_MODULES = (
+    "conda_forge_metadata.feedstock_outputs",
+    "conda_forge_metadata.conda_forge_bot.import_to_pkg",
+    "conda_forge_metadata.conda_forge_bot.pypi_to_conda",
+)
+
+
+class CacheStats(NamedTuple):
+    name: str
+    # stale hits of caches with a stale_ttl are counted as hits
+    hits: int
+    misses: int
+    entries: int
+    maxsize: int | None
+    # approximate bytes used by the cached values; None for lru_cache functions
+    bytes: int | None
+
+
+def names() -> list[str]:
+    """The names of the registered caches, sorted."""
+    return sorted(_cache._registry.keys())
+
+
+def _select(selection: Iterable[str]) -> dict[str, Any]:
+    registry = dict(_cache._registry.items())
+    selection = list(selection)
+    if not selection:
+        return registry
+    selected = {}
+    for wanted in selection:
+        matches = {
+            name: func
+            for name, func in registry.items()
+            if name == wanted or name.endswith(f".{wanted}")
+        }
+        if not matches:
+            raise ValueError(
+                f"Unknown cache {wanted!r}. Registered caches are {names()}."
+            )
+        selected.update(matches)
+    return selected
+
+
+def stats(*selection: str) -> dict[str, CacheStats]:
+    """Report the statistics of the registered caches.
+
+    Parameters
+    ----------
+    *selection : str
+        The caches to report on; all of them by default.
+
+    Returns
+    -------
+    stats : dict of str to CacheStats
+        The statistics by cache name. Computing the bytes walks the cached
+        values, so it is slow for large caches the first time.
+    """
+    result = {}
+    for name, func in sorted(_select(selection).items()):
+        info = func.cache_info()
+        if isinstance(func, _cache.TTLCache):
+            hits = info.hits + info.stale_hits
+            nbytes: int | None = func.cache_bytes()
+        else:
+            hits = info.hits
+            nbytes = None
+        result[name] = CacheStats(
+            name, hits, info.misses, info.currsize, info.maxsize, nbytes
+        )
+    return result
+
+
+def total_bytes() -> int:
+    """Approximate the memory used by all the caches with a memory budget."""
+    return sum(cache.cache_bytes() for cache in _cache.ttl_caches())
+
+
+def memory_budget() -> int | None:
+    """The memory budget of the caches in bytes, or None if unbounded."""
+    return _cache._budget
+
+
+def set_memory_budget(nbytes: int | str | None) -> None:
+    """Bound the memory used by the caches.
+
+    When a new value would take the caches over the budget, the least
+    recently used entries of all caches are evicted. The functions cached
+    with ``functools.lru_cache`` only hold small parsed values and are only
+    bounded by their ``maxsize``.
+
+    Parameters
+    ----------
+    nbytes : int or str or None
+        The budget in bytes, or a size like ``"512M"``. None removes the
+        budget.
+    """
+    if isinstance(nbytes, str):
+        nbytes = parse_size(nbytes)
+    if nbytes is not None and nbytes < 0:
+        raise ValueError(f"The memory budget must be positive, got {nbytes}")
+    with _cache._budget_lock:
+        _cache._budget = nbytes
+    _cache._enforce_budget()
+
+
+def clear(*selection: str) -> None:
+    """Clear the given caches, or all of them, and their statistics."""
+    for func in _select(selection).values():
+        func.cache_clear()
+
+
+def _warm(name: str, func: Any) -> tuple[str, BaseException | None]:
+    try:
+        func()
+    except Exception as exc:
+        logger.warning("Could not warm up %s", name, exc_info=exc)
+        return name, exc
+    return name, None
+
+
+def warm_up(*selection: str, max_workers: int = 4) -> dict[str, BaseException]:
+    """Preload the caches that do not take arguments, concurrently.
+
+    By default, the configuration and mappings used by the feedstock-outputs
+    and bot data lookups are fetched. Caches keyed by arguments (e.g. the
+    shards of ``package_to_feedstock``) are warmed by calling their public
+    function with the keys of interest.
+
+    Parameters
+    ----------
+    *selection : str
+        The caches to warm up; all the preloadable ones by default.
+    max_workers : int
+        The number of concurrent fetches.
+
+    Returns
+    -------
+    errors : dict of str to Exception
+        The errors of the caches that could not be warmed up, by name.
+    """
+    for module in _FETCHER_MODULES:
+        importlib.import_module(module)
+    selected = _select(selection)
+    if selection:
+        if cold := [n for n, f in selected.items() if not getattr(f, "warm", False)]:
+            raise ValueError(f"Caches {cold} take arguments and cannot be preloaded")
+    else:
+        selected = {n: f for n, f in selected.items() if getattr(f, "warm", False)}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda item: _warm(*item), sorted(selected.items()))
+        return {name: exc for name, exc in results if exc is not None}
@@ -0,0 +1,217 @@
+"""The ``conda-forge-metadata`` command.
+
+The lookup commands take their inputs as arguments or, without arguments
+(or with ``-``), one per line from stdin. They run ``--jobs`` lookups
+concurrently and write one JSON object per input to stdout as soon as it
+completes, so the output order is not the input order. Each object has the
+``input`` it answers and either the result or an ``error``::
+
+    $ conda-forge-metadata feedstock libpython tk
+    {"input": "tk", "feedstocks": ["tk"]}
+    {"input": "libpython", "feedstocks": ["python"]}
+
+The command exits with 1 if any lookup failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from logging import getLogger
+from typing import IO, Any
+
+logger = getLogger(__name__)
+
+# lookups queued per worker, so huge inputs are not read into memory at once
+_QUEUED_PER_JOB = 4
+
+
+def _feedstock(args: argparse.Namespace, name: str) -> dict[str, Any]:
+    from conda_forge_metadata.feedstock_outputs import package_to_feedstock
+
+    return {"feedstocks": package_to_feedstock(name)}
+
+
+def _import(args: argparse.Namespace, name: str) -> dict[str, Any]:
+    from conda_forge_metadata.conda_forge_bot import (
+        get_pkgs_for_import,
+        map_import_to_package,
+    )
+
+    candidates, import_name = get_pkgs_for_import(name)
+    return {
+        "import_name": import_name,
+        "package": map_import_to_package(name),
+        "candidates": candidates,
+    }
+
+
+def _pypi(args: argparse.Namespace, name: str) -> dict[str, Any]:
+    from conda_forge_metadata.conda_forge_bot import map_pypi_to_conda
+
+    return {"conda_name": map_pypi_to_conda(name)}
+
+
+def _artifact_info(args: argparse.Namespace, item: str) -> dict[str, Any]:
+    from conda_forge_metadata.artifact_info import get_artifact_info_as_json
+
+    parts = item.rsplit("/", 2)
+    if len(parts) == 2:
+        parts.insert(0, args.channel)
+    if len(parts) != 3:
+        raise ValueError(f"Expected [channel/]subdir/artifact, got {item!r}")
+    channel, subdir, artifact = parts
+    info = get_artifact_info_as_json(channel, subdir, artifact, backend=args.backend)
+    return {"info": info}
+
+
+def _to_json(obj: Any) -> Any:
+    # sets of candidates, PackedPaths sequences
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if isinstance(obj, Iterable):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _read_inputs(items: list[str], stdin: IO[str]) -> Iterator[str]:
+    if items and items != ["-"]:
+        yield from items
+        return
+    for line in stdin:
+        if line := line.strip():
+            yield line
+
+
+def _run(
+    lookup: Callable[[str], dict[str, Any]],
+    inputs: Iterable[str],
+    jobs: int,
+    out: IO[str],
+) -> int:
+    """Run ``lookup`` on ``inputs`` and write NDJSON results as they complete."""
+
+    def call(item: str) -> dict[str, Any]:
+        try:
+            return {"input": item, **lookup(item)}
+        except Exception as exc:
+            logger.debug("Lookup of %s failed", item, exc_info=exc)
+            return {"input": item, "error": f"{type(exc).__name__}: {exc}"}
+
+    failed = 0
+
+    def write(future: Future[dict[str, Any]]) -> None:
+        nonlocal failed
+        result = future.result()
+        failed += "error" in result
+        out.write(json.dumps(result, default=_to_json) + "\n")
+        out.flush()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending: set[Future[dict[str, Any]]] = set()
+        for item in inputs:
+            if len(pending) >= jobs * _QUEUED_PER_JOB:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future)
+            pending.add(executor.submit(call, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(future)
+    return 1 if failed else 0
+
+
+def _parser() -> argparse.ArgumentParser:
+    from conda_forge_metadata import repodata
+
+    parser = argparse.ArgumentParser(
+        prog="conda-forge-metadata",
+        description="Look up conda-forge metadata in bulk.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    lookup = argparse.ArgumentParser(add_help=False)
+    lookup.add_argument(
+        "items",
+        nargs="*",
+        metavar="ITEM",
+        help="The inputs; read from stdin, one per line, if none or '-'.",
+    )
+    lookup.add_argument(
+        "--jobs", "-j", type=int, default=8, help="Concurrent lookups. Default: 8."
+    )
+
+    commands.add_parser(
+        "feedstock",
+        parents=[lookup],
+        help="Find the feedstocks that produce packages.",
+    ).set_defaults(lookup=_feedstock)
+    commands.add_parser(
+        "import",
+        parents=[lookup],
+        help="Find the packages that most likely provide Python imports.",
+    ).set_defaults(lookup=_import)
+    commands.add_parser(
+        "pypi",
+        parents=[lookup],
+        help="Map PyPI names to conda package names.",
+    ).set_defaults(lookup=_pypi)
+    info_parser = commands.add_parser(
+        "artifact-info",
+        parents=[lookup],
+        help="Get the metadata of artifacts, given as [channel/]subdir/artifact.",
+    )
+    info_parser.add_argument(
+        "--channel",
+        default="conda-forge",
+        help="The channel of artifacts given as subdir/artifact.",
+    )
+    info_parser.add_argument(
+        "--backend",
+        default="auto",
+        choices=["oci", "streamed", "auto"],
+        help="Default: auto.",
+    )
+    info_parser.set_defaults(lookup=_artifact_info)
+
+    repodata._add_mirror_arguments(
+        commands.add_parser(
+            "repodata-sync",
+            help="Download the repodata of many labels into a local cache.",
+        )
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+
+    import logging
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    if args.command == "repodata-sync":
+        from conda_forge_metadata import repodata
+
+        summary = repodata._mirror_command(args)
+        print(json.dumps(summary), flush=True)
+        return 1 if summary["failed"] else 0
+
+    if args.jobs < 1:
+        raise SystemExit("--jobs must be at least 1")
+    try:
+        return _run(
+            partial(args.lookup, args),
+            _read_inputs(args.items, sys.stdin),
+            jobs=args.jobs,
+            out=sys.stdout,
+        )
+    except BrokenPipeError:
+        # the reader went away, e.g. `| head`; silence the error at exit too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
@@ -2,33 +2,31 @@ from __future__ import annotations
 
 import hashlib
 import posixpath
-from functools import lru_cache
 
-import requests
+from conda_forge_metadata import endpoints, instrumentation
+from conda_forge_metadata._cache import ttl_cache
 
-CONDA_FORGE_BOT_GITHUB_BASE_URL = (
-    "https://github.com/conda-forge/conda-forge-bot-data/raw/main"
-)
+# the default base URL; set $CONDA_FORGE_METADATA_BOT_DATA_URL to override it
+CONDA_FORGE_BOT_GITHUB_BASE_URL = endpoints.DEFAULT_URLS["bot_data"]
 
+# the bot data is regenerated a few times a day
+_BOT_DATA_TTL = 3600
+_BOT_DATA_STALE_TTL = 86400
 
-@lru_cache(maxsize=1)
-def _import_to_pkg_maps_num_letters() -> int:
-    req = requests.get(
-        f"{CONDA_FORGE_BOT_GITHUB_BASE_URL}"
-        "/import_to_pkg_maps/import_to_pkg_maps_meta.json"
-    )
+
+@ttl_cache(ttl=_BOT_DATA_TTL, stale_ttl=_BOT_DATA_STALE_TTL, maxsize=1, warm=True)
+def _import_to_pkg_maps_meta() -> dict[str, int]:
+    req = endpoints.get("bot_data", "import_to_pkg_maps/import_to_pkg_maps_meta.json")
     req.raise_for_status()
-    return int(req.json()["num_letters"])
+    return req.json()
+
+
+def _import_to_pkg_maps_num_letters() -> int:
+    return int(_import_to_pkg_maps_meta()["num_letters"])
 
 
-@lru_cache(maxsize=1)
 def _import_to_pkg_maps_num_dirs() -> int:
-    req = requests.get(
-        f"{CONDA_FORGE_BOT_GITHUB_BASE_URL}"
-        "/import_to_pkg_maps/import_to_pkg_maps_meta.json"
-    )
-    req.raise_for_status()
-    return int(req.json()["num_dirs"])
+    return int(_import_to_pkg_maps_meta()["num_dirs"])
 
 
 def _get_bot_sharded_path(file_path, n_dirs=5):
@@ -43,13 +41,13 @@ def _get_bot_sharded_path(file_path, n_dirs=5):
         return posixpath.join(*pth_parts)
 
 
-@lru_cache(maxsize=128)
+@ttl_cache(ttl=_BOT_DATA_TTL, stale_ttl=_BOT_DATA_STALE_TTL, maxsize=128)
 def _import_to_pkg_maps_cache(import_first_letters: str) -> dict[str, set[str]]:
     pth = _get_bot_sharded_path(
         f"import_to_pkg_maps/{import_first_letters.lower()}.json",
         n_dirs=_import_to_pkg_maps_num_dirs(),
     )
-    req = requests.get(f"{CONDA_FORGE_BOT_GITHUB_BASE_URL}/{pth}")
+    req = endpoints.get("bot_data", pth)
     req.raise_for_status()
     return {k: set(v["elements"]) for k, v in req.json().items()}
 
@@ -61,6 +59,7 @@ def _get_pkgs_for_import(import_name: str) -> set[str] | None:
     return import_to_pkg_map.get(import_name, None)
 
 
+@instrumentation.instrumented
 def get_pkgs_for_import(import_name: str) -> tuple[set[str] | None, str]:
     """Get a list of possible packages that supply a given import.
 
@@ -94,16 +93,14 @@ def get_pkgs_for_import(import_name: str) -> tuple[set[str] | None, str]:
     return supplying_pkgs, import_name
 
 
-@lru_cache(maxsize=1)
+@ttl_cache(ttl=_BOT_DATA_TTL, stale_ttl=_BOT_DATA_STALE_TTL, maxsize=1, warm=True)
 def _ranked_hubs_authorities() -> list[str]:
-    req = requests.get(
-        "https://raw.githubusercontent.com/conda-forge/conda-forge-bot-data/"
-        "main/ranked_hubs_authorities.json"
-    )
+    req = endpoints.get("bot_data", "ranked_hubs_authorities.json")
     req.raise_for_status()
     return req.json()
 
 
+@instrumentation.instrumented
 def map_import_to_package(import_name: str) -> str:
     """Map an import name to the most likely package that has it.
 
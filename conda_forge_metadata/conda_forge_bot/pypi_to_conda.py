@@ -1,35 +1,39 @@
 from __future__ import annotations
 
 import typing
-from functools import lru_cache
 
-import requests
-from ruamel import yaml
+from .. import endpoints, http_cache, instrumentation
+from .._cache import ttl_cache
+from .import_to_pkg import _BOT_DATA_STALE_TTL, _BOT_DATA_TTL
 
 if typing.TYPE_CHECKING:
+    import requests
+
     from ..types import CondaPackageName, NameMappingEntry, PypiPackageName
 
 
-@lru_cache(maxsize=1)
+@ttl_cache(ttl=_BOT_DATA_TTL, stale_ttl=_BOT_DATA_STALE_TTL, maxsize=1, warm=True)
 def get_pypi_name_mapping() -> list[NameMappingEntry]:
-    req = requests.get(
-        "https://raw.githubusercontent.com/conda-forge/conda-forge-bot-data/"
-        "main/mappings/pypi/name_mapping.yaml"
-    )
+    req = endpoints.get("bot_data", "mappings/pypi/name_mapping.yaml")
     req.raise_for_status()
-    return yaml.YAML(typ="safe").load(req.text)
+    return http_cache.parsed(req, _parse_name_mapping)
+
+
+def _parse_name_mapping(req: requests.Response) -> list[NameMappingEntry]:
+    from ruamel import yaml
+
+    with instrumentation.span("parse", "yaml", file="name_mapping.yaml"):
+        return yaml.YAML(typ="safe").load(req.text)
 
 
-@lru_cache(maxsize=1)
+@ttl_cache(ttl=_BOT_DATA_TTL, stale_ttl=_BOT_DATA_STALE_TTL, maxsize=1, warm=True)
 def get_grayskull_pypi_mapping() -> dict[PypiPackageName, NameMappingEntry]:
-    req = requests.get(
-        "https://raw.githubusercontent.com/conda-forge/conda-forge-bot-data/"
-        "main/mappings/pypi/grayskull_pypi_mapping.json"
-    )
+    req = endpoints.get("bot_data", "mappings/pypi/grayskull_pypi_mapping.json")
     req.raise_for_status()
     return req.json()
 
 
+@instrumentation.instrumented
 def map_pypi_to_conda(pypi_name: PypiPackageName) -> CondaPackageName:
     """Map a package's PyPi name to the most likely Conda name.
 
@@ -0,0 +1,340 @@
+"""A compact dependency graph of conda packages built from repodata."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from array import array
+from collections.abc import Iterable, Iterator
+from logging import getLogger
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from conda_forge_metadata.repodata import _iter_repodatas, _split_dependency
+from conda_forge_metadata.types import split_artifact_filename
+
+logger = getLogger(__name__)
+
+_MAGIC = b"CFMDG1\n"
+
+
+class _Source:
+    """The artifacts of one repodata file, with their dependency name ids."""
+
+    __slots__ = (
+        "label",
+        "subdir",
+        "mtime_ns",
+        "size",
+        "fns",
+        "names",
+        "indptr",
+        "deps",
+    )
+
+    def __init__(self, label: str, subdir: str, mtime_ns: int, size: int) -> None:
+        self.label = label
+        self.subdir = subdir
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.fns: list[str] = []
+        # name id of each artifact
+        self.names = array("I")
+        # dependency name ids of artifact i are deps[indptr[i]:indptr[i + 1]]
+        self.indptr = array("I", [0])
+        self.deps = array("I")
+
+    def header(self) -> dict[str, Any]:
+        return {
+            "label": self.label,
+            "subdir": self.subdir,
+            "mtime_ns": self.mtime_ns,
+            "size": self.size,
+            "fns": self.fns,
+        }
+
+    def arrays(self) -> list[array]:
+        return [self.names, self.indptr, self.deps]
+
+
+def _transpose(n_nodes: int, indptr: array, indices: array) -> tuple[array, array]:
+    """Build the compressed sparse row arrays of the reversed edges.
+
+    ``n_nodes`` is the number of target nodes. The edges are bucket-counted
+    into the arrays, in one pass to count and one to fill, so the sources of
+    each target come out in increasing order without sorting.
+    """
+    rev_indptr = array("I", [0]) * (n_nodes + 1)
+    for dst in indices:
+        rev_indptr[dst + 1] += 1
+    for i in range(n_nodes):
+        rev_indptr[i + 1] += rev_indptr[i]
+    rev_indices = array("I", [0]) * len(indices)
+    # next free slot of the bucket of each target
+    fill = rev_indptr[:-1]
+    for src in range(len(indptr) - 1):
+        for dst in indices[indptr[src] : indptr[src + 1]]:
+            rev_indices[fill[dst]] = src
+            fill[dst] += 1
+    return rev_indptr, rev_indices
+
+
+def _write_array(f: BinaryIO, arr: array) -> None:
+    f.write(len(arr).to_bytes(8, "little"))
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    f.write(arr.tobytes())
+
+
+def _read_array(f: BinaryIO, typecode: str = "I") -> array:
+    n = int.from_bytes(f.read(8), "little")
+    arr = array(typecode)
+    arr.frombytes(f.read(n * arr.itemsize))
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+class DependencyGraph:
+    """Name-level and artifact-level dependency graphs of a channel.
+
+    Package names and artifacts get integer ids, and edges are stored as
+    compressed sparse row (CSR) arrays, so the graph of a whole channel fits
+    in a few tens of MB and reverse-dependency queries only touch the nodes
+    they visit.
+
+    The graph is built from repodata files named ``{subdir}.{label}.json``, as
+    written by ``conda_forge_metadata.repodata.fetch_repodata``. ``update``
+    is incremental per file, not per edge: it only re-reads the files whose
+    size or modification time changed, and drops the files that were
+    deleted, then rebuilds the edge arrays from the per-file data, so a
+    persisted graph can be kept up to date cheaply after new repodata is
+    fetched.
+    """
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self._name_ids: dict[str, int] = {}
+        self._sources: dict[str, _Source] = {}
+        self._artifacts: list[str] = []
+        self._artifact_names = array("I")
+        self._name_fwd = (array("I", [0]), array("I"))
+        self._name_rev = (array("I", [0]), array("I"))
+        self._artifact_rev = (array("I", [0]), array("I"))
+
+    @classmethod
+    def from_repodata(cls, repodata_jsons: Iterable[str | Path]) -> DependencyGraph:
+        """Build a graph from repodata files."""
+        graph = cls()
+        graph.update(repodata_jsons)
+        return graph
+
+    def _name_id(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def update(self, repodata_jsons: Iterable[str | Path]) -> bool:
+        """Add or refresh repodata files in the graph.
+
+        Files already in the graph with the same size and modification time
+        are skipped; the others are re-read as a whole. The files in the
+        graph that no longer exist (e.g. evicted from the repodata cache) are
+        removed, with their artifacts, edges and the package names nothing
+        refers to anymore. Returns whether the graph changed.
+        """
+        changed = False
+        updated = set()
+        for repodata_json in repodata_jsons:
+            path = Path(repodata_json)
+            stat = path.stat()
+            key = os.path.abspath(path)
+            updated.add(key)
+            source = self._sources.get(key)
+            if (
+                source is not None
+                and source.mtime_ns == stat.st_mtime_ns
+                and source.size == stat.st_size
+            ):
+                continue
+            subdir, label, *_ = path.name.split(".")
+            source = _Source(label, subdir, stat.st_mtime_ns, stat.st_size)
+            for _, _, fn, record in _iter_repodatas([path], include_broken=False):
+                source.fns.append(fn)
+                source.names.append(
+                    self._name_id(
+                        str(record.get("name") or split_artifact_filename(fn)[0])
+                    )
+                )
+                dep_ids = {
+                    self._name_id(_split_dependency(dep)[0])
+                    for dep in record.get("depends", ())  # type: ignore
+                }
+                source.deps.extend(sorted(dep_ids))
+                source.indptr.append(len(source.deps))
+            self._sources[key] = source
+            changed = True
+            logger.info("Added %d artifacts from %s", len(source.fns), path)
+        for key in [k for k in self._sources if k not in updated]:
+            if not os.path.exists(key):
+                del self._sources[key]
+                changed = True
+                logger.info("Removed the artifacts of %s", key)
+        if changed:
+            self._drop_unused_names()
+            self._rebuild()
+        return changed
+
+    def _drop_unused_names(self) -> None:
+        used = set()
+        for source in self._sources.values():
+            used.update(source.names)
+            used.update(source.deps)
+        if len(used) == len(self.names):
+            return
+        # renumber in the same order, so the sorted deps stay sorted
+        new_ids = array("I", [0]) * len(self.names)
+        names = []
+        for name_id in sorted(used):
+            new_ids[name_id] = len(names)
+            names.append(self.names[name_id])
+        for source in self._sources.values():
+            source.names = array("I", (new_ids[i] for i in source.names))
+            source.deps = array("I", (new_ids[i] for i in source.deps))
+        self.names = names
+        self._name_ids = {name: i for i, name in enumerate(names)}
+
+    def _rebuild(self) -> None:
+        self._artifacts = []
+        self._artifact_names = array("I")
+        # dependency name ids of all artifacts, in CSR form
+        indptr = array("I", [0])
+        deps = array("I")
+        for source in self._sources.values():
+            prefix = f"{source.label}/{source.subdir}/"
+            self._artifacts.extend(prefix + fn for fn in source.fns)
+            self._artifact_names.extend(source.names)
+            offset = len(deps)
+            indptr.extend(offset + i for i in source.indptr[1:])
+            deps.extend(source.deps)
+        n_names = len(self.names)
+        self._artifact_rev = _transpose(n_names, indptr, deps)
+        # artifacts of each name
+        by_name_indptr, by_name = _transpose(
+            n_names, array("I", range(len(self._artifacts) + 1)), self._artifact_names
+        )
+        name_indptr = array("I", [0])
+        name_deps = array("I")
+        for name_id in range(n_names):
+            dep_ids = set()
+            for i in by_name[by_name_indptr[name_id] : by_name_indptr[name_id + 1]]:
+                dep_ids.update(deps[indptr[i] : indptr[i + 1]])
+            name_deps.extend(sorted(dep_ids))
+            name_indptr.append(len(name_deps))
+        self._name_fwd = (name_indptr, name_deps)
+        self._name_rev = _transpose(n_names, name_indptr, name_deps)
+
+    def __len__(self) -> int:
+        """The number of artifacts in the graph."""
+        return len(self._artifacts)
+
+    def _neighbors(
+        self, csr: tuple[array, array], name: str, transitive: bool
+    ) -> Iterator[int]:
+        start = self._name_ids.get(name)
+        if start is None:
+            return
+        indptr, indices = csr
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for other in indices[indptr[node] : indptr[node + 1]]:
+                if other not in seen:
+                    seen.add(other)
+                    yield other
+                    if transitive:
+                        stack.append(other)
+
+    def dependents(self, name: str, transitive: bool = False) -> set[str]:
+        """Get the names of the packages that depend on ``name``.
+
+        Any artifact of a package depending on ``name`` counts. With
+        ``transitive=True``, the dependents of the dependents are included too.
+        """
+        return {
+            self.names[i] for i in self._neighbors(self._name_rev, name, transitive)
+        }
+
+    def dependencies(self, name: str, transitive: bool = False) -> set[str]:
+        """Get the names of the packages that ``name`` depends on."""
+        return {
+            self.names[i] for i in self._neighbors(self._name_fwd, name, transitive)
+        }
+
+    def artifact_dependents(self, name: str) -> list[str]:
+        """Get the artifacts (as ``label/subdir/filename``) that depend on ``name``."""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            return []
+        indptr, indices = self._artifact_rev
+        return sorted(
+            self._artifacts[i] for i in indices[indptr[name_id] : indptr[name_id + 1]]
+        )
+
+    def save(self, path: str | Path) -> None:
+        """Persist the graph to a file, atomically replacing it."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps(
+            {
+                "names": self.names,
+                "sources": {k: s.header() for k, s in self._sources.items()},
+            }
+        ).encode()
+        # unique, so concurrent saves do not write to the same file
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for source in self._sources.values():
+                for arr in source.arrays():
+                    _write_array(f, arr)
+            _write_array(f, self._artifact_names)
+            for csr in (self._name_fwd, self._name_rev, self._artifact_rev):
+                for arr in csr:
+                    _write_array(f, arr)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> DependencyGraph:
+        """Load a graph saved with ``save``."""
+        graph = cls()
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a saved DependencyGraph")
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+            graph.names = header["names"]
+            graph._name_ids = {name: i for i, name in enumerate(graph.names)}
+            for key, info in header["sources"].items():
+                source = _Source(
+                    info["label"], info["subdir"], info["mtime_ns"], info["size"]
+                )
+                source.fns = info["fns"]
+                source.names, source.indptr, source.deps = (
+                    _read_array(f) for _ in range(3)
+                )
+                graph._sources[key] = source
+                prefix = f"{source.label}/{source.subdir}/"
+                graph._artifacts.extend(prefix + fn for fn in source.fns)
+            graph._artifact_names = _read_array(f)
+            graph._name_fwd = (_read_array(f), _read_array(f))
+            graph._name_rev = (_read_array(f), _read_array(f))
+            graph._artifact_rev = (_read_array(f), _read_array(f))
+        return graph
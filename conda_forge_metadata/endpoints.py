@@ -0,0 +1,314 @@
+"""The base URLs of the remote data sources, with failover between mirrors.
+
+Every fetcher in this package builds its URLs from these base URLs, so they
+can be pointed at a mirror or at a local server. Each source has a list of
+mirrors, tried in order, which is, by order of precedence:
+
+- set with ``set_mirrors`` (or temporarily with ``override``),
+- read from the ``CONDA_FORGE_METADATA_<SOURCE>_URL`` environment variable
+  (e.g. ``CONDA_FORGE_METADATA_BOT_DATA_URL``), as URLs separated by commas
+  or whitespace, on every call,
+- the default in ``DEFAULT_URLS``.
+
+A mirror that fails with a connection error, a timeout or a 5xx or 429
+response is skipped for ``COOLDOWN`` seconds, and the request is retried on
+the next mirror. Other errors (e.g. 404) are returned or raised as is.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import urllib.error
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from conda_forge_metadata import http_cache, instrumentation
+
+if TYPE_CHECKING:
+    import requests
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_URLS = {
+    # the channels, as {url}/{channel}/{subdir}/{artifact}
+    "conda": "https://conda.anaconda.org",
+    # the defaults channels (pkgs/main, pkgs/r, ...)
+    "anaconda_repo": "https://repo.anaconda.com",
+    "anaconda_api": "https://api.anaconda.org",
+    "feedstock_outputs": (
+        "https://raw.githubusercontent.com/conda-forge/feedstock-outputs/main"
+    ),
+    "bot_data": (
+        "https://raw.githubusercontent.com/conda-forge/conda-forge-bot-data/main"
+    ),
+    "by_the_numbers": (
+        "https://raw.githubusercontent.com/conda-forge/by-the-numbers/main"
+    ),
+    "libcfgraph": "https://raw.githubusercontent.com/regro/libcfgraph/master",
+    # an OCI registry and namespace rather than a URL
+    "oci_registry": "ghcr.io/channel-mirrors",
+}
+
+# how long a failed mirror is tried only after the others, in seconds
+COOLDOWN = 60.0
+
+# the responses that fail over to the next mirror
+_TRANSIENT_STATUSES = frozenset({429, *range(500, 600)})
+
+_DEFAULTS_CHANNELS = ("pkgs/main", "pkgs/r", "pkgs/msys2")
+
+# indirection so tests can control the clock
+_clock = time.monotonic
+
+_lock = threading.Lock()
+_mirrors: dict[str, tuple[str, ...]] = {}
+# the time each mirror last failed
+_failed_at: dict[str, float] = {}
+
+
+def _check_source(source: str) -> None:
+    if source not in DEFAULT_URLS:
+        raise ValueError(
+            f"Unknown source {source!r}. Valid sources are {tuple(DEFAULT_URLS)}."
+        )
+
+
+def _normalize(urls: str | Iterable[str]) -> tuple[str, ...]:
+    if isinstance(urls, str):
+        urls = re.split(r"[\s,]+", urls)
+    return tuple(u.rstrip("/") for u in urls if u.strip())
+
+
+def env_var(source: str) -> str:
+    """The environment variable that overrides the base URLs of ``source``."""
+    return f"CONDA_FORGE_METADATA_{source.upper()}_URL"
+
+
+def mirrors(source: str) -> tuple[str, ...]:
+    """Get the configured base URLs of a data source, in order of preference.
+
+    Parameters
+    ----------
+    source : str
+        One of the keys of ``DEFAULT_URLS``.
+
+    Returns
+    -------
+    urls : tuple of str
+        The base URLs, without trailing slashes.
+    """
+    _check_source(source)
+    if urls := _mirrors.get(source):
+        return urls
+    return _normalize(os.environ.get(env_var(source), "")) or (DEFAULT_URLS[source],)
+
+
+def set_mirrors(source: str, urls: str | Iterable[str] | None) -> None:
+    """Set the base URLs of a data source, in order of preference.
+
+    Parameters
+    ----------
+    source : str
+        One of the keys of ``DEFAULT_URLS``.
+    urls : str or iterable of str or None
+        The base URLs, as an iterable or as a string of URLs separated by
+        commas or whitespace. None goes back to the environment variable or
+        the default.
+    """
+    _check_source(source)
+    with _lock:
+        if urls is None or not (normalized := _normalize(urls)):
+            _mirrors.pop(source, None)
+        else:
+            _mirrors[source] = normalized
+
+
+@contextmanager
+def override(**sources: str | Iterable[str]) -> Iterator[None]:
+    """Temporarily set the base URLs of some sources, e.g. ``override(conda=url)``."""
+    previous = {source: _mirrors.get(source) for source in sources}
+    for source, urls in sources.items():
+        set_mirrors(source, urls)
+    try:
+        yield
+    finally:
+        for source, urls in previous.items():
+            set_mirrors(source, urls)
+
+
+def base_urls(source: str) -> list[str]:
+    """The base URLs of ``source`` in the order to try them.
+
+    Mirrors that failed in the last ``COOLDOWN`` seconds come last.
+    """
+    urls = mirrors(source)
+    now = _clock()
+    healthy = [u for u in urls if now - _failed_at.get(u, -COOLDOWN) >= COOLDOWN]
+    return healthy + [u for u in urls if u not in healthy]
+
+
+def base_url(source: str) -> str:
+    """Get the preferred base URL of a data source, without a trailing slash."""
+    return base_urls(source)[0]
+
+
+def url(source: str, path: str) -> str:
+    """Join the preferred base URL of ``source`` and ``path``."""
+    return f"{base_url(source)}/{path.lstrip('/')}"
+
+
+def _channel_source(channel: str) -> str | None:
+    if channel.startswith(("http://", "https://", "file://")):
+        return None
+    return "anaconda_repo" if channel in _DEFAULTS_CHANNELS else "conda"
+
+
+def channel_url(channel: str = "conda-forge") -> str:
+    """Get the preferred URL of a channel.
+
+    Channels given as URLs are returned as is, and the defaults channels
+    (e.g. ``pkgs/main``) are served from the ``anaconda_repo`` source.
+    """
+    source = _channel_source(channel)
+    if source is None:
+        return channel.rstrip("/")
+    return url(source, channel)
+
+
+def _status(exc: BaseException) -> int | None:
+    # requests.HTTPError has the response, urllib's HTTPError the code
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_transient(exc: BaseException) -> bool:
+    import requests
+
+    status = _status(exc)
+    if status is not None:
+        return status in _TRANSIENT_STATUSES
+    # not any OSError: e.g. a full disk or a missing file is not fixed by
+    # another mirror (socket.timeout is TimeoutError)
+    return isinstance(
+        exc,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            urllib.error.URLError,
+            TimeoutError,
+        ),
+    )
+
+
+def _mark(base: str, ok: bool) -> None:
+    with _lock:
+        if ok:
+            _failed_at.pop(base, None)
+        else:
+            _failed_at[base] = _clock()
+
+
+def with_failover(source: str, fetch: Callable[[str], T]) -> T:
+    """Call ``fetch`` with the base URLs of ``source`` until one does not fail.
+
+    Only transient errors (connection errors, timeouts, 5xx and 429
+    responses) move on to the next mirror; the error of the last mirror is
+    raised.
+
+    Parameters
+    ----------
+    source : str
+        One of the keys of ``DEFAULT_URLS``.
+    fetch : callable
+        Called with a base URL, without a trailing slash.
+
+    Returns
+    -------
+    result
+        The return value of ``fetch``.
+    """
+    urls = base_urls(source)
+    for i, base in enumerate(urls):
+        try:
+            result = fetch(base)
+        except Exception as exc:
+            if not _is_transient(exc):
+                raise
+            _mark(base, ok=False)
+            if i == len(urls) - 1:
+                raise
+            logger.warning("%s failed (%s); trying %s instead", base, exc, urls[i + 1])
+            continue
+        _mark(base, ok=True)
+        return result
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def with_channel_failover(channel: str, fetch: Callable[[str], T]) -> T:
+    """Like ``with_failover``, but call ``fetch`` with the URLs of ``channel``."""
+    source = _channel_source(channel)
+    if source is None:
+        return fetch(channel.rstrip("/"))
+    return with_failover(source, lambda base: fetch(f"{base}/{channel}"))
+
+
+def get(source: str, path: str, **request_kwargs: Any) -> requests.Response:
+    """GET ``path`` from the first mirror of ``source`` that does not fail.
+
+    The response of the last mirror is returned even if it is an error, so
+    check it with ``raise_for_status`` as for ``requests.get``. Responses of
+    the sources cached by the ``http_cache`` are served from disk when it is
+    enabled.
+    """
+    cache = http_cache.active()
+    if cache is None or source not in cache.sources:
+        return _get(source, path, **request_kwargs)
+
+    def fetch(headers: dict[str, str]) -> requests.Response:
+        kwargs = dict(request_kwargs)
+        kwargs["headers"] = {**request_kwargs.get("headers", {}), **headers}
+        return _get(source, path, **kwargs)
+
+    return cache.get(source, path, fetch)
+
+
+def _get(source: str, path: str, **request_kwargs: Any) -> requests.Response:
+    import requests
+
+    urls = base_urls(source)
+    for i, base in enumerate(urls):
+        last = i == len(urls) - 1
+        url = f"{base}/{path.lstrip('/')}"
+        try:
+            with instrumentation.span("fetch", source, url=url) as span:
+                response = requests.get(url, **request_kwargs)
+                if span:
+                    span.set(status=response.status_code, bytes=len(response.content))
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            _mark(base, ok=False)
+            if last:
+                raise
+            logger.warning("%s failed (%s); trying %s instead", base, exc, urls[i + 1])
+            continue
+        if response.status_code in _TRANSIENT_STATUSES:
+            _mark(base, ok=False)
+            if not last:
+                logger.warning(
+                    "%s failed (%s); trying %s instead",
+                    base,
+                    response.status_code,
+                    urls[i + 1],
+                )
+                continue
+        else:
+            _mark(base, ok=True)
+        return response
+    raise AssertionError("unreachable")  # pragma: no cover
@@ -1,12 +1,20 @@
-import time
-from fnmatch import fnmatch
-from functools import lru_cache
-from typing import Any, TypedDict
+import os
+import re
+from collections.abc import Iterable
+from fnmatch import translate
+from typing import TYPE_CHECKING, Any, TypedDict
+
+from conda_forge_metadata import endpoints, http_cache, instrumentation
+from conda_forge_metadata._cache import ttl_cache
+from conda_forge_metadata.types import CondaPackageName
 
-import requests
-from ruamel.yaml import YAML
+if TYPE_CHECKING:
+    import requests
 
-from conda_forge_metadata.types import CondaPackageName
+# feedstock-outputs is updated on every new output registration, so only keep
+# its data briefly; expired data is refreshed in the background
+_TTL = 120
+_STALE_TTL = 120
 
 
 class FeedstockOutputsConfig(TypedDict):
@@ -15,21 +23,13 @@ class FeedstockOutputsConfig(TypedDict):
     shard_fill: str
 
 
-@lru_cache(maxsize=1)
-def _feedstock_outputs_config(time_int: int) -> FeedstockOutputsConfig:
-    ref = "main"
-    req = requests.get(
-        "https://raw.githubusercontent.com/conda-forge/feedstock-outputs/"
-        f"{ref}/config.json"
-    )
+@ttl_cache(ttl=_TTL, stale_ttl=_STALE_TTL, maxsize=1, warm=True)
+def feedstock_outputs_config() -> FeedstockOutputsConfig:
+    req = endpoints.get("feedstock_outputs", "config.json")
     req.raise_for_status()
     return req.json()
 
 
-def feedstock_outputs_config() -> FeedstockOutputsConfig:
-    return _feedstock_outputs_config(int(time.monotonic()) // 120)
-
-
 def sharded_path(name: CondaPackageName) -> str:
     """Get the path to the sharded JSON path in the feedstock_outputs repository.
 
@@ -44,10 +44,13 @@ def sharded_path(name: CondaPackageName) -> str:
         The path to the sharded JSON file. Leading slash is omitted.
 
     """
+    return _sharded_path(name, feedstock_outputs_config())
+
+
+def _sharded_path(name: CondaPackageName, config: FeedstockOutputsConfig) -> str:
     # See https://github.com/conda-forge/feedstock-outputs/
     #     blob/c35451f2fb8b7/scripts/shard_repo.py
     # for sharding details.
-    config = feedstock_outputs_config()
     outputs_path = config["outputs_path"]
     shard_level = config["shard_level"]
     shard_fill = config["shard_fill"]
@@ -60,45 +63,112 @@ def sharded_path(name: CondaPackageName) -> str:
     return f"{outputs_path}/{'/'.join(chars)}/{name}.json"
 
 
-@lru_cache(maxsize=1)
-def _fetch_allowed_autoreg_feedstock_globs(time_int: int):
-    r = requests.get(
-        "https://raw.githubusercontent.com/conda-forge/feedstock-outputs/"
-        "main/feedstock_outputs_autoreg_allowlist.yml"
-    )
+@ttl_cache(ttl=_TTL, stale_ttl=_STALE_TTL, maxsize=1, warm=True)
+def fetch_allowed_autoreg_feedstock_globs():
+    r = endpoints.get("feedstock_outputs", "feedstock_outputs_autoreg_allowlist.yml")
     r.raise_for_status()
+    return http_cache.parsed(r, _parse_allowlist)
+
+
+def _parse_allowlist(r: "requests.Response") -> dict[str, list[str]]:
+    from ruamel.yaml import YAML
+
     yaml = YAML(typ="safe")
-    return yaml.load(r.text)
+    with instrumentation.span(
+        "parse", "yaml", file="feedstock_outputs_autoreg_allowlist.yml"
+    ):
+        return yaml.load(r.text)
 
 
-def fetch_allowed_autoreg_feedstock_globs():
-    return _fetch_allowed_autoreg_feedstock_globs(int(time.monotonic()) // 120)
+class AutoregGlobMatcher:
+    """Match package names against the autoreg allowlist in one pass.
 
+    The allowlist maps feedstock names to lists of ``fnmatch`` globs. Globs
+    without wildcards are looked up in a dict. The others are compiled into a
+    single alternation regex, which only tells whether any of them matches and
+    so rejects most names in one call, and into a trie keyed by the literal
+    prefix of each glob that narrows down which globs need to be checked to
+    find the feedstocks of names that do match.
 
-fetch_allowed_autoreg_feedstock_globs.cache_clear = (
-    _fetch_allowed_autoreg_feedstock_globs.cache_clear
-)
+    Parameters
+    ----------
+    feedstock_globs : dict of str to list of str
+        The allowlist, as returned by ``fetch_allowed_autoreg_feedstock_globs``.
+    """
+
+    def __init__(self, feedstock_globs: dict[str, list[str]] | None) -> None:
+        self._literals: dict[str, set[str]] = {}
+        self._trie: dict[str, Any] = {}
+        regexes = []
+        for feedstock, pats in (feedstock_globs or {}).items():
+            for pat in pats or ():
+                pat = os.path.normcase(pat)
+                prefix_len = len(re.split(r"[*?\[]", pat, maxsplit=1)[0])
+                if prefix_len == len(pat):
+                    self._literals.setdefault(pat, set()).add(feedstock)
+                    continue
+                regex = translate(pat)
+                regexes.append(regex)
+                node = self._trie
+                for char in pat[:prefix_len]:
+                    node = node.setdefault(char, {})
+                # the empty string is never a character key
+                node.setdefault("", []).append((feedstock, re.compile(regex)))
+        self._any = re.compile("|".join(regexes)) if regexes else None
+
+    def match(self, name: CondaPackageName) -> list[str]:
+        """Return the sorted names of all feedstocks whose globs match ``name``."""
+        name = os.path.normcase(name)
+        feedstocks = set(self._literals.get(name, ()))
+        if self._any is not None and self._any.match(name) is not None:
+            node = self._trie
+            candidates = list(node.get("", ()))
+            for char in name:
+                node = node.get(char)
+                if node is None:
+                    break
+                candidates.extend(node.get("", ()))
+            for feedstock, regex in candidates:
+                if feedstock not in feedstocks and regex.match(name):
+                    feedstocks.add(feedstock)
+        return sorted(feedstocks)
+
+    def match_many(self, names: Iterable[CondaPackageName]) -> dict[str, list[str]]:
+        """Match many names at once, returning a dict of name to feedstocks.
+
+        Names that match no glob are omitted from the result.
+        """
+        result = {}
+        for name in names:
+            if feedstocks := self.match(name):
+                result[name] = feedstocks
+        return result
+
+
+_AUTOREG_MATCHER: tuple[Any, AutoregGlobMatcher] | None = None
+
+
+def autoreg_glob_matcher() -> AutoregGlobMatcher:
+    """Get the matcher for the current autoreg allowlist.
+
+    The matcher is compiled once each time the allowlist is refreshed.
+    """
+    global _AUTOREG_MATCHER
+    globs = fetch_allowed_autoreg_feedstock_globs()
+    cached = _AUTOREG_MATCHER
+    if cached is None or cached[0] is not globs:
+        cached = _AUTOREG_MATCHER = (globs, AutoregGlobMatcher(globs))
+    return cached[1]
 
 
-@lru_cache(maxsize=1024)
-def _package_to_feedstock(
-    name: CondaPackageName, time_int: int, **request_kwargs: Any
-) -> list[str]:
+@ttl_cache(ttl=_TTL, stale_ttl=_STALE_TTL, maxsize=1024)
+def _package_to_feedstock(name: CondaPackageName, **request_kwargs: Any) -> list[str]:
     assert name, "name must not be empty"
 
-    feedstocks = set()
-    fs_pats = fetch_allowed_autoreg_feedstock_globs()
-    for autoreg_feedstock, pats in fs_pats.items():
-        for pat in pats:
-            if fnmatch(name, pat):
-                feedstocks.add(autoreg_feedstock)
+    feedstocks = set(autoreg_glob_matcher().match(name))
 
-    ref = "main"
     path = sharded_path(name)
-    req = requests.get(
-        f"https://raw.githubusercontent.com/conda-forge/feedstock-outputs/{ref}/{path}",
-        **request_kwargs,
-    )
+    req = endpoints.get("feedstock_outputs", path, **request_kwargs)
     if not feedstocks:
         req.raise_for_status()
     if req.status_code == 200:
@@ -107,6 +177,7 @@ def _package_to_feedstock(
     return list(feedstocks)
 
 
+@instrumentation.instrumented
 def package_to_feedstock(name: CondaPackageName, **request_kwargs: Any) -> list[str]:
     """Map a package name to the feedstock name(s).
 
@@ -123,7 +194,7 @@ def package_to_feedstock(name: CondaPackageName, **request_kwargs: Any) -> list[
         The name of the feedstock, without the ``-feedstock`` suffix.
 
     """
-    return _package_to_feedstock(name, int(time.monotonic()) // 120, **request_kwargs)
+    return _package_to_feedstock(name, **request_kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,331 @@
+"""A persistent HTTP cache for the small JSON and YAML payloads of this package.
+
+The bot data mappings and the feedstock-outputs files are otherwise cached in
+memory only, so every new process downloads them again. With the disk cache
+enabled, ``endpoints.get`` stores the responses of the cached sources on disk
+and, for ``ttl`` seconds, serves them without any request. Past the TTL, the
+cached response is revalidated with a conditional GET (``If-None-Match`` /
+``If-Modified-Since``), which costs a round trip but no download when it did
+not change. If revalidation fails with a transient error, the cached
+response is served anyway.
+
+Documents that are slow to parse (the YAML mappings) can also be stored
+parsed, with ``parsed``: the snapshot is JSON, which loads an order of
+magnitude faster than YAML and does not need ``ruamel.yaml`` to be imported,
+and it is only used while the ETag of the response matches.
+
+The cache is off by default. Enable it with ``enable`` or by setting
+``CONDA_FORGE_METADATA_HTTP_CACHE_DIR`` (and optionally
+``CONDA_FORGE_METADATA_HTTP_CACHE_TTL``, in seconds). Entries are written
+atomically and refreshed under an inter-process lock, so processes can share
+a cache directory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from conda_forge_metadata import instrumentation
+from conda_forge_metadata._filelock import FileLock
+
+if TYPE_CHECKING:
+    import requests
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# the bot data is regenerated a few times a day; feedstock outputs change
+# when feedstocks are added
+DEFAULT_TTL = 3600.0
+DEFAULT_SOURCES = frozenset({"bot_data", "feedstock_outputs"})
+
+# bump when the JSON representation of parsed documents changes
+_SNAPSHOT_VERSION = 1
+
+# wall clock, as entries are shared between processes; indirection so tests
+# can control it
+_clock = time.time
+
+_lock = threading.Lock()
+_enabled: HTTPCache | None = None
+_from_env: dict[tuple[str, float], HTTPCache] = {}
+
+
+def default_cache_dir() -> Path:
+    """``$XDG_CACHE_HOME/conda-forge-metadata/http``."""
+    xdg_cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache, "conda-forge-metadata", "http")
+
+
+class _Entry:
+    __slots__ = ("meta", "body", "mtime")
+
+    def __init__(self, meta: dict[str, Any], body: bytes, mtime: float) -> None:
+        self.meta = meta
+        self.body = body
+        self.mtime = mtime
+
+    def response(self) -> requests.Response:
+        import requests
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = self.meta["url"]
+        response.encoding = self.meta.get("encoding")
+        response.headers.update(self.meta.get("headers", {}))
+        response._content = self.body
+        return response
+
+
+class HTTPCache:
+    """Responses of some data sources stored in ``cache_dir``.
+
+    Parameters
+    ----------
+    cache_dir : str or Path
+        The directory of the cache, created if needed.
+    ttl : float
+        Seconds a response is served without revalidation.
+    sources : iterable of str
+        The sources of ``endpoints`` to cache.
+    """
+
+    # the response headers kept in the cache
+    _HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        ttl: float = DEFAULT_TTL,
+        sources: Iterable[str] = DEFAULT_SOURCES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.sources = frozenset(sources)
+
+    def __repr__(self) -> str:
+        return f"HTTPCache({str(self.cache_dir)!r}, ttl={self.ttl})"
+
+    def _path(self, source: str, path: str) -> Path:
+        key = hashlib.sha256(f"{source}/{path.lstrip('/')}".encode()).hexdigest()
+        return self.cache_dir / f"{key[:32]}.cache"
+
+    def _read(self, file: Path) -> _Entry | None:
+        # a JSON header line, then the body
+        try:
+            with open(file, "rb") as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                header = f.readline()
+                body = f.read()
+            return _Entry(json.loads(header), body, mtime)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("Ignoring corrupted HTTP cache entry %s", file)
+            return None
+
+    def _write(self, file: Path, response: requests.Response) -> None:
+        meta = {
+            "url": response.url,
+            "encoding": response.encoding,
+            "headers": {
+                h: response.headers[h] for h in self._HEADERS if h in response.headers
+            },
+        }
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_name(f".{file.name}.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(meta).encode())
+            f.write(b"\n")
+            f.write(response.content)
+        now = _clock()
+        os.utime(tmp, (now, now))
+        os.replace(tmp, file)
+
+    def _fresh(self, entry: _Entry | None) -> bool:
+        return entry is not None and _clock() - entry.mtime < self.ttl
+
+    def get(
+        self,
+        source: str,
+        path: str,
+        fetch: Callable[[dict[str, str]], requests.Response],
+    ) -> requests.Response:
+        """Get the response for ``path`` of ``source``, from the cache if possible.
+
+        Parameters
+        ----------
+        source, path : str
+            The source and path of the request, as for ``endpoints.get``.
+        fetch : callable
+            Called with the conditional request headers to make the request.
+
+        Returns
+        -------
+        response : requests.Response
+            The cached or the new response. Only successful responses are
+            cached; others are returned as is.
+        """
+        import requests
+
+        from conda_forge_metadata.endpoints import _TRANSIENT_STATUSES
+
+        file = self._path(source, path)
+        entry = self._read(file)
+        if self._fresh(entry):
+            instrumentation.emit("cache", "http", result="hit", url=entry.meta["url"])
+            return entry.response()
+
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with FileLock(file.with_name(f".{file.name}.lock")):
+            # another process may have refreshed it while we waited
+            entry = self._read(file)
+            if self._fresh(entry):
+                instrumentation.emit(
+                    "cache", "http", result="hit", url=entry.meta["url"]
+                )
+                return entry.response()
+
+            headers = {}
+            if entry is not None:
+                if etag := entry.meta["headers"].get("ETag"):
+                    headers["If-None-Match"] = etag
+                if modified := entry.meta["headers"].get("Last-Modified"):
+                    headers["If-Modified-Since"] = modified
+            try:
+                response = fetch(headers)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if entry is None:
+                    raise
+                return self._stale(entry, exc)
+
+            if entry is not None:
+                if response.status_code == 304:
+                    now = _clock()
+                    os.utime(file, (now, now))
+                    instrumentation.emit(
+                        "cache", "http", result="revalidated", url=response.url
+                    )
+                    return entry.response()
+                if response.status_code in _TRANSIENT_STATUSES:
+                    return self._stale(entry, response.status_code)
+            instrumentation.emit("cache", "http", result="miss", url=response.url)
+            if response.status_code == 200:
+                self._write(file, response)
+            return response
+
+    def _stale(self, entry: _Entry, error: object) -> requests.Response:
+        logger.warning(
+            "Could not revalidate %s (%s); using the cached response",
+            entry.meta["url"],
+            error,
+        )
+        instrumentation.emit("cache", "http", result="stale", url=entry.meta["url"])
+        return entry.response()
+
+    def parsed(
+        self, response: requests.Response, parse: Callable[[requests.Response], T]
+    ) -> T:
+        """Parse ``response``, or load the snapshot of its last parse.
+
+        The snapshot is stored as JSON with the ETag of the response (or the
+        hash of its content), so ``parse`` must return JSON-serializable
+        data, and it is only reused for the same version of the document.
+        """
+        version = (
+            response.headers.get("ETag") or hashlib.sha256(response.content).hexdigest()
+        )
+        key = hashlib.sha256(response.url.encode()).hexdigest()
+        file = self.cache_dir / f"{key[:32]}.parsed"
+        try:
+            with open(file, "rb") as f:
+                header = json.loads(f.readline())
+                if header == {"version": version, "format": _SNAPSHOT_VERSION}:
+                    with instrumentation.span("parse", "snapshot", url=response.url):
+                        return json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning("Ignoring corrupted snapshot %s", file)
+
+        value = parse(response)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_name(f".{file.name}.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp, "w") as f:
+            f.write(json.dumps({"version": version, "format": _SNAPSHOT_VERSION}))
+            f.write("\n")
+            json.dump(value, f)
+        os.replace(tmp, file)
+        return value
+
+    def clear(self) -> None:
+        """Delete all the cached responses and snapshots."""
+        for pattern in ("*.cache", "*.parsed"):
+            for file in self.cache_dir.glob(pattern):
+                file.unlink(missing_ok=True)
+
+
+def enable(
+    cache_dir: str | Path | None = None,
+    ttl: float = DEFAULT_TTL,
+    sources: Iterable[str] = DEFAULT_SOURCES,
+) -> HTTPCache:
+    """Cache the responses of ``sources`` on disk, overriding the environment.
+
+    Parameters
+    ----------
+    cache_dir : str or Path, optional
+        The directory of the cache; ``default_cache_dir()`` by default.
+    ttl : float
+        Seconds a response is served without revalidation.
+    sources : iterable of str
+        The sources of ``endpoints`` to cache.
+    """
+    global _enabled
+    cache = HTTPCache(cache_dir or default_cache_dir(), ttl=ttl, sources=sources)
+    with _lock:
+        _enabled = cache
+    return cache
+
+
+def disable() -> None:
+    """Stop using the cache set with ``enable``; the environment applies again."""
+    global _enabled
+    with _lock:
+        _enabled = None
+
+
+def active() -> HTTPCache | None:
+    """The cache in use: the one set with ``enable``, or from the environment."""
+    if _enabled is not None:
+        return _enabled
+    cache_dir = os.environ.get("CONDA_FORGE_METADATA_HTTP_CACHE_DIR")
+    if not cache_dir:
+        return None
+    ttl = float(os.environ.get("CONDA_FORGE_METADATA_HTTP_CACHE_TTL") or DEFAULT_TTL)
+    with _lock:
+        cache = _from_env.get((cache_dir, ttl))
+        if cache is None:
+            cache = _from_env[cache_dir, ttl] = HTTPCache(cache_dir, ttl=ttl)
+        return cache
+
+
+def parsed(response: requests.Response, parse: Callable[[requests.Response], T]) -> T:
+    """Parse ``response``, using a snapshot of the active cache if there is one.
+
+    See ``HTTPCache.parsed``. Without a cache, this is ``parse(response)``.
+    """
+    cache = active()
+    if cache is None:
+        return parse(response)
+    return cache.parsed(response, parse)
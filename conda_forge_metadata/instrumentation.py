@@ -0,0 +1,304 @@
+"""Hooks to observe network fetches, decompression, parsing and cache lookups.
+
+Instrumentation is off until an observer is registered with ``add_observer``
+(or ``observing``). Observers are called with an ``Event`` for every
+instrumented operation, from the thread that ran it. With no observer, the
+instrumented code only pays for a check of an empty tuple.
+
+The event kinds are:
+
+- ``"call"``: a call of a public entry point, e.g. ``package_to_feedstock``,
+- ``"fetch"``: an HTTP request or download, with the ``url``, ``status`` and
+  ``bytes`` transferred when known,
+- ``"decompress"``: the time spent decompressing a download,
+- ``"parse"``: the parsing of a JSON or YAML document,
+- ``"cache"``: a lookup in a memoized fetcher, with ``result`` set to
+  ``"hit"``, ``"stale"`` or ``"miss"``, or in the ``"http"`` disk cache,
+  which can also be ``"revalidated"``.
+
+Events of operations run within a span of the same thread (e.g. the fetches
+made by a ``"call"``) have the ``id`` of that span as their ``parent``.
+
+``Recorder`` collects events and summarizes them, and
+``opentelemetry_observer`` forwards them to an OpenTelemetry tracer.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import wraps
+from logging import getLogger
+from typing import Any, NamedTuple, TypeVar
+
+logger = getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Event(NamedTuple):
+    kind: str
+    name: str
+    # seconds since the epoch
+    start: float
+    # seconds; 0 for instant events such as cache lookups
+    duration: float
+    attrs: dict[str, Any]
+    id: int
+    parent: int | None
+
+
+Observer = Callable[[Event], None]
+
+# replaced as a whole, so it can be read without the lock
+_observers: tuple[Observer, ...] = ()
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+def add_observer(observer: Observer) -> None:
+    """Call ``observer`` with every event from now on."""
+    global _observers
+    with _lock:
+        _observers = (*_observers, observer)
+
+
+def remove_observer(observer: Observer) -> None:
+    """Stop calling ``observer``. Unknown observers are ignored."""
+    global _observers
+    with _lock:
+        _observers = tuple(o for o in _observers if o is not observer)
+
+
+@contextmanager
+def observing(observer: Observer) -> Iterator[Observer]:
+    """Register ``observer`` for the duration of a ``with`` block."""
+    add_observer(observer)
+    try:
+        yield observer
+    finally:
+        remove_observer(observer)
+
+
+def enabled() -> bool:
+    """Whether any observer is registered."""
+    return bool(_observers)
+
+
+def _stack() -> list[int]:
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def _dispatch(event: Event) -> None:
+    for observer in _observers:
+        try:
+            observer(event)
+        except Exception as exc:
+            logger.warning("Observer %r failed", observer, exc_info=exc)
+
+
+class Span:
+    """A timed operation, reported to the observers when it ends.
+
+    Use ``set`` and ``add`` to attach attributes while it runs. An exception
+    raised in the span is recorded as the ``error`` attribute.
+    """
+
+    __slots__ = ("kind", "name", "attrs", "id", "parent", "_start", "_t0")
+
+    def __init__(self, kind: str, name: str, attrs: dict[str, Any]) -> None:
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_ids)
+        self.parent: int | None = None
+
+    def __bool__(self) -> bool:
+        return True
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, key: str, amount: float) -> None:
+        """Add ``amount`` to a numeric attribute."""
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def __enter__(self) -> Span:
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self.id)
+        self._start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        duration = time.perf_counter() - self._t0
+        stack = _stack()
+        # spans in generators do not always end in the order they started
+        if self.id in stack:
+            stack.remove(self.id)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _dispatch(
+            Event(
+                self.kind,
+                self.name,
+                self._start,
+                duration,
+                self.attrs,
+                self.id,
+                self.parent,
+            )
+        )
+
+
+class _NoopSpan:
+    """The span returned when instrumentation is off; it does nothing."""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(kind: str, name: str, **attrs: Any) -> Span | _NoopSpan:
+    """Time a ``with`` block and report it as an event.
+
+    When instrumentation is off, a shared no-op span is returned. It is
+    falsy, so attributes that are costly to compute can be skipped with
+    ``if span: span.set(...)``.
+    """
+    if not _observers:
+        return _NOOP
+    return Span(kind, name, attrs)
+
+
+def emit(kind: str, name: str, duration: float = 0.0, **attrs: Any) -> None:
+    """Report an event, measured by the caller if it has a ``duration``."""
+    if not _observers:
+        return
+    stack = _stack()
+    _dispatch(
+        Event(
+            kind,
+            name,
+            time.time() - duration,
+            duration,
+            attrs,
+            next(_ids),
+            stack[-1] if stack else None,
+        )
+    )
+
+
+def instrumented(func: F) -> F:
+    """Decorate a function to report its calls as ``"call"`` spans."""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not _observers:
+            return func(*args, **kwargs)
+        with Span("call", name, {}):
+            return func(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class Recorder:
+    """An observer that keeps the events it receives.
+
+    Example::
+
+        with observing(Recorder()) as recorder:
+            package_to_feedstock("python")
+        print(recorder.summary())
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.events: list[Event] = []
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.events.clear()
+
+    def summary(self) -> dict[tuple[str, str], dict[str, float]]:
+        """Aggregate the events by ``(kind, name)``.
+
+        Returns the ``count`` and total ``duration`` of each kind of event,
+        the total ``bytes`` of fetches and the number of ``errors``, and the
+        count of each ``result`` of cache lookups (``hit``, ``miss``, ...).
+        """
+        with self._lock:
+            events = list(self.events)
+        summary: dict[tuple[str, str], dict[str, float]] = {}
+        for event in events:
+            stats = summary.setdefault(
+                (event.kind, event.name), {"count": 0, "duration": 0.0}
+            )
+            stats["count"] += 1
+            stats["duration"] += event.duration
+            if "bytes" in event.attrs:
+                stats["bytes"] = stats.get("bytes", 0) + event.attrs["bytes"]
+            if "error" in event.attrs:
+                stats["errors"] = stats.get("errors", 0) + 1
+            if event.kind == "cache":
+                result = event.attrs.get("result", "miss")
+                stats[result] = stats.get(result, 0) + 1
+        return summary
+
+
+def opentelemetry_observer(tracer: Any) -> Observer:
+    """Make an observer that reports events as spans of an OpenTelemetry tracer.
+
+    Spans are created once the operation ended, with its start and end times,
+    so they are not linked to the parent spans of the caller.
+
+    Parameters
+    ----------
+    tracer : opentelemetry.trace.Tracer
+        The tracer, e.g. ``opentelemetry.trace.get_tracer(__name__)``.
+    """
+
+    def observer(event: Event) -> None:
+        start_ns = int(event.start * 1e9)
+        attributes = {
+            f"conda_forge_metadata.{key}": value
+            for key, value in event.attrs.items()
+            if isinstance(value, (str, bool, int, float))
+        }
+        attributes["conda_forge_metadata.kind"] = event.kind
+        otel_span = tracer.start_span(
+            f"{event.kind} {event.name}", start_time=start_ns, attributes=attributes
+        )
+        otel_span.end(end_time=start_ns + int(event.duration * 1e9))
+
+    return observer
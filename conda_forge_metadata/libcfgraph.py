@@ -1,29 +1,21 @@
 from __future__ import annotations
 
-from functools import lru_cache
-
-import requests
-
+from conda_forge_metadata import endpoints
+from conda_forge_metadata._cache import ttl_cache
 from conda_forge_metadata.deprecations import deprecated
-from conda_forge_metadata.types import ArtifactData
+from conda_forge_metadata.types import ArtifactData, ArtifactKey
 
 _LIBCFGRAPH_INDEX = None
 
 
 def _download_libcfgraph_index():
     global _LIBCFGRAPH_INDEX
-    r = requests.get(
-        "https://raw.githubusercontent.com/regro/libcfgraph"
-        "/master/.file_listing_meta.json",
-    )
+    r = endpoints.get("libcfgraph", ".file_listing_meta.json")
     r.raise_for_status()
     n_files = r.json()["n_files"]
     _LIBCFGRAPH_INDEX = []
     for i in range(n_files):
-        r = requests.get(
-            "https://raw.githubusercontent.com/regro/libcfgraph"
-            "/master/.file_listing_%d.json" % i,
-        )
+        r = endpoints.get("libcfgraph", ".file_listing_%d.json" % i)
         r.raise_for_status()
         _LIBCFGRAPH_INDEX += r.json()
 
@@ -62,7 +54,7 @@ def get_libcfgraph_index() -> list[str]:
         "Use conda_forge_metdata.artifact_info.get_artifact_info_as_json instead."
     ),
 )
-@lru_cache(maxsize=1024)
+@ttl_cache(ttl=None, maxsize=1024)
 def get_libcfgraph_artifact_data(
     channel: str, subdir: str, artifact: str
 ) -> ArtifactData | None:
@@ -105,40 +97,30 @@ def get_libcfgraph_artifact_data(
     # urls look like this:
     # https://raw.githubusercontent.com/regro/libcfgraph/master/
     #   artifacts/21cmfast/conda-forge/osx-64/21cmfast-3.0.2-py36h13dd421_0.json
-    nm_parts = artifact.rsplit("-", 2)
-    if artifact.endswith(".tar.bz2"):
-        nm = artifact[: -len(".tar.bz2")]
-    else:
-        nm = artifact[: -len(".conda")]
-
-    libcfgraph_path = f"artifacts/{nm_parts[0]}/{channel}/{subdir}/{nm}.json"
+    try:
+        key = ArtifactKey.parse(artifact, subdir, channel)
+    except ValueError:
+        return None
+    libcfgraph_path = f"artifacts/{key.name}/{channel}/{subdir}/{key.stem}.json"
     if libcfgraph_path in get_libcfgraph_index():
-        url = (
-            "https://raw.githubusercontent.com/regro/libcfgraph/master/"
-            + libcfgraph_path
-        )
-        r = requests.get(url)
+        r = endpoints.get("libcfgraph", libcfgraph_path)
         r.raise_for_status()
         return r.json()
     else:
         return None
 
 
-@lru_cache(maxsize=1)
+@ttl_cache(ttl=None, maxsize=1)
 def _import_to_pkg_maps_num_letters() -> int:
-    req = requests.get(
-        "https://raw.githubusercontent.com/regro/libcfgraph/master"
-        "/import_to_pkg_maps_meta.json"
-    )
+    req = endpoints.get("libcfgraph", "import_to_pkg_maps_meta.json")
     req.raise_for_status()
     return int(req.json()["num_letters"])
 
 
-@lru_cache(maxsize=128)
+@ttl_cache(ttl=None, maxsize=128)
 def _import_to_pkg_maps_cache(import_first_letters: str) -> dict[str, set[str]]:
-    req = requests.get(
-        f"https://raw.githubusercontent.com/regro/libcfgraph"
-        f"/master/import_to_pkg_maps/{import_first_letters.lower()}.json"
+    req = endpoints.get(
+        "libcfgraph", f"import_to_pkg_maps/{import_first_letters.lower()}.json"
     )
     req.raise_for_status()
     return {k: set(v["elements"]) for k, v in req.json().items()}
@@ -1,17 +1,193 @@
 import tarfile
-from collections.abc import Generator
+import threading
+import time
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from logging import getLogger
+from typing import Any
+from urllib.parse import urlsplit
 
+from conda_oci_mirror.oras import registry_name
+from conda_oci_mirror.package import package_reference, reverse_version_build_tag
 from conda_oci_mirror.repo import PackageRepo
 
+from conda_forge_metadata import endpoints
+from conda_forge_metadata._cache import ttl_cache
+from conda_forge_metadata.types import ArtifactKey
+
 logger = getLogger(__name__)
 
+# the default registry; see conda_forge_metadata.endpoints to use mirrors
+DEFAULT_REGISTRY = endpoints.DEFAULT_URLS["oci_registry"]
+
+# indirection so tests can control the clock
+_clock = time.monotonic
+
+
+class OCIClientPool:
+    """A thread-safe pool of ``PackageRepo`` objects.
+
+    Creating a ``PackageRepo`` creates a new registry client, with its own
+    HTTP connection pool and bearer token, so every artifact looked up with a
+    fresh repo pays for new connections and a token negotiation. The pool
+    keeps idle repos keyed by ``(registry, channel, subdir)`` and hands each
+    one to a single thread at a time, since the registry client keeps its
+    token in mutable headers.
+
+    Bearer tokens are dropped once they are older than ``token_max_age``
+    seconds, before the registry rejects them, so a new one is negotiated
+    on the next request.
+
+    Parameters
+    ----------
+    max_idle : int, optional
+        The maximum number of idle repos kept per key. The default is 8.
+    token_max_age : float, optional
+        The maximum age of a bearer token in seconds. The default is 240.
+    """
+
+    def __init__(self, max_idle: int = 8, token_max_age: float = 240.0) -> None:
+        self.max_idle = max_idle
+        self.token_max_age = token_max_age
+        self._lock = threading.Lock()
+        # idle repos with the time their token was last reset
+        self._idle: dict[tuple[str, str, str], list[tuple[PackageRepo, float]]] = {}
+
+    @contextmanager
+    def repo(
+        self, channel: str, subdir: str, registry: str = DEFAULT_REGISTRY
+    ) -> Iterator[PackageRepo]:
+        """Check out a repo for exclusive use by the calling thread."""
+        key = (registry, channel, subdir)
+        with self._lock:
+            idle = self._idle.get(key)
+            entry = idle.pop() if idle else None
+        if entry is None:
+            repo, since = (
+                PackageRepo(channel, subdir, None, registry=registry),
+                _clock(),
+            )
+        else:
+            repo, since = entry
+            if _clock() - since > self.token_max_age:
+                repo.client.reset_basic_auth()
+                since = _clock()
+        try:
+            yield repo
+        finally:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append((repo, since))
+
+    def clear(self) -> None:
+        """Drop all the idle repos."""
+        with self._lock:
+            self._idle.clear()
+
+
+_POOL = OCIClientPool()
+
+# mirrored tags are added as the mirror catches up, so do not cache them for long
+_TAGS_TTL = 600
+
+
+def _get_tags(client: Any, uri: str) -> list[str]:
+    """List all the tags of ``uri``, or none if the registry does not have it.
+
+    ``Registry.get_tags`` of oras raises a ``ValueError`` without the status
+    on any error, so the tags are requested here to tell a missing package
+    (404) from a failure.
+    """
+    container = client.get_container(uri)
+    url: str | None = f"{client.prefix}://{container.tags_url(N=100_000_000)}"
+    base = "{0.scheme}://{0.netloc}".format(urlsplit(url))
+    tags: list[str] = []
+    while url is not None:
+        response = client.do_request(url, "GET", headers=client.headers)
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        new_tags = response.json().get("tags") or []
+        tags.extend(new_tags)
+        link = response.links.get("next", {}).get("url")
+        url = f"{base}{link}" if new_tags and link else None
+    return tags
+
+
+@ttl_cache(ttl=_TAGS_TTL, maxsize=4096)
+def _oci_tags(registry: str, channel: str, subdir: str, name: str) -> frozenset[str]:
+    uri = f"{registry_name(registry)}/{channel}/{subdir}/{package_reference(name)}"
+    with _POOL.repo(channel, subdir, registry) as repo:
+        tags = _get_tags(repo.client, uri)
+    logger.debug("Found %d tags for %s", len(tags), uri)
+    return frozenset(reverse_version_build_tag(tag) for tag in tags)
+
+
+def list_oci_tags(
+    channel: str, subdir: str, name: str, registry: str | None = None
+) -> frozenset[str]:
+    """List the mirrored ``{version}-{build}`` tags of a package, in one request.
+
+    The tags are cached for a few minutes, so checking many artifacts of the
+    same package only lists them once. Without a ``registry``, the
+    ``oci_registry`` mirrors of ``conda_forge_metadata.endpoints`` are tried
+    in order.
+    """
+    if registry is not None:
+        return _oci_tags(registry, channel, subdir, name)
+    return endpoints.with_failover(
+        "oci_registry", lambda registry: _oci_tags(registry, channel, subdir, name)
+    )
+
+
+def is_oci_mirrored(
+    channel: str, subdir: str, artifact: str, registry: str | None = None
+) -> bool:
+    """Whether an artifact (e.g. ``"zlib-1.3.1-hb9d3cd8_2.conda"``) is mirrored."""
+    key = ArtifactKey.parse(artifact, subdir, channel)
+    tags = list_oci_tags(channel, subdir, key.name, registry)
+    return f"{key.version}-{key.build}" in tags
+
+
+def missing_oci_artifacts(
+    channel: str,
+    subdir: str,
+    artifacts: Iterable[str],
+    registry: str | None = None,
+    max_workers: int = 4,
+) -> set[str]:
+    """Find which of some artifacts are not mirrored.
+
+    The tags of each package are listed once, concurrently, instead of trying
+    to fetch every artifact.
+    """
+    keys = [ArtifactKey.parse(artifact, subdir, channel) for artifact in artifacts]
+    names = sorted({key.name for key in keys})
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tags = dict(
+            zip(
+                names,
+                executor.map(
+                    lambda name: list_oci_tags(channel, subdir, name, registry), names
+                ),
+            )
+        )
+    return {
+        key.filename
+        for key in keys
+        if f"{key.version}-{key.build}" not in tags[key.name]
+    }
+
 
 def get_oci_artifact_data(
     channel: str,
     subdir: str,
     artifact: str,
-    registry: str = "ghcr.io/channel-mirrors",
+    registry: str | None = None,
+    pool: "OCIClientPool | None" = None,
+    check_tags: bool = False,
 ) -> "Generator[tuple[tarfile.TarFile, tarfile.TarInfo], None, None] | None":
     """Get a blob of artifact data from the conda info directory.
 
@@ -29,8 +205,17 @@ def get_oci_artifact_data(
     artifact : str
         The full artifact name with extension (e.g.,
         "21cmfast-3.0.2-py36h13dd421_0.tar.bz2").
-    registry : str
-        The registry to use for the OCI repository.
+    registry : str, optional
+        The registry to use for the OCI repository. The default is to try
+        the ``oci_registry`` mirrors of ``conda_forge_metadata.endpoints``
+        in order.
+    pool : OCIClientPool, optional
+        The pool of registry clients to use. The default is a module-level
+        pool shared by all callers.
+    check_tags : bool, optional
+        If True, the (cached) list of mirrored tags of the package is checked
+        first, so artifacts that are not mirrored are skipped without a
+        failed request. The default is False.
 
     Returns
     -------
@@ -56,19 +241,24 @@ def get_oci_artifact_data(
         If the artifact is not indexed, it returns None.
 
     """
-    if artifact.endswith(".tar.bz2"):
-        artifact = artifact[: -len(".tar.bz2")]
-    elif artifact.endswith(".conda"):
-        artifact = artifact[: -len(".conda")]
-    else:
+    key = ArtifactKey.parse(artifact, subdir, channel)
+    if not key.extension:
         raise ValueError(f"Artifact '{artifact}' is not a conda package")
 
-    repo = PackageRepo(channel, subdir, None, registry=registry)
+    oci_name = f"{key.name}:{key.version}-{key.build}"
+
+    def get_info(registry: str) -> tarfile.TarFile:
+        with (pool or _POOL).repo(channel, subdir, registry) as repo:
+            return repo.get_info(oci_name)
 
-    parts = artifact.rsplit("-", 2)
-    oci_name = f"{parts[0]}:{parts[1]}-{parts[2]}"
     try:
-        tar = repo.get_info(oci_name)
+        if check_tags and not is_oci_mirrored(channel, subdir, artifact, registry):
+            logger.debug("%s/%s is not mirrored", subdir, artifact)
+            return None
+        if registry is not None:
+            tar = get_info(registry)
+        else:
+            tar = endpoints.with_failover("oci_registry", get_info)
     except ValueError as exc:
         logger.debug("Failed to get info for %s", oci_name, exc_info=exc)
         return None
@@ -0,0 +1,227 @@
+"""A deduplicated, content-addressed store of repodata records."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from collections.abc import Iterable, Iterator
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Literal
+
+from conda_forge_metadata.types import split_artifact_filename
+
+logger = getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    fn TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manifests (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    subdir TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    UNIQUE (label, subdir)
+);
+CREATE TABLE IF NOT EXISTS manifest_records (
+    manifest_id INTEGER NOT NULL,
+    record_id INTEGER NOT NULL,
+    -- 'removed' entries, which have no record
+    broken INTEGER NOT NULL,
+    PRIMARY KEY (manifest_id, record_id)
+) WITHOUT ROWID;
+"""
+
+
+def _canonical(record: dict[str, Any]) -> str:
+    return json.dumps(record, sort_keys=True, separators=(",", ":"))
+
+
+def _digest(fn: str, text: str) -> bytes:
+    return hashlib.sha256(f"{fn}\0{text}".encode()).digest()
+
+
+class RecordStore:
+    """Repodata of many labels and subdirs, with each unique record stored once.
+
+    Records are keyed by the sha256 of their filename and canonical JSON, and
+    every ``(label, subdir)`` repodata file is stored as a manifest of record
+    ids. Most records of labels other than ``main`` are also in ``main``, so
+    the store takes a fraction of the space of the individual repodata
+    files, and aggregations across labels are set operations on ids
+    instead of re-parsing every file.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path to the SQLite database. It is created if it does not exist.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> RecordStore:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        """The number of unique records."""
+        return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def manifests(self) -> list[tuple[str, str]]:
+        """The sorted ``(label, subdir)`` pairs in the store."""
+        return list(
+            self._conn.execute(
+                "SELECT label, subdir FROM manifests ORDER BY label, subdir"
+            )
+        )
+
+    def add_repodata(self, repodata_json: str | Path) -> bool:
+        """Add or replace the manifest of a ``{subdir}.{label}.json`` file.
+
+        Files already stored with the same size and modification time are
+        skipped. Returns whether the store changed.
+        """
+        path = Path(repodata_json)
+        subdir, label, *_ = path.name.split(".")
+        stat = path.stat()
+        cur = self._conn.cursor()
+        row = cur.execute(
+            "SELECT mtime_ns, size FROM manifests WHERE label = ? AND subdir = ?",
+            (label, subdir),
+        ).fetchone()
+        if row == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        data = json.loads(path.read_text())
+        entries = []
+        for key in ("packages", "packages.conda"):
+            for fn, record in data.get(key, {}).items():
+                name = record.get("name") or split_artifact_filename(fn)[0]
+                entries.append((fn, name, record.get("size") or 0, record, 0))
+        for fn in data.get("removed", ()):
+            entries.append((fn, split_artifact_filename(fn)[0], 0, {}, 1))
+
+        cur.execute(
+            "INSERT INTO manifests (label, subdir, mtime_ns, size) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (label, subdir) DO UPDATE SET "
+            "mtime_ns = excluded.mtime_ns, size = excluded.size",
+            (label, subdir, stat.st_mtime_ns, stat.st_size),
+        )
+        (manifest_id,) = cur.execute(
+            "SELECT id FROM manifests WHERE label = ? AND subdir = ?",
+            (label, subdir),
+        ).fetchone()
+        cur.execute(
+            "DELETE FROM manifest_records WHERE manifest_id = ?", (manifest_id,)
+        )
+        rows = []
+        for fn, name, size, record, broken in entries:
+            text = _canonical(record)
+            rows.append((_digest(fn, text), fn, name, size, text, broken))
+        cur.executemany(
+            "INSERT OR IGNORE INTO records (digest, fn, name, size, record) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (row[:5] for row in rows),
+        )
+        cur.executemany(
+            "INSERT OR IGNORE INTO manifest_records "
+            "(manifest_id, record_id, broken) "
+            "SELECT ?, id, ? FROM records WHERE digest = ?",
+            ((manifest_id, row[5], row[0]) for row in rows),
+        )
+        self._conn.commit()
+        logger.info("Stored %d records of %s/%s", len(rows), label, subdir)
+        return True
+
+    def prune(self) -> int:
+        """Delete the records that are not in any manifest.
+
+        Returns the number of deleted records.
+        """
+        cur = self._conn.execute(
+            "DELETE FROM records WHERE id NOT IN "
+            "(SELECT DISTINCT record_id FROM manifest_records)"
+        )
+        self._conn.commit()
+        return cur.rowcount
+
+    def records(
+        self, label: str, subdir: str, include_broken: bool = True
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Iterate over the ``(filename, record)`` pairs of a manifest.
+
+        Removed (broken) artifacts have an empty record.
+        """
+        rows = self._conn.execute(
+            "SELECT r.fn, r.record FROM manifests m "
+            "JOIN manifest_records mr ON mr.manifest_id = m.id "
+            "JOIN records r ON r.id = mr.record_id "
+            "WHERE m.label = ? AND m.subdir = ?"
+            + ("" if include_broken else " AND NOT mr.broken")
+            + " ORDER BY r.fn",
+            (label, subdir),
+        )
+        for fn, text in rows:
+            yield fn, json.loads(text)
+
+    def _where(
+        self, labels: Iterable[str], subdirs: Iterable[str] | None, include_broken: bool
+    ) -> tuple[str, list[str]]:
+        labels = list(labels)
+        where = f"m.label IN ({', '.join('?' * len(labels))})"
+        params = labels
+        if subdirs is not None:
+            subdirs = list(subdirs)
+            where += f" AND m.subdir IN ({', '.join('?' * len(subdirs))})"
+            params += subdirs
+        if not include_broken:
+            where += " AND NOT mr.broken"
+        return where, params
+
+    def aggregated(
+        self,
+        reports: Iterable[Literal["artifacts", "names", "size", "unique_artifacts"]],
+        labels: Iterable[str] = ("main",),
+        subdirs: Iterable[str] | None = None,
+        include_broken: bool = True,
+    ) -> dict[str, int]:
+        """Compute the same reports as ``conda_forge_metadata.repodata.aggregated``.
+
+        Artifacts are counted once per label they are in, as in
+        ``repodata.aggregated``. The additional ``unique_artifacts`` report
+        counts the distinct records across all the labels.
+        """
+        reports = list(reports)
+        where, params = self._where(labels, subdirs, include_broken)
+        columns = {
+            "artifacts": "COUNT(*)",
+            "names": "COUNT(DISTINCT r.name)",
+            "size": "COALESCE(SUM(r.size), 0)",
+            "unique_artifacts": "COUNT(DISTINCT mr.record_id)",
+        }
+        selected = [columns[report] for report in reports]
+        row = self._conn.execute(
+            f"SELECT {', '.join(selected)} FROM manifests m "
+            "JOIN manifest_records mr ON mr.manifest_id = m.id "
+            "JOIN records r ON r.id = mr.record_id "
+            f"WHERE {where}",
+            params,
+        ).fetchone()
+        return dict(zip(reports, row))
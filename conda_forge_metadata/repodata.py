@@ -2,21 +2,32 @@
 
 from __future__ import annotations
 
-import bz2
 import json
 import os
+import sys
+import tempfile
+import threading
+import time
 from collections.abc import Iterable
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import lru_cache
+from fnmatch import fnmatchcase
 from itertools import product
 from logging import getLogger
 from pathlib import Path
-from typing import Any, Literal
-from urllib.request import urlretrieve
-
-import requests
+from typing import TYPE_CHECKING, Any, Literal
 
+from conda_forge_metadata import endpoints, instrumentation
+from conda_forge_metadata._cache import ttl_cache
+from conda_forge_metadata._conda_versions import version_matches
+from conda_forge_metadata._download import HostLimiter, Progress, TokenBucket, download
+from conda_forge_metadata._filelock import FileLock
 from conda_forge_metadata.deprecations import deprecated
+from conda_forge_metadata.types import ArtifactKey, split_artifact_filename
+
+if TYPE_CHECKING:
+    import argparse
+
+    from conda_forge_metadata.record_store import RecordStore
 
 logger = getLogger(__name__)
 
@@ -30,22 +41,30 @@ SUBDIRS = (
     "win-arm64",
     "noarch",
 )
-CACHE_DIR = Path(".repodata_cache")
 
 
-@lru_cache
+def _default_cache_dir() -> Path:
+    if cache_dir := os.environ.get("CONDA_FORGE_METADATA_CACHE_DIR"):
+        return Path(cache_dir)
+    xdg_cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg_cache, "conda-forge-metadata", "repodata")
+
+
+# $CONDA_FORGE_METADATA_CACHE_DIR, or $XDG_CACHE_HOME/conda-forge-metadata/repodata
+CACHE_DIR = _default_cache_dir()
+
+
+@ttl_cache(ttl=3600, stale_ttl=86400)
 def all_labels(use_remote_cache: bool = False) -> list[str]:
     if use_remote_cache:
-        r = requests.get(
-            "https://raw.githubusercontent.com/conda-forge/"
-            "by-the-numbers/main/data/labels.json"
-        )
+        r = endpoints.get("by_the_numbers", "data/labels.json")
         r.raise_for_status()
         return r.json()
 
     if token := os.environ.get("BINSTAR_TOKEN"):
-        label_info = requests.get(
-            "https://api.anaconda.org/channels/conda-forge",
+        label_info = endpoints.get(
+            "anaconda_api",
+            "channels/conda-forge",
             headers={"Authorization": f"token {token}"},
         ).json()
 
@@ -55,36 +74,244 @@ def all_labels(use_remote_cache: bool = False) -> list[str]:
     return ["main"]
 
 
+def _repodata_path(subdir: str, label: str) -> str:
+    if label == "main":
+        return f"{subdir}/repodata.json"
+    return f"label/{label}/{subdir}/repodata.json"
+
+
+def _lock_for(path: Path) -> FileLock:
+    return FileLock(path.with_name(f".{path.name}.lock"))
+
+
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@instrumentation.instrumented
 def fetch_repodata(
     subdirs: Iterable[str] = SUBDIRS,
     force_download: bool = False,
-    cache_dir: str | Path = CACHE_DIR,
+    cache_dir: str | Path | None = None,
     label: str = "main",
 ) -> list[Path]:
+    """Download repodata into the cache, unless it is already there.
+
+    Files are written atomically, so concurrent readers always see a complete
+    file, and downloads of the same file by several threads or processes are
+    serialized with a lock file: whoever waited for the lock reuses the file
+    fetched in the meantime instead of downloading it again.
+
+    Returns the paths of the ``{subdir}.{label}.json`` files. The cache
+    directory defaults to ``CACHE_DIR``.
+    """
     assert all(subdir in SUBDIRS for subdir in subdirs)
     paths = []
     for subdir in subdirs:
-        if label == "main":
-            repodata = f"https://conda.anaconda.org/conda-forge/{subdir}/repodata.json"
-        else:
-            repodata = (
-                "https://conda.anaconda.org/conda-forge/"
-                f"label/{label}/{subdir}/repodata.json"
-            )
-        local_fn = Path(cache_dir, f"{subdir}.{label}.json")
-        local_fn_bz2 = Path(str(local_fn) + ".bz2")
+        repodata = _repodata_path(subdir, label)
+        local_fn = Path(cache_dir or CACHE_DIR, f"{subdir}.{label}.json")
         paths.append(local_fn)
-        if force_download or not local_fn.exists():
+        before = _mtime_ns(local_fn)
+        if not force_download and before is not None:
+            continue
+        with _lock_for(local_fn):
+            current = _mtime_ns(local_fn)
+            if current is not None and (not force_download or current != before):
+                continue
             logger.info("Downloading %s to %s", repodata, local_fn)
-            local_fn.parent.mkdir(parents=True, exist_ok=True)
-            # Download the file
-            urlretrieve(f"{repodata}.bz2", local_fn_bz2)
-            with open(local_fn_bz2, "rb") as compressed, open(local_fn, "wb") as f:
-                f.write(bz2.decompress(compressed.read()))
-            local_fn_bz2.unlink()
+            endpoints.with_channel_failover(
+                "conda-forge",
+                lambda channel: download(
+                    f"{channel}/{repodata}.bz2", local_fn, decompress_bz2=True
+                ),
+            )
     return paths
 
 
+def evict_cache(
+    max_bytes: int,
+    cache_dir: str | Path | None = None,
+    keep_labels: Iterable[str] = ("main",),
+) -> list[str]:
+    """Delete the least recently fetched labels until the cache fits ``max_bytes``.
+
+    All the subdirs of a label are evicted together. Labels in ``keep_labels``
+    are never evicted, so the cache may stay larger than ``max_bytes``.
+
+    Returns the evicted labels.
+    """
+    keep = set(keep_labels)
+    labels: dict[str, list[tuple[Path, os.stat_result]]] = {}
+    total = 0
+    for path in Path(cache_dir or CACHE_DIR).glob("*.json"):
+        subdir, _, rest = path.name.partition(".")
+        label = rest[: -len(".json")]
+        if subdir not in SUBDIRS or not label or "." in label:
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        labels.setdefault(label, []).append((path, stat))
+        total += stat.st_size
+
+    evicted = []
+    by_age = sorted(
+        (label for label in labels if label not in keep),
+        key=lambda label: max(stat.st_mtime for _, stat in labels[label]),
+    )
+    for label in by_age:
+        if total <= max_bytes:
+            break
+        for path, stat in labels[label]:
+            with _lock_for(path):
+                path.unlink(missing_ok=True)
+            total -= stat.st_size
+        evicted.append(label)
+        logger.info("Evicted label %s from the repodata cache", label)
+    return evicted
+
+
+def _read_manifest(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logger.warning("Ignoring corrupted mirror manifest %s", path)
+        return {}
+
+
+def _write_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.part")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def mirror(
+    labels: Iterable[str] = ("main",),
+    subdirs: Iterable[str] = SUBDIRS,
+    cache_dir: str | Path | None = None,
+    jobs: int = 10,
+    per_host: int = 6,
+    max_bytes_per_second: float | None = None,
+    max_age: float | None = None,
+) -> dict[str, int]:
+    """Download the repodata of many labels into the cache, resumably.
+
+    Files are downloaded concurrently and written atomically. Each completed
+    file is recorded in ``mirror-manifest.json`` in ``cache_dir``, so an
+    interrupted run picks up where it stopped when started again.
+
+    Parameters
+    ----------
+    labels : iterable of str, optional
+        The labels to mirror, e.g. ``all_labels()``. The default is ``("main",)``.
+    subdirs : iterable of str, optional
+        The subdirs to mirror. The default is all of them.
+    cache_dir : str or Path, optional
+        The repodata cache directory. The default is ``CACHE_DIR``.
+    jobs : int, optional
+        The number of concurrent downloads. The default is 10.
+    per_host : int, optional
+        The maximum number of concurrent downloads from a single host.
+        The default is 6.
+    max_bytes_per_second : float, optional
+        A cap on the total download bandwidth. The default is no cap.
+    max_age : float, optional
+        Files mirrored less than ``max_age`` seconds ago are kept, older ones
+        are downloaded again. The default (None) keeps every mirrored file, so
+        only missing files are downloaded.
+
+    Returns
+    -------
+    summary : dict
+        The number of ``fetched``, ``skipped`` and ``failed`` files and the
+        number of ``bytes`` transferred.
+    """
+    labels, subdirs = tuple(labels), tuple(subdirs)
+    assert all(subdir in SUBDIRS for subdir in subdirs)
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / "mirror-manifest.json"
+    manifest = _read_manifest(manifest_path)
+    manifest_lock = threading.Lock()
+
+    now = time.time()
+    todo = []
+    for label, subdir in product(labels, subdirs):
+        name = f"{subdir}.{label}.json"
+        fetched_at = manifest.get(name, {}).get("fetched_at")
+        if (
+            fetched_at is not None
+            and (cache_dir / name).exists()
+            and (max_age is None or now - fetched_at < max_age)
+        ):
+            continue
+        todo.append((label, subdir))
+
+    progress = Progress(len(todo))
+    bucket = TokenBucket(max_bytes_per_second) if max_bytes_per_second else None
+    limit_host = HostLimiter(per_host)
+
+    def fetch(label: str, subdir: str) -> None:
+        name = f"{subdir}.{label}.json"
+        path = f"{_repodata_path(subdir, label)}.bz2"
+
+        def fetch_from(channel: str) -> int:
+            url = f"{channel}/{path}"
+            with limit_host(url):
+                return download(
+                    url,
+                    cache_dir / name,
+                    decompress_bz2=True,
+                    bucket=bucket,
+                    progress=progress,
+                )
+
+        with _lock_for(cache_dir / name):
+            nbytes = endpoints.with_channel_failover("conda-forge", fetch_from)
+        with manifest_lock:
+            manifest[name] = {"fetched_at": time.time(), "bytes": nbytes}
+            _write_manifest(manifest_path, manifest)
+
+    n_skipped = len(labels) * len(subdirs) - len(todo)
+    logger.info(
+        "Mirroring %d repodata files (%d already up to date)", len(todo), n_skipped
+    )
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(fetch, label, subdir): f"{subdir}.{label}.json"
+            for label, subdir in todo
+        }
+        for future in as_completed(futures):
+            name = futures.pop(future)
+            try:
+                future.result()
+            except Exception as exc:
+                logger.warning("Could not mirror %s", name, exc_info=exc)
+                progress.finish(name, ok=False)
+            else:
+                progress.finish(name)
+
+    return {
+        "fetched": progress.done,
+        "skipped": n_skipped,
+        "failed": progress.failed,
+        "bytes": progress.nbytes,
+    }
+
+
+def _load_repodata(path: Path) -> dict[str, Any]:
+    with instrumentation.span("parse", "repodata", file=path.name) as span:
+        text = path.read_text()
+        span.set(bytes=len(text))
+        return json.loads(text)
+
+
 def _iter_repodatas(
     repodata_jsons: Iterable[str | Path],
     include_broken: bool = True,
@@ -102,7 +329,7 @@ def _iter_repodatas(
         assert subdir in SUBDIRS, (
             "Invalid repodata file name. Must be '<subdir>.<label>.json'."
         )
-        data = json.loads(repodata.read_text())
+        data = _load_repodata(repodata)
         keys = ["packages", "packages.conda"]
         if include_broken:
             keys.append("removed")
@@ -125,10 +352,146 @@ def list_artifacts(
         yield f"{subdir}/{fn}"
 
 
+def iter_artifact_keys(
+    repodata_jsons: Iterable[str | Path],
+    channel: str = "conda-forge",
+    include_broken: bool = True,
+) -> Iterable[ArtifactKey]:
+    """Yield the parsed ``ArtifactKey`` of every artifact in some repodata files.
+
+    Entries whose filename is not ``name-version-build`` are skipped.
+    """
+    for label, subdir, fn, _ in _iter_repodatas(
+        repodata_jsons=repodata_jsons, include_broken=include_broken
+    ):
+        try:
+            key = ArtifactKey.parse(fn, subdir, channel, label)
+        except ValueError:
+            logger.warning("Skipping malformed artifact %s/%s in %s", subdir, fn, label)
+            continue
+        yield key
+
+
 def repodata(subdir: str) -> dict[str, Any]:
     assert subdir in SUBDIRS
     path = fetch_repodata(subdirs=(subdir,))[0]
-    return json.loads(path.read_text())
+    return _load_repodata(path)
+
+
+def _split_dependency(dep: str) -> tuple[str, str]:
+    """Split a ``depends`` entry like ``openssl >=3.0.0,<4.0a0`` into name and spec."""
+    name, _, rest = dep.strip().partition(" ")
+    return name, rest.strip().split(" ", 1)[0] or "*"
+
+
+class _RepodataIndex:
+    """Records of one repodata file, indexed by name and by dependency name."""
+
+    __slots__ = ("records", "by_name", "by_dependency")
+
+    def __init__(self, path: Path) -> None:
+        data = _load_repodata(path)
+        self.records: list[tuple[str, dict[str, Any]]] = []
+        self.by_name: dict[str, list[int]] = {}
+        self.by_dependency: dict[str, list[int]] = {}
+        for key in ("packages", "packages.conda"):
+            for fn, record in data.get(key, {}).items():
+                i = len(self.records)
+                self.records.append((fn, record))
+                name = record.get("name") or split_artifact_filename(fn)[0]
+                self.by_name.setdefault(name, []).append(i)
+                for dep_name in {
+                    _split_dependency(dep)[0] for dep in record.get("depends", ())
+                }:
+                    self.by_dependency.setdefault(dep_name, []).append(i)
+
+
+@ttl_cache(ttl=None, maxsize=4 * len(SUBDIRS))
+def _repodata_index(path: str, mtime_ns: int, size: int) -> _RepodataIndex:
+    # mtime and size are part of the cache key so refreshed files are reindexed
+    return _RepodataIndex(Path(path))
+
+
+def query(
+    name: str | None = None,
+    version_spec: str | None = None,
+    build: str | None = None,
+    depends_on: str | None = None,
+    subdirs: Iterable[str] = SUBDIRS,
+    labels: Iterable[str] = ("main",),
+    cache_dir: str | Path | None = None,
+) -> list[tuple[str, str, str, dict[str, Any]]]:
+    """Find the repodata records matching some criteria.
+
+    The repodata is fetched into the cache if needed. Each cached file is
+    indexed by package name and by dependency name once, so repeated queries
+    only look at the matching records.
+
+    Parameters
+    ----------
+    name : str, optional
+        The exact package name.
+    version_spec : str, optional
+        A conda version spec the record version must match, e.g. ``">=1.2,<2"``.
+    build : str, optional
+        A glob the build string must match, e.g. ``"*_cp312"``.
+    depends_on : str, optional
+        A dependency name, optionally followed by a space and a version, e.g.
+        ``"openssl"`` or ``"openssl 3.3.1"``. Records must depend on the package
+        and, if a version is given, their constraint must allow it.
+    subdirs : iterable of str, optional
+        The subdirs to search. The default is all of them.
+    labels : iterable of str, optional
+        The labels to search. The default is ``("main",)``.
+    cache_dir : str or Path, optional
+        The repodata cache directory. The default is ``CACHE_DIR``.
+
+    Returns
+    -------
+    records : list of tuple
+        ``(label, subdir, filename, record)`` tuples of the matching records.
+    """
+    dep_name, dep_version = None, None
+    if depends_on is not None:
+        dep_name, _, dep_version = depends_on.strip().partition(" ")
+        dep_version = dep_version.strip() or None
+
+    subdirs = tuple(subdirs)
+    results = []
+    for label in labels:
+        paths = fetch_repodata(subdirs=subdirs, cache_dir=cache_dir, label=label)
+        for path in paths:
+            subdir = path.name.split(".")[0]
+            stat = path.stat()
+            index = _repodata_index(str(path), stat.st_mtime_ns, stat.st_size)
+            candidates: Iterable[int]
+            if name is not None:
+                candidates = index.by_name.get(name, [])
+                if dep_name is not None:
+                    dependents = set(index.by_dependency.get(dep_name, ()))
+                    candidates = [i for i in candidates if i in dependents]
+            elif dep_name is not None:
+                candidates = index.by_dependency.get(dep_name, [])
+            else:
+                candidates = range(len(index.records))
+
+            for i in candidates:
+                fn, record = index.records[i]
+                if version_spec is not None and not version_matches(
+                    record.get("version", ""), version_spec
+                ):
+                    continue
+                if build is not None and not fnmatchcase(
+                    record.get("build", ""), build
+                ):
+                    continue
+                if dep_version is not None and not any(
+                    dn == dep_name and version_matches(dep_version, spec)
+                    for dn, spec in map(_split_dependency, record.get("depends", ()))
+                ):
+                    continue
+                results.append((label, subdir, fn, record))
+    return results
 
 
 @deprecated(
@@ -155,13 +518,70 @@ def aggregated(
     reports: Iterable[Literal["artifacts", "names", "size"]],
     labels: Iterable[str] = ("main",),
     include_broken: bool = True,
+    max_workers: int = 10,
+    store: RecordStore | None = None,
 ) -> dict[str, int]:
+    """Aggregate statistics about the artifacts in some labels.
+
+    Parameters
+    ----------
+    reports : iterable of {"artifacts", "names", "size"}
+        The statistics to compute: the number of artifacts, the number of
+        distinct package names and the total size of the artifacts.
+    labels : iterable of str, optional
+        The labels to aggregate. The default is ``("main",)``.
+    include_broken : bool, optional
+        Whether to count the artifacts listed as removed. The default is True.
+    max_workers : int, optional
+        The number of concurrent repodata downloads. The default is 10.
+    store : RecordStore, optional
+        If given, the repodata files are added to this record store (which
+        skips the ones that did not change) and the reports are computed from
+        it, instead of parsing every file. The files in ``CACHE_DIR`` are
+        used as they are; the repodata that is neither there nor in the store
+        yet is downloaded to a temporary directory and deleted once stored,
+        so the store holds the only copy.
+
+    Returns
+    -------
+    result : dict
+        The value of each report.
+    """
+    if store is not None:
+        labels = tuple(labels)
+        stored = set(store.manifests())
+        cached, missing = [], []
+        for label, subdir in product(labels, SUBDIRS):
+            path = Path(CACHE_DIR, f"{subdir}.{label}.json")
+            if path.is_file():
+                cached.append(path)
+            elif (label, subdir) not in stored:
+                missing.append((label, subdir))
+        for path in cached:
+            store.add_repodata(path)
+        if missing:
+            Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+            # in the cache directory, so large files do not fill up /tmp
+            with (
+                tempfile.TemporaryDirectory(dir=CACHE_DIR, prefix=".store-") as tmp,
+                ThreadPoolExecutor(max_workers=max_workers) as executor,
+            ):
+                futures = [
+                    executor.submit(fetch_repodata, (subdir,), False, tmp, label)
+                    for label, subdir in missing
+                ]
+                for future in as_completed(futures):
+                    for path in future.result():
+                        store.add_repodata(path)
+        reports = [r for r in ("artifacts", "names", "size") if r in reports]
+        return store.aggregated(reports, labels, SUBDIRS, include_broken)
+
     with_artifacts = "artifacts" in reports
     with_names = "names" in reports
     with_size = "size" in reports
     seen_artifacts, seen_names, size = set(), set(), 0
     futures = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
         for label, subdir in product(labels, SUBDIRS):
             future = executor.submit(fetch_repodata, (subdir,), False, CACHE_DIR, label)
             futures.append(future)
@@ -172,10 +592,15 @@ def aggregated(
             ):
                 if with_artifacts:
                     seen_artifacts.add(
-                        f"{label}/{subdir}/{fn}/{record.get('sha256') or record.get('md5') or ''}"
+                        (
+                            label,
+                            subdir,
+                            fn,
+                            record.get("sha256") or record.get("md5") or "",
+                        )
                     )
                 if with_names:
-                    seen_names.add(record.get("name") or fn.rsplit("-", 2)[0])
+                    seen_names.add(record.get("name") or split_artifact_filename(fn)[0])
                 if with_size:
                     size += record.get("size") or 0  # type: ignore
 
@@ -188,3 +613,82 @@ def aggregated(
         result["size"] = size
 
     return result
+
+
+def _add_mirror_arguments(mirror_parser: argparse.ArgumentParser) -> None:
+    mirror_parser.add_argument(
+        "--labels",
+        nargs="+",
+        default=["main"],
+        help="The labels to mirror, or 'all' for every label. Default: main.",
+    )
+    mirror_parser.add_argument(
+        "--subdirs", nargs="+", default=list(SUBDIRS), choices=SUBDIRS
+    )
+    mirror_parser.add_argument(
+        "--cache-dir", type=Path, default=None, help=f"Default: {CACHE_DIR}."
+    )
+    mirror_parser.add_argument(
+        "--jobs", "-j", type=int, default=10, help="Concurrent downloads."
+    )
+    mirror_parser.add_argument(
+        "--per-host", type=int, default=6, help="Concurrent downloads per host."
+    )
+    mirror_parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="Bandwidth cap in MB/s. Default: unlimited.",
+    )
+    mirror_parser.add_argument(
+        "--max-age",
+        type=float,
+        default=None,
+        help="Re-download files mirrored more than this many seconds ago.",
+    )
+
+
+def _mirror_command(args: argparse.Namespace) -> dict[str, int]:
+    labels = all_labels() if args.labels == ["all"] else args.labels
+    return mirror(
+        labels=labels,
+        subdirs=args.subdirs,
+        cache_dir=args.cache_dir,
+        jobs=args.jobs,
+        per_host=args.per_host,
+        max_bytes_per_second=args.max_rate * 1e6 if args.max_rate else None,
+        max_age=args.max_age,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m conda_forge_metadata.repodata",
+        description="Work with conda-forge repodata.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    _add_mirror_arguments(
+        commands.add_parser(
+            "mirror", help="Download the repodata of many labels into a local cache."
+        )
+    )
+    args = parser.parse_args(argv)
+
+    import logging
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    summary = _mirror_command(args)
+    logger.info(
+        "Fetched %d files (%.1f MB), %d up to date, %d failed",
+        summary["fetched"],
+        summary["bytes"] / 1e6,
+        summary["skipped"],
+        summary["failed"],
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Export repodata to Arrow tables and Parquet files.
+
+This module needs ``pyarrow``, which is an optional dependency
+(``pip install conda-forge-metadata[arrow]``).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+
+from conda_forge_metadata.repodata import SUBDIRS, _iter_repodatas, fetch_repodata
+from conda_forge_metadata.types import split_artifact_filename
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = getLogger(__name__)
+
+BATCH_SIZE = 65_536
+
+# repodata timestamps are in ms, but some old records use seconds
+_MS_THRESHOLD = 100_000_000_000
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required for Arrow/Parquet support; "
+            "install conda-forge-metadata[arrow]"
+        ) from e
+    return pyarrow
+
+
+def repodata_schema() -> pa.Schema:
+    """The schema of the tables of repodata records."""
+    pa = _import_pyarrow()
+    return pa.schema(
+        [
+            ("label", pa.string()),
+            ("subdir", pa.string()),
+            ("fn", pa.string()),
+            ("name", pa.string()),
+            ("version", pa.string()),
+            ("build", pa.string()),
+            ("build_number", pa.int64()),
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("size", pa.int64()),
+            ("sha256", pa.string()),
+            ("depends", pa.list_(pa.string())),
+            ("broken", pa.bool_()),
+        ]
+    )
+
+
+def _timestamp_ms(value: Any) -> int | None:
+    if not value:
+        return None
+    value = int(value)
+    return value if value >= _MS_THRESHOLD else value * 1000
+
+
+def iter_record_batches(
+    repodata_jsons: Iterable[str | Path],
+    include_broken: bool = True,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """Convert repodata files to Arrow record batches of at most ``batch_size`` rows.
+
+    Only one repodata file and one batch of rows are held in memory at a
+    time. Removed (broken) artifacts only have their ``label``, ``subdir``,
+    ``fn`` and ``name`` set, and ``broken`` is true.
+    """
+    pa = _import_pyarrow()
+    schema = repodata_schema()
+    columns: dict[str, list[Any]] = {name: [] for name in schema.names}
+
+    def flush() -> pa.RecordBatch:
+        batch = pa.RecordBatch.from_pydict(columns, schema=schema)
+        for values in columns.values():
+            values.clear()
+        return batch
+
+    for label, subdir, fn, record in _iter_repodatas(
+        repodata_jsons, include_broken=include_broken
+    ):
+        columns["label"].append(label)
+        columns["subdir"].append(subdir)
+        columns["fn"].append(fn)
+        columns["name"].append(record.get("name") or split_artifact_filename(fn)[0])
+        columns["version"].append(record.get("version"))
+        columns["build"].append(record.get("build"))
+        columns["build_number"].append(record.get("build_number"))
+        columns["timestamp"].append(_timestamp_ms(record.get("timestamp")))
+        columns["size"].append(record.get("size"))
+        columns["sha256"].append(record.get("sha256"))
+        columns["depends"].append(record.get("depends") if record else None)
+        columns["broken"].append(not record)
+        if len(columns["fn"]) >= batch_size:
+            yield flush()
+    if columns["fn"]:
+        yield flush()
+
+
+def _repodata_paths(
+    labels: Iterable[str], subdirs: Iterable[str], cache_dir: str | Path | None
+) -> list[Path]:
+    subdirs = tuple(subdirs)
+    paths = []
+    for label in labels:
+        paths.extend(fetch_repodata(subdirs=subdirs, cache_dir=cache_dir, label=label))
+    return paths
+
+
+def export(
+    dest: str | Path,
+    labels: Iterable[str] = ("main",),
+    subdirs: Iterable[str] = SUBDIRS,
+    cache_dir: str | Path | None = None,
+    include_broken: bool = True,
+    format: Literal["parquet", "arrow"] = "parquet",
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """Write the repodata of some labels to a Parquet or Arrow IPC file.
+
+    The repodata is fetched into the cache if needed. Rows are written in
+    row groups (record batches) of ``batch_size`` rows, so memory use does
+    not grow with the number of labels. The file is written atomically.
+
+    Parameters
+    ----------
+    dest : str or Path
+        The output file.
+    labels : iterable of str, optional
+        The labels to export. The default is ``("main",)``.
+    subdirs : iterable of str, optional
+        The subdirs to export. The default is all of them.
+    cache_dir : str or Path, optional
+        The repodata cache directory. The default is ``repodata.CACHE_DIR``.
+    include_broken : bool, optional
+        Whether to include removed artifacts. The default is True.
+    format : {"parquet", "arrow"}, optional
+        The file format. The default is "parquet".
+    batch_size : int, optional
+        The number of rows per row group.
+
+    Returns
+    -------
+    n_rows : int
+        The number of rows written.
+    """
+    pa = _import_pyarrow()
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.part")
+    schema = repodata_schema()
+    paths = _repodata_paths(labels, subdirs, cache_dir)
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(tmp, schema)
+    elif format == "arrow":
+        writer = pa.ipc.new_file(tmp, schema)
+    else:
+        raise ValueError(f"Unknown format {format!r}")
+
+    n_rows = 0
+    try:
+        with writer:
+            for batch in iter_record_batches(paths, include_broken, batch_size):
+                writer.write_batch(batch)
+                n_rows += batch.num_rows
+        tmp.replace(dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    logger.info("Exported %d repodata records to %s", n_rows, dest)
+    return n_rows
+
+
+def read_table(path: str | Path) -> pa.Table:
+    """Read a file written by ``export``, whatever its format."""
+    pa = _import_pyarrow()
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == b"PAR1":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def load_table(
+    labels: Iterable[str] = ("main",),
+    subdirs: Iterable[str] = SUBDIRS,
+    cache_dir: str | Path | None = None,
+    include_broken: bool = True,
+) -> pa.Table:
+    """Load the repodata of some labels into an in-memory Arrow table."""
+    pa = _import_pyarrow()
+    paths = _repodata_paths(labels, subdirs, cache_dir)
+    return pa.Table.from_batches(
+        iter_record_batches(paths, include_broken), schema=repodata_schema()
+    )
+
+
+GroupBy = Literal["label", "subdir", "name", "month"]
+
+
+def _with_month(table: pa.Table) -> pa.Table:
+    import pyarrow.compute as pc
+
+    pa = _import_pyarrow()
+    # timestamps are UTC, so format them as naive timestamps
+    naive = table["timestamp"].cast(pa.timestamp("ms"))
+    return table.append_column("month", pc.strftime(naive, format="%Y-%m"))
+
+
+def _totals(table: pa.Table) -> pa.Table:
+    pa = _import_pyarrow()
+    import pyarrow.compute as pc
+
+    return pa.table(
+        {
+            "artifacts": [table.num_rows],
+            "names": [pc.count_distinct(table["name"]).as_py()],
+            "size": [pc.sum(table["size"]).as_py() or 0],
+        }
+    )
+
+
+def grouped_report(table: pa.Table, by: Iterable[GroupBy] = ()) -> pa.Table:
+    """Count artifacts, distinct names and total size per group.
+
+    Parameters
+    ----------
+    table : pyarrow.Table
+        A table of repodata records, as returned by ``load_table``.
+    by : iterable of {"label", "subdir", "name", "month"}, optional
+        The columns to group by. ``month`` is the upload month (``YYYY-MM``),
+        null for records without a timestamp. With no columns, a single row
+        of totals is returned.
+
+    Returns
+    -------
+    report : pyarrow.Table
+        The group columns followed by the ``artifacts``, ``names`` and
+        ``size`` columns, sorted by the group columns.
+    """
+    import pyarrow.compute as pc
+
+    by = list(by)
+    if not by:
+        return _totals(table)
+    if "month" in by:
+        table = _with_month(table)
+    report = table.group_by(by).aggregate(
+        [("fn", "count"), ("name", "count_distinct"), ("size", "sum")]
+    )
+    report = report.select(by + ["fn_count", "name_count_distinct", "size_sum"])
+    report = report.rename_columns(by + ["artifacts", "names", "size"])
+    report = report.set_column(
+        len(by) + 2, "size", pc.fill_null(report["size"], 0).cast("int64")
+    )
+    return report.sort_by([(column, "ascending") for column in by])
+
+
+def top_packages(table: pa.Table, n: int = 10) -> pa.Table:
+    """Get the ``n`` packages with the largest total size of artifacts.
+
+    Returns a table with the ``name``, ``artifacts`` and ``size`` columns,
+    largest first.
+    """
+    report = grouped_report(table, ["name"]).drop_columns(["names"])
+    return report.sort_by([("size", "descending"), ("name", "ascending")]).slice(0, n)
+
+
+def reports(
+    group_by: Iterable[GroupBy] = ("label", "subdir", "month"),
+    top_n: int = 10,
+    labels: Iterable[str] = ("main",),
+    subdirs: Iterable[str] = SUBDIRS,
+    cache_dir: str | Path | None = None,
+    include_broken: bool = True,
+    table: pa.Table | None = None,
+) -> dict[str, pa.Table]:
+    """Compute a set of reports from a single load of the repodata.
+
+    Parameters
+    ----------
+    group_by : iterable of {"label", "subdir", "name", "month"}, optional
+        The dimensions to report on. Each gets its own report.
+    top_n : int, optional
+        The number of packages in the ``top_packages`` report. 0 skips it.
+    labels, subdirs, cache_dir, include_broken
+        Which repodata to load, as in ``load_table``.
+    table : pyarrow.Table, optional
+        An already loaded table (e.g. from ``read_table``) to use instead.
+
+    Returns
+    -------
+    reports : dict of pyarrow.Table
+        The ``total`` report, one report per ``group_by`` dimension and the
+        ``top_packages`` report.
+    """
+    if table is None:
+        table = load_table(labels, subdirs, cache_dir, include_broken)
+    elif not include_broken:
+        import pyarrow.compute as pc
+
+        table = table.filter(pc.invert(table["broken"]))
+    result = {"total": grouped_report(table)}
+    for dimension in group_by:
+        result[dimension] = grouped_report(table, [dimension])
+    if top_n:
+        result["top_packages"] = top_packages(table, top_n)
+    return result
@@ -1,28 +1,54 @@
 """Use conda-package-streaming to fetch package metadata"""
 
 from contextlib import closing
+from typing import Any
 
 import requests
 from conda_package_streaming.package_streaming import stream_conda_component
 from conda_package_streaming.url import conda_reader_for_url
+from conda_package_streaming.url import session as default_session
+
+from conda_forge_metadata import instrumentation
+from conda_forge_metadata.endpoints import with_channel_failover
+
+
+class _CountingSession:
+    """Add the size of every response of a session to a span."""
+
+    def __init__(self, session: requests.Session, span: instrumentation.Span) -> None:
+        self._session = session
+        self._span = span
+
+    def _count(self, response: requests.Response, *args: Any, **kwargs: Any) -> None:
+        self._span.add("requests", 1)
+        self._span.add("bytes", int(response.headers.get("Content-Length", 0)))
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self._session.get(url, hooks={"response": self._count}, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
 
 
 def get_streamed_artifact_data(
     channel: str, subdir: str, artifact: str, session: requests.Session | None = None
 ):
-    if not channel.startswith("http"):
-        if channel in ("pkgs/main", "pkgs/r", "pkgs/msys2"):
-            channel = f"https://repo.anaconda.com/{channel}"
-        else:
-            channel = f"https://conda.anaconda.org/{channel}"
-
-    # .conda artifacts can be streamed directly from an anaconda.org channel
-    url = f"{channel}/{subdir}/{artifact}"
-
-    session_arg = [session] if session is not None else []
-    filename, conda = conda_reader_for_url(
-        url, *session_arg, fall_back_to_full_download=True
-    )
-
-    with closing(conda):
-        yield from stream_conda_component(filename, conda, component="info")
+    with instrumentation.span("fetch", "streamed", artifact=artifact) as span:
+        if span:
+            session = _CountingSession(  # type: ignore[assignment]
+                session or default_session, span
+            )
+
+        # .conda artifacts can be streamed directly from an anaconda.org channel
+        session_arg = [session] if session is not None else []
+        filename, conda = with_channel_failover(
+            channel,
+            lambda url: conda_reader_for_url(
+                f"{url}/{subdir}/{artifact}",
+                *session_arg,
+                fall_back_to_full_download=True,
+            ),
+        )
+
+        with closing(conda):
+            yield from stream_conda_component(filename, conda, component="info")
@@ -0,0 +1,476 @@
+"""A local stand-in for the remote data sources, for offline tests and benchmarks.
+
+``FakeChannelServer`` serves a directory over HTTP on localhost, with support
+for range requests (so ``.conda`` artifacts can be streamed) and ``ETag``
+revalidation, and has helpers to fill it with synthetic repodata, ``.conda``
+artifacts, feedstock-outputs shards and bot-data mappings. Point the library
+at it with the environment variables returned by ``FakeChannelServer.environ``::
+
+    with FakeChannelServer() as server:
+        server.add_repodata({"pkg-1.0-0.conda": {"name": "pkg"}})
+        os.environ.update(server.environ())
+        fetch_repodata(subdirs=("noarch",))
+"""
+
+from __future__ import annotations
+
+import bz2
+import hashlib
+import io
+import json
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from collections.abc import Iterable, Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import unquote, urlsplit
+
+from conda_forge_metadata.endpoints import env_var
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+# where each source is served, relative to the server URL
+_SOURCE_PATHS = {
+    "conda": "conda",
+    "feedstock_outputs": "feedstock-outputs",
+    "bot_data": "bot-data",
+    "by_the_numbers": "by-the-numbers",
+    "libcfgraph": "libcfgraph",
+}
+
+
+class RequestRecord(NamedTuple):
+    method: str
+    path: str
+    status: int
+    nbytes: int
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Server
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self._serve(body=False)
+
+    def do_GET(self) -> None:
+        self._serve(body=True)
+
+    def _serve(self, body: bool) -> None:
+        fake = self.server.fake
+        if fake.latency:
+            time.sleep(fake.latency)
+        path = unquote(urlsplit(self.path).path)
+        if fake.error_status is not None:
+            self._send(fake.error_status, b"", {}, body, path)
+            return
+        file = (fake.root / path.lstrip("/")).resolve()
+        if not file.is_relative_to(fake.root) or not file.is_file():
+            self._send(404, b"", {}, body, path)
+            return
+        data = file.read_bytes()
+        stat = file.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", headers, body, path)
+            return
+        match = _RANGE.match(self.headers.get("Range", ""))
+        if match is None or match.groups() == ("", ""):
+            self._send(200, data, headers, body, path)
+            return
+        first, last = match.groups()
+        size = len(data)
+        if first:
+            start, end = int(first), min(int(last or size - 1), size - 1)
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        if start >= size or start > end:
+            headers["Content-Range"] = f"bytes */{size}"
+            self._send(416, b"", headers, body, path)
+            return
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        self._send(206, data[start : end + 1], headers, body, path)
+
+    def _send(
+        self, status: int, data: bytes, headers: dict[str, str], body: bool, path: str
+    ) -> None:
+        # recorded first, so clients that got the response see the record
+        self.server.fake._record(
+            RequestRecord(self.command, path, status, len(data) if body else 0)
+        )
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if body and status != 304:
+            self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: FakeChannelServer
+
+
+def _tar_zst(members: Mapping[str, bytes]) -> bytes:
+    import zstandard
+
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return zstandard.ZstdCompressor().compress(buf.getvalue())
+
+
+def make_conda_package(
+    name: str,
+    version: str = "1.0",
+    build: str = "0",
+    subdir: str = "noarch",
+    files: Mapping[str, bytes] | None = None,
+    depends: Iterable[str] = (),
+    about: Mapping[str, Any] | None = None,
+    extra_info: Mapping[str, bytes] | None = None,
+) -> tuple[str, bytes, dict[str, Any]]:
+    """Build a ``.conda`` artifact.
+
+    Parameters
+    ----------
+    name, version, build, subdir : str
+        The package name, version, build string and subdir.
+    files : dict of str to bytes, optional
+        The files of the package, by path.
+    depends : iterable of str, optional
+        The dependencies of the package.
+    about : dict, optional
+        The content of ``info/about.json``.
+    extra_info : dict of str to bytes, optional
+        More files of the ``info`` directory, by path relative to it
+        (e.g. ``{"recipe/meta.yaml": b"..."}``).
+
+    Returns
+    -------
+    filename : str
+        The artifact filename.
+    data : bytes
+        The content of the artifact.
+    record : dict
+        The repodata record of the artifact.
+    """
+    files = dict(files or {})
+    stem = f"{name}-{version}-{build}"
+    # conda-build puts the build number after the last "_"
+    tail = build.rsplit("_", 1)[-1]
+    build_number = int(tail) if tail.isdigit() else 0
+    index = {
+        "name": name,
+        "version": version,
+        "build": build,
+        "build_number": build_number,
+        "depends": list(depends),
+        "subdir": subdir,
+        "license": "BSD-3-Clause",
+        "timestamp": 1700000000000,
+    }
+    paths = {
+        "paths": [
+            {
+                "_path": path,
+                "path_type": "hardlink",
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "size_in_bytes": len(data),
+            }
+            for path, data in files.items()
+        ],
+        "paths_version": 1,
+    }
+    info = {
+        "info/index.json": json.dumps(index).encode(),
+        "info/about.json": json.dumps(dict(about or {})).encode(),
+        "info/paths.json": json.dumps(paths).encode(),
+        "info/files": "".join(f"{path}\n" for path in files).encode(),
+    }
+    for path, data in (extra_info or {}).items():
+        info[f"info/{path}"] = data
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as conda:
+        conda.writestr("metadata.json", json.dumps({"conda_pkg_format_version": 2}))
+        conda.writestr(f"pkg-{stem}.tar.zst", _tar_zst(files))
+        # last, as readers of the central directory at the end look for it first
+        conda.writestr(f"info-{stem}.tar.zst", _tar_zst(info))
+    data = buf.getvalue()
+    record = {
+        **index,
+        "md5": hashlib.md5(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+    }
+    return f"{stem}.conda", data, record
+
+
+class FakeChannelServer:
+    """Serve a directory over HTTP on localhost, like the remote data sources.
+
+    The server runs in a daemon thread and answers ``GET`` and ``HEAD``
+    requests for the files under ``root``, with single range requests,
+    ``ETag`` and ``If-None-Match`` support. Every request is recorded in
+    ``requests``.
+
+    Parameters
+    ----------
+    root : str or Path, optional
+        The directory to serve. The default is a temporary directory, deleted
+        when the server is closed.
+    latency : float, optional
+        Seconds to wait before answering each request, to simulate a remote
+        server. The default is 0.
+    error_status : int, optional
+        If set, every request is answered with this HTTP status, to simulate
+        a failing server. It can be changed while the server runs.
+    host : str, optional
+        The address to listen on. The default is "127.0.0.1".
+    port : int, optional
+        The port to listen on. The default is a free port.
+    """
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        latency: float = 0.0,
+        error_status: int | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self._tmp = root is None
+        self.root = Path(tempfile.mkdtemp() if root is None else root).resolve()
+        self.latency = latency
+        self.error_status = error_status
+        self.requests: list[RequestRecord] = []
+        self._lock = threading.Lock()
+        self._labels: set[str] = set()
+        self._server = _Server((host, port), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-channel", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> FakeChannelServer:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        if self._tmp:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def environ(self) -> dict[str, str]:
+        """The environment variables that point the library at this server."""
+        return {
+            env_var(source): f"{self.url}/{path}"
+            for source, path in _SOURCE_PATHS.items()
+        }
+
+    def _record(self, record: RequestRecord) -> None:
+        with self._lock:
+            self.requests.append(record)
+
+    def add_file(self, path: str, data: bytes | str) -> Path:
+        """Serve ``data`` at ``path``, relative to the server URL."""
+        file = self.root / path.lstrip("/")
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(data.encode() if isinstance(data, str) else data)
+        return file
+
+    def _channel_path(self, channel: str, subdir: str, label: str = "main") -> str:
+        label_path = "" if label == "main" else f"label/{label}/"
+        return f"{_SOURCE_PATHS['conda']}/{channel}/{label_path}{subdir}"
+
+    def add_repodata(
+        self,
+        packages: Mapping[str, Mapping[str, Any]],
+        subdir: str = "noarch",
+        label: str = "main",
+        channel: str = "conda-forge",
+        removed: Iterable[str] = (),
+    ) -> dict[str, Any]:
+        """Serve the repodata of a channel subdir and label.
+
+        The repodata is served as ``repodata.json``, and compressed as
+        ``repodata.json.bz2`` and ``repodata.json.zst``. The label is also
+        added to the list of labels served as the by-the-numbers data.
+
+        Parameters
+        ----------
+        packages : dict of str to dict
+            The records, by filename. ``.conda`` artifacts are put in
+            ``packages.conda``, the others in ``packages``.
+        subdir, label, channel : str, optional
+            Where to serve the repodata. The defaults are "noarch", "main" and
+            "conda-forge".
+        removed : iterable of str, optional
+            The filenames of the removed (broken) artifacts.
+
+        Returns
+        -------
+        repodata : dict
+            The served repodata.
+        """
+        import zstandard
+
+        repodata = {
+            "info": {"subdir": subdir},
+            "packages": {},
+            "packages.conda": {},
+            "removed": sorted(removed),
+            "repodata_version": 1,
+        }
+        for fn, record in packages.items():
+            key = "packages.conda" if fn.endswith(".conda") else "packages"
+            repodata[key][fn] = dict(record)
+        data = json.dumps(repodata).encode()
+        path = f"{self._channel_path(channel, subdir, label)}/repodata.json"
+        self.add_file(path, data)
+        self.add_file(f"{path}.bz2", bz2.compress(data))
+        self.add_file(f"{path}.zst", zstandard.ZstdCompressor().compress(data))
+        if channel == "conda-forge":
+            self._labels.add(label)
+            self.add_file(
+                f"{_SOURCE_PATHS['by_the_numbers']}/data/labels.json",
+                json.dumps(sorted(self._labels)),
+            )
+        return repodata
+
+    def add_conda_package(
+        self, name: str, channel: str = "conda-forge", **kwargs: Any
+    ) -> tuple[str, dict[str, Any]]:
+        """Build a ``.conda`` artifact with ``make_conda_package`` and serve it.
+
+        The artifact is not added to the repodata; pass the returned record to
+        ``add_repodata`` for that.
+
+        Returns
+        -------
+        filename : str
+            The artifact filename.
+        record : dict
+            The repodata record of the artifact.
+        """
+        fn, data, record = make_conda_package(name, **kwargs)
+        self.add_file(f"{self._channel_path(channel, record['subdir'])}/{fn}", data)
+        return fn, record
+
+    def add_feedstock_outputs(
+        self,
+        outputs: Mapping[str, Iterable[str]],
+        autoreg: Mapping[str, Iterable[str]] | None = None,
+        shard_level: int = 3,
+        shard_fill: str = "z",
+    ) -> None:
+        """Serve the feedstock-outputs repository.
+
+        Parameters
+        ----------
+        outputs : dict of str to iterable of str
+            The feedstocks of each package name.
+        autoreg : dict of str to iterable of str, optional
+            The autoreg allowlist, as globs by feedstock.
+        shard_level, shard_fill : optional
+            The sharding configuration.
+        """
+        from conda_forge_metadata.feedstock_outputs import (
+            FeedstockOutputsConfig,
+            _sharded_path,
+        )
+
+        config: FeedstockOutputsConfig = {
+            "outputs_path": "outputs",
+            "shard_level": shard_level,
+            "shard_fill": shard_fill,
+        }
+        base = _SOURCE_PATHS["feedstock_outputs"]
+        self.add_file(f"{base}/config.json", json.dumps(config))
+        for name, feedstocks in outputs.items():
+            self.add_file(
+                f"{base}/{_sharded_path(name, config)}",
+                json.dumps({"feedstocks": sorted(feedstocks)}),
+            )
+        # JSON is YAML
+        globs = {feedstock: list(pats) for feedstock, pats in (autoreg or {}).items()}
+        self.add_file(
+            f"{base}/feedstock_outputs_autoreg_allowlist.yml", json.dumps(globs)
+        )
+
+    def add_bot_data(
+        self,
+        import_to_pkg: Mapping[str, Iterable[str]] | None = None,
+        pypi_mapping: Iterable[Mapping[str, Any]] = (),
+        ranked_hubs_authorities: Iterable[str] = (),
+        num_letters: int = 2,
+        num_dirs: int = 5,
+    ) -> None:
+        """Serve the conda-forge bot data.
+
+        Parameters
+        ----------
+        import_to_pkg : dict of str to iterable of str, optional
+            The packages that supply each top-level import.
+        pypi_mapping : iterable of dict, optional
+            The PyPI name mapping entries, with at least the ``pypi_name`` and
+            ``conda_name`` keys.
+        ranked_hubs_authorities : iterable of str, optional
+            The package names, most important first.
+        num_letters, num_dirs : int, optional
+            The sharding of the import maps.
+        """
+        from conda_forge_metadata.conda_forge_bot.import_to_pkg import (
+            _get_bot_sharded_path,
+        )
+
+        base = _SOURCE_PATHS["bot_data"]
+        meta = {"num_letters": num_letters, "num_dirs": num_dirs}
+        self.add_file(
+            f"{base}/import_to_pkg_maps/import_to_pkg_maps_meta.json", json.dumps(meta)
+        )
+        shards: dict[str, dict[str, Any]] = {}
+        for import_name, pkgs in (import_to_pkg or {}).items():
+            shard = shards.setdefault(import_name[:num_letters].lower(), {})
+            shard[import_name] = {"elements": sorted(pkgs)}
+        for letters, shard in shards.items():
+            path = _get_bot_sharded_path(
+                f"import_to_pkg_maps/{letters}.json", n_dirs=num_dirs
+            )
+            self.add_file(f"{base}/{path}", json.dumps(shard))
+
+        entries = [dict(entry) for entry in pypi_mapping]
+        self.add_file(f"{base}/mappings/pypi/name_mapping.yaml", json.dumps(entries))
+        self.add_file(
+            f"{base}/mappings/pypi/grayskull_pypi_mapping.json",
+            json.dumps({entry["pypi_name"]: entry for entry in entries}),
+        )
+        self.add_file(
+            f"{base}/ranked_hubs_authorities.json",
+            json.dumps(list(ranked_hubs_authorities)),
+        )
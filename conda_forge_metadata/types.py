@@ -1,6 +1,10 @@
 """Commonly used type annotions for conda-forge-metadata."""
 
-from typing import TypeAlias, TypedDict
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import NamedTuple, TypeAlias, TypedDict
+
+from conda_forge_metadata._cache import register
 
 CondaPackageName: TypeAlias = str
 PypiPackageName: TypeAlias = str
@@ -36,5 +40,79 @@ class ArtifactData(TypedDict):
     # info/recipe/conda_build_config.yaml
     conda_build_config: dict
     # a list of files in the recipe from info/files with elements ending in .pyc or
-    # .txt filtered out.
-    files: "list[str]"
+    # .txt filtered out; a compact PackedPaths sequence if requested.
+    files: "Sequence[str]"
+
+
+ARTIFACT_EXTENSIONS = (".conda", ".tar.bz2")
+
+
+@register
+@lru_cache(maxsize=65536)
+def split_artifact_filename(filename: str) -> "tuple[str, str, str, str]":
+    """Split an artifact filename into its name, version, build and extension.
+
+    ``"openssl-3.3.1-h4ab18f5_0.conda"`` gives
+    ``("openssl", "3.3.1", "h4ab18f5_0", ".conda")``. The extension is empty
+    if it is not a known package extension, and the version and build are
+    empty if the filename has fewer than three dash-separated parts.
+    """
+    stem, extension = filename, ""
+    for ext in ARTIFACT_EXTENSIONS:
+        if filename.endswith(ext):
+            stem, extension = filename[: -len(ext)], ext
+            break
+    name, version, build = (stem.rsplit("-", 2) + ["", ""])[:3]
+    return name, version, build, extension
+
+
+class ArtifactKey(NamedTuple):
+    """The parsed identity of an artifact in a channel.
+
+    Keys are plain tuples, so they are cheap to hash and compare and can be
+    used as dict keys and in sets. Filenames are parsed with the cached
+    ``split_artifact_filename``; the name, version and build of a key are
+    never empty, so ``filename`` gives back the parsed filename.
+    """
+
+    channel: str
+    label: str
+    subdir: str
+    name: CondaPackageName
+    version: str
+    build: str
+    extension: str
+
+    @classmethod
+    def parse(
+        cls,
+        filename: str,
+        subdir: str = "",
+        channel: str = "conda-forge",
+        label: str = "main",
+    ) -> "ArtifactKey":
+        """Parse an artifact filename like ``openssl-3.3.1-h4ab18f5_0.conda``.
+
+        Raises ``ValueError`` if the filename does not have a name, version
+        and build.
+        """
+        parts = split_artifact_filename(filename)
+        if not all(parts[:3]):
+            raise ValueError(
+                f"Artifact filename {filename!r} is not name-version-build"
+            )
+        return cls(channel, label, subdir, *parts)
+
+    @property
+    def stem(self) -> str:
+        """The filename without its extension."""
+        return f"{self.name}-{self.version}-{self.build}"
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}-{self.version}-{self.build}{self.extension}"
+
+    def __str__(self) -> str:
+        # the path of the artifact in the channel
+        label = "" if self.label == "main" else f"label/{self.label}/"
+        return f"{self.channel}/{label}{self.subdir}/{self.filename}"
@@ -0,0 +1,89 @@
+import json
+import shutil
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+from conda_forge_metadata import caches
+from conda_forge_metadata.testing import FakeChannelServer
+
+# responses of the live data sources, trimmed to what the tests check, laid
+# out like the URLs of the fake server
+RECORDED = Path(__file__).parent / "data" / "recorded"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--network",
+        action="store_true",
+        help="Also run the tests that use the live data sources.",
+    )
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: list[pytest.Item]
+) -> None:
+    if config.getoption("--network"):
+        return
+    skip = pytest.mark.skip(reason="uses the live data sources; run with --network")
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def fake_channel(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeChannelServer]:
+    """A local server standing in for all the remote data sources."""
+    with FakeChannelServer() as server:
+        for key, value in server.environ().items():
+            monkeypatch.setenv(key, value)
+        caches.clear()
+        yield server
+    # do not leave data from the fake server in the caches
+    caches.clear()
+
+
+@pytest.fixture
+def recorded_channel(fake_channel: FakeChannelServer) -> FakeChannelServer:
+    """``fake_channel`` serving the recorded responses of the data sources."""
+    for source in ("bot-data", "feedstock-outputs", "libcfgraph"):
+        shutil.copytree(RECORDED / source, fake_channel.root / source)
+    return fake_channel
+
+
+@pytest.fixture(params=["recorded", pytest.param("live", marks=pytest.mark.network)])
+def data_source(request: pytest.FixtureRequest) -> str:
+    """Run a test with the recorded responses, and with the live data sources."""
+    if request.param == "recorded":
+        request.getfixturevalue("recorded_channel")
+    return request.param
+
+
+@pytest.fixture
+def recorded_artifact(
+    fake_channel: FakeChannelServer,
+) -> Callable[[str, str], str]:
+    """Serve a ``.conda`` artifact with a recorded ``info`` directory.
+
+    The returned function takes the subdir and the stem of the artifact and
+    returns its filename.
+    """
+
+    def add(subdir: str, stem: str) -> str:
+        info_dir = RECORDED / "artifacts" / subdir / stem / "info"
+        index = json.loads((info_dir / "index.json").read_text())
+        fn, _ = fake_channel.add_conda_package(
+            index["name"],
+            version=index["version"],
+            build=index["build"],
+            subdir=subdir,
+            extra_info={
+                file.relative_to(info_dir).as_posix(): file.read_bytes()
+                for file in sorted(info_dir.rglob("*"))
+                if file.is_file()
+            },
+        )
+        return fn
+
+    return add
@@ -0,0 +1,188 @@
+import threading
+import time
+
+import pytest
+
+from conda_forge_metadata import _cache
+from conda_forge_metadata._cache import ttl_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(_cache, "_clock", clock)
+    return clock
+
+
+def test_ttl_cache_hit_and_expiry(clock):
+    calls = []
+
+    @ttl_cache(ttl=10)
+    def func(x):
+        calls.append(x)
+        return x * 2
+
+    assert func(1) == 2
+    assert func(1) == 2
+    assert calls == [1]
+
+    clock.now += 11
+    assert func(1) == 2
+    assert calls == [1, 1]
+
+    info = func.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 1)
+
+
+def test_ttl_cache_stale_while_revalidate(clock):
+    release = threading.Event()
+    values = iter(["old", "new"])
+
+    @ttl_cache(ttl=10, stale_ttl=100)
+    def func():
+        value = next(values)
+        if value == "new":
+            release.wait(5)
+        return value
+
+    assert func() == "old"
+    clock.now += 20
+    # stale data is served while the refresh is blocked
+    assert func() == "old"
+    assert func() == "old"
+    release.set()
+    for _ in range(100):
+        if func() == "new":
+            break
+        time.sleep(0.01)
+    assert func() == "new"
+
+    info = func.cache_info()
+    assert info.stale_hits >= 2
+    assert info.refreshes == 1
+
+
+def test_ttl_cache_failed_refresh_keeps_stale(clock):
+    fail = False
+
+    @ttl_cache(ttl=10, stale_ttl=100)
+    def func():
+        if fail:
+            raise RuntimeError("boom")
+        return "value"
+
+    assert func() == "value"
+    fail = True
+    clock.now += 20
+    assert func() == "value"
+    for _ in range(100):
+        if func.cache_info().refresh_errors:
+            break
+        time.sleep(0.01)
+    assert func.cache_info().refresh_errors == 1
+    assert func() == "value"
+
+    clock.now += 200
+    with pytest.raises(RuntimeError):
+        func()
+
+
+def test_ttl_cache_single_flight():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    @ttl_cache(ttl=None)
+    def func(x):
+        calls.append(x)
+        started.set()
+        release.wait(5)
+        return x
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(func("a"))) for _ in range(10)
+    ]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    # give the other threads time to join the in-flight call
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["a"]
+    assert results == ["a"] * 10
+
+
+def test_ttl_cache_maxsize_and_clear():
+    @ttl_cache(ttl=None, maxsize=2)
+    def func(x):
+        return x
+
+    for i in range(5):
+        func(i)
+    assert func.cache_info().currsize == 2
+
+    func.cache_clear()
+    assert func.cache_info() == (0, 0, 0, 0, 0, 2, 0)
+
+
+def test_ttl_cache_errors_are_not_cached():
+    calls = []
+
+    @ttl_cache(ttl=None)
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        func()
+    assert func() == "ok"
+    assert len(calls) == 2
+
+
+def test_single_flight_propagates_errors():
+    flight = _cache.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def worker():
+        try:
+            flight.do("key", fn)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    assert flight.in_flight("key")
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 5
+    assert not flight.in_flight("key")
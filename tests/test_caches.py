@@ -0,0 +1,96 @@
+import pytest
+
+from conda_forge_metadata import _cache, caches
+from conda_forge_metadata._cache import ttl_cache
+from conda_forge_metadata.conda_forge_bot import map_pypi_to_conda, pypi_to_conda
+from conda_forge_metadata.feedstock_outputs import package_to_feedstock
+from conda_forge_metadata.testing import FakeChannelServer
+from conda_forge_metadata.types import split_artifact_filename
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(_cache, "_clock", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def no_budget():
+    yield
+    caches.set_memory_budget(None)
+
+
+def test_parse_size():
+    assert caches.parse_size("1024") == 1024
+    assert caches.parse_size("512M") == 512 * 1024**2
+    assert caches.parse_size(" 2GiB ") == 2 * 1024**3
+    with pytest.raises(ValueError, match="Invalid size"):
+        caches.parse_size("lots")
+
+
+def test_stats_and_clear(fake_channel: FakeChannelServer):
+    fake_channel.add_feedstock_outputs({"tk": ["tk"]})
+    split_artifact_filename.cache_clear()
+    package_to_feedstock("tk")
+    package_to_feedstock("tk")
+    split_artifact_filename("tk-8.6-0.conda")
+
+    stats = caches.stats("_package_to_feedstock", "split_artifact_filename")
+    assert list(stats) == [
+        "conda_forge_metadata.feedstock_outputs._package_to_feedstock",
+        "conda_forge_metadata.types.split_artifact_filename",
+    ]
+    shards, parser = stats.values()
+    assert (shards.hits, shards.misses, shards.entries) == (1, 1, 1)
+    assert shards.bytes > 0
+    assert (parser.misses, parser.entries, parser.bytes) == (1, 1, None)
+    assert caches.total_bytes() >= shards.bytes
+
+    caches.clear("feedstock_outputs._package_to_feedstock")
+    assert caches.stats("_package_to_feedstock").popitem()[1].entries == 0
+    assert split_artifact_filename.cache_info().currsize == 1
+    with pytest.raises(ValueError, match="Unknown cache"):
+        caches.clear("nope")
+
+
+def test_memory_budget(clock, no_budget):
+    @ttl_cache(ttl=None)
+    def big(n):
+        return "x" * n
+
+    big(10_000)
+    clock[0] += 1
+    big(20_000)
+    clock[0] += 1
+    big(10_000)
+    caches.set_memory_budget("25K")
+    # the least recently used entry was evicted
+    assert big.cache_info().currsize == 1
+    assert big.cache_bytes() < 25 * 1024
+
+    clock[0] += 1
+    big(5_000)
+    assert big.cache_info().currsize == 2
+    caches.set_memory_budget(None)
+    assert caches.memory_budget() is None
+    with pytest.raises(ValueError, match="positive"):
+        caches.set_memory_budget(-1)
+
+
+def test_warm_up(fake_channel: FakeChannelServer):
+    fake_channel.add_feedstock_outputs({"tk": ["tk"]})
+    fake_channel.add_bot_data(
+        import_to_pkg={"yaml": ["pyyaml"]},
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}],
+    )
+    assert caches.warm_up() == {}
+    fetched = len(fake_channel.requests)
+    assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert package_to_feedstock("tk") == ["tk"]
+    # only the shard of tk was not preloaded
+    assert len(fake_channel.requests) == fetched + 1
+    assert pypi_to_conda.get_grayskull_pypi_mapping.cache_info().hits == 1
+
+    with pytest.raises(ValueError, match="cannot be preloaded"):
+        caches.warm_up("_package_to_feedstock")
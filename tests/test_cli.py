@@ -0,0 +1,64 @@
+import io
+import json
+
+import pytest
+
+from conda_forge_metadata import cli
+from conda_forge_metadata.testing import FakeChannelServer
+
+
+def _results(capsys) -> dict[str, dict]:
+    lines = capsys.readouterr().out.splitlines()
+    return {r["input"]: r for r in map(json.loads, lines)}
+
+
+def test_feedstock_from_stdin(fake_channel: FakeChannelServer, capsys, monkeypatch):
+    fake_channel.add_feedstock_outputs(
+        {"tk": ["tk"], "libpython": ["python"]}, autoreg={"llvmdev": ["libllvm*"]}
+    )
+    names = ["tk", "", "libpython", "libllvm29"] * 10
+    monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(names)))
+    assert cli.main(["feedstock", "--jobs", "3"]) == 0
+    assert _results(capsys) == {
+        "tk": {"input": "tk", "feedstocks": ["tk"]},
+        "libpython": {"input": "libpython", "feedstocks": ["python"]},
+        "libllvm29": {"input": "libllvm29", "feedstocks": ["llvmdev"]},
+    }
+
+
+def test_mappings(fake_channel: FakeChannelServer, capsys):
+    fake_channel.add_bot_data(
+        import_to_pkg={"yaml": ["pyyaml", "ruamel.yaml"]},
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}],
+        ranked_hubs_authorities=["pyyaml", "ruamel.yaml"],
+    )
+    assert cli.main(["import", "yaml.loader"]) == 0
+    assert _results(capsys)["yaml.loader"] == {
+        "input": "yaml.loader",
+        "import_name": "yaml",
+        "package": "pyyaml",
+        "candidates": ["pyyaml", "ruamel.yaml"],
+    }
+    assert cli.main(["pypi", "PyYAML", "-"]) == 0
+    assert set(_results(capsys)) == {"PyYAML", "-"}
+
+
+def test_artifact_info_and_errors(fake_channel: FakeChannelServer, capsys):
+    fn, _ = fake_channel.add_conda_package("a", files={"a.py": b""})
+    items = [f"noarch/{fn}", f"conda-forge/noarch/{fn}", "bad"]
+    assert cli.main(["artifact-info", "--backend", "streamed", *items]) == 1
+    results = _results(capsys)
+    assert results[f"noarch/{fn}"]["info"]["files"] == ["a.py"]
+    assert results[f"conda-forge/noarch/{fn}"] == results[f"noarch/{fn}"] | {
+        "input": f"conda-forge/noarch/{fn}"
+    }
+    assert results["bad"]["error"].startswith("ValueError")
+
+
+def test_repodata_sync(fake_channel: FakeChannelServer, capsys, tmp_path):
+    fake_channel.add_repodata({"a-1-0.conda": {"name": "a"}})
+    argv = ["repodata-sync", "--subdirs", "noarch", "--cache-dir", str(tmp_path)]
+    assert cli.main(argv) == 0
+    assert json.loads(capsys.readouterr().out)["fetched"] == 1
+    with pytest.raises(SystemExit):
+        cli.main(["nope"])
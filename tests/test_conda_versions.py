@@ -0,0 +1,56 @@
+import pytest
+
+from conda_forge_metadata._conda_versions import version_matches, version_order
+
+ORDERED = [
+    "0.4",
+    "0.4.1.rc",
+    "0.4.1",
+    "0.5a1",
+    "0.5b3",
+    "0.5",
+    "0.9.6",
+    "0.960923",
+    "1.0",
+    "1.1dev1",
+    "1.1a1",
+    "1.1.0dev1",
+    "1.1.0rc1",
+    "1.1.0",
+    "1.1.0post1",
+    "1.1.1dev1",
+    "1.1.1",
+    "1996.07.12",
+    "1!0.4.1",
+    "2!0.4.1",
+]
+
+
+def test_version_order():
+    for a, b in zip(ORDERED, ORDERED[1:]):
+        assert version_order(a) < version_order(b), (a, b)
+    assert version_order("1.0") == version_order("1.0.0")
+    assert version_order("1.0+1") > version_order("1.0")
+
+
+@pytest.mark.parametrize(
+    "version, spec, expected",
+    [
+        ("3.0.13", ">=3.0.0,<4.0a0", True),
+        ("4.0.0", ">=3.0.0,<4.0a0", False),
+        ("3.12.1", "3.12.*", True),
+        ("3.1.2", "3.1.*", True),
+        ("3.10.2", "3.1.*", False),
+        ("1.2.3", "=1.2", True),
+        ("1.2", "1.2", True),
+        ("1.2.3", "1.2", False),
+        ("1.2.3", "!=1.2.*", False),
+        ("2.0", "<1.0|>=2.0", True),
+        ("1.5", "<1.0|>=2.0", False),
+        ("1.5.2", "~=1.5.1", True),
+        ("1.6.0", "~=1.5.1", False),
+        ("0.1", "*", True),
+    ],
+)
+def test_version_matches(version, spec, expected):
+    assert version_matches(version, spec) is expected
@@ -0,0 +1,135 @@
+import json
+import os
+from pathlib import Path
+
+from conda_forge_metadata.dependency_graph import DependencyGraph
+
+
+def _write_repodata(path: Path, records: dict):
+    path.write_text(
+        json.dumps(
+            {
+                "packages.conda": {
+                    fn: {"name": fn.rsplit("-", 2)[0], "depends": deps}
+                    for fn, deps in records.items()
+                }
+            }
+        )
+    )
+
+
+def test_dependency_graph(tmp_path: Path):
+    linux = tmp_path / "linux-64.main.json"
+    noarch = tmp_path / "noarch.main.json"
+    _write_repodata(
+        linux,
+        {
+            "openssl-3.3.1-h0_0.conda": ["ca-certificates"],
+            "curl-8.8.0-h0_0.conda": ["openssl >=3.3.0,<4.0a0", "zlib"],
+            "python-3.12.4-h0_0.conda": ["openssl >=3.3.1,<4.0a0"],
+        },
+    )
+    _write_repodata(
+        noarch,
+        {
+            "requests-2.32.3-py_0.conda": ["python >=3.8", "urllib3"],
+            "conda-forge-metadata-1-py_0.conda": ["requests"],
+        },
+    )
+
+    graph = DependencyGraph.from_repodata([linux, noarch])
+    assert len(graph) == 5
+    assert graph.dependents("openssl") == {"curl", "python"}
+    assert graph.dependents("openssl", transitive=True) == {
+        "curl",
+        "python",
+        "requests",
+        "conda-forge-metadata",
+    }
+    assert graph.dependencies("curl") == {"openssl", "zlib"}
+    assert graph.dependencies("requests", transitive=True) == {
+        "python",
+        "urllib3",
+        "openssl",
+        "ca-certificates",
+    }
+    assert graph.artifact_dependents("openssl") == [
+        "main/linux-64/curl-8.8.0-h0_0.conda",
+        "main/linux-64/python-3.12.4-h0_0.conda",
+    ]
+    assert graph.dependents("nope") == set()
+
+    # persisting round-trips
+    graph.save(tmp_path / "graph.bin")
+    assert sorted(p.name for p in tmp_path.glob("*.bin*")) == ["graph.bin"]
+    loaded = DependencyGraph.load(tmp_path / "graph.bin")
+    assert loaded.dependents("openssl", transitive=True) == graph.dependents(
+        "openssl", transitive=True
+    )
+    assert loaded.artifact_dependents("openssl") == graph.artifact_dependents("openssl")
+
+    # unchanged files are skipped, changed ones are re-read
+    assert not loaded.update([linux, noarch])
+    _write_repodata(
+        noarch,
+        {
+            "requests-2.32.3-py_0.conda": ["python >=3.8", "urllib3"],
+            "httpx-0.27.0-py_0.conda": ["openssl"],
+        },
+    )
+    stat = noarch.stat()
+    os.utime(noarch, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert loaded.update([linux, noarch])
+    assert len(loaded) == 5
+    assert loaded.dependents("openssl") == {"curl", "python", "httpx"}
+    assert "conda-forge-metadata" not in loaded.dependents("requests")
+
+    # deleted files are dropped with their edges and unused names
+    linux.unlink()
+    assert loaded.update([noarch])
+    assert len(loaded) == 2
+    assert loaded.dependents("openssl") == {"httpx"}
+    assert loaded.dependencies("curl") == set()
+    assert "curl" not in loaded.names
+    assert "zlib" not in loaded.names
+    assert loaded.dependencies("requests") == {"python", "urllib3"}
+    assert loaded.artifact_dependents("openssl") == [
+        "main/noarch/httpx-0.27.0-py_0.conda"
+    ]
+    loaded.save(tmp_path / "graph.bin")
+    assert DependencyGraph.load(tmp_path / "graph.bin").dependents("openssl") == {
+        "httpx"
+    }
+
+
+def test_dependency_graph_csr(tmp_path: Path):
+    records = {
+        f"pkg{i % 7}-1.{i}-h0_0.conda": [f"pkg{(i * j) % 11} >=1" for j in range(4)]
+        for i in range(40)
+    }
+    _write_repodata(tmp_path / "linux-64.main.json", records)
+    graph = DependencyGraph.from_repodata([tmp_path / "linux-64.main.json"])
+
+    def rows(csr):
+        indptr, indices = csr
+        return [
+            list(indices[indptr[i] : indptr[i + 1]]) for i in range(len(graph.names))
+        ]
+
+    fwd = {name: set() for name in graph.names}
+    rev = {name: [] for name in graph.names}
+    for i, artifact in enumerate(graph._artifacts):
+        name = graph.names[graph._artifact_names[i]]
+        for dep in records[artifact.rsplit("/", 1)[1]]:
+            dep = dep.split()[0]
+            fwd[name].add(dep)
+            if i not in rev[dep]:
+                rev[dep].append(i)
+    ids = graph._name_ids
+    assert rows(graph._name_fwd) == [
+        sorted(ids[d] for d in fwd[n]) for n in graph.names
+    ]
+    assert rows(graph._name_rev) == [
+        sorted(ids[m] for m in graph.names if n in fwd[m]) for n in graph.names
+    ]
+    assert rows(graph._artifact_rev) == [rev[n] for n in graph.names]
@@ -0,0 +1,120 @@
+import errno
+import json
+import urllib.error
+
+import pytest
+import requests
+
+from conda_forge_metadata import endpoints, repodata
+from conda_forge_metadata.conda_forge_bot import map_pypi_to_conda
+from conda_forge_metadata.testing import FakeChannelServer
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(endpoints, "_clock", lambda: now[0])
+    monkeypatch.setattr(endpoints, "_failed_at", {})
+    monkeypatch.setattr(endpoints, "_mirrors", {})
+    return now
+
+
+@pytest.fixture
+def dead_url():
+    with FakeChannelServer() as server:
+        url = server.url
+    # nothing listens on the port anymore
+    return url
+
+
+def test_mirrors_precedence(clock, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("CONDA_FORGE_METADATA_CONDA_URL", raising=False)
+    assert endpoints.mirrors("conda") == ("https://conda.anaconda.org",)
+    assert endpoints.channel_url() == "https://conda.anaconda.org/conda-forge"
+    assert endpoints.channel_url("pkgs/main") == "https://repo.anaconda.com/pkgs/main"
+    assert endpoints.channel_url("http://other/ch/") == "http://other/ch"
+
+    monkeypatch.setenv("CONDA_FORGE_METADATA_CONDA_URL", "http://a/, http://b")
+    assert endpoints.mirrors("conda") == ("http://a", "http://b")
+    assert endpoints.url("conda", "/x/y") == "http://a/x/y"
+
+    with endpoints.override(conda=["http://c"]):
+        assert endpoints.mirrors("conda") == ("http://c",)
+        endpoints.set_mirrors("conda", "http://d http://e")
+        assert endpoints.mirrors("conda") == ("http://d", "http://e")
+    assert endpoints.mirrors("conda") == ("http://a", "http://b")
+
+    with pytest.raises(ValueError, match="Unknown source"):
+        endpoints.set_mirrors("nope", "http://x")
+
+
+def _response(status: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    return response
+
+
+def test_is_transient():
+    assert endpoints._is_transient(requests.ConnectionError("refused"))
+    assert endpoints._is_transient(requests.ReadTimeout("slow"))
+    assert endpoints._is_transient(urllib.error.URLError("refused"))
+    assert endpoints._is_transient(TimeoutError())
+    assert endpoints._is_transient(requests.HTTPError(response=_response(503)))
+    assert not endpoints._is_transient(requests.HTTPError(response=_response(404)))
+    assert not endpoints._is_transient(OSError(errno.ENOSPC, "No space left"))
+    assert not endpoints._is_transient(PermissionError("denied"))
+    assert not endpoints._is_transient(FileNotFoundError("missing"))
+
+
+def test_get_failover(clock, dead_url, fake_channel: FakeChannelServer):
+    fake_channel.add_bot_data(
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}]
+    )
+    live = fake_channel.environ()[endpoints.env_var("bot_data")]
+    with endpoints.override(bot_data=[dead_url, live]):
+        assert map_pypi_to_conda("PyYAML") == "pyyaml"
+        # the failed mirror is tried last until the cooldown is over
+        assert endpoints.base_urls("bot_data") == [live, dead_url]
+        clock[0] += endpoints.COOLDOWN
+        assert endpoints.base_urls("bot_data") == [dead_url, live]
+
+        # not found is an answer, not a failure
+        response = endpoints.get("bot_data", "missing.json")
+        assert response.status_code == 404
+
+    fake_channel.error_status = 503
+    with FakeChannelServer() as other:
+        other.add_file("x.json", "{}")
+        with endpoints.override(bot_data=[live, other.url]):
+            assert endpoints.get("bot_data", "x.json").json() == {}
+            assert endpoints.base_urls("bot_data") == [other.url, live]
+        # the response of the last mirror is returned as is
+        with endpoints.override(bot_data=[other.url, live]):
+            assert endpoints.get("bot_data", "x.json").status_code == 200
+            assert endpoints.get("bot_data", "missing.json").status_code == 404
+        with endpoints.override(bot_data=[live]):
+            assert endpoints.get("bot_data", "x.json").status_code == 503
+        with endpoints.override(bot_data=[dead_url]):
+            with pytest.raises(requests.ConnectionError):
+                endpoints.get("bot_data", "x.json")
+
+
+def test_repodata_failover(clock, dead_url, fake_channel: FakeChannelServer, tmp_path):
+    fake_channel.add_repodata({"a-1-0.conda": {"name": "a"}})
+    live = fake_channel.environ()[endpoints.env_var("conda")]
+    with endpoints.override(conda=[dead_url, live]):
+        (path,) = repodata.fetch_repodata(subdirs=("noarch",), cache_dir=tmp_path)
+        assert "a-1-0.conda" in json.loads(path.read_text())["packages.conda"]
+        summary = repodata.mirror(
+            labels=("main",), subdirs=("noarch",), cache_dir=tmp_path / "mirror"
+        )
+        assert summary["fetched"] == 1
+
+    # a missing file is not retried on the other mirrors
+    endpoints._failed_at.clear()
+    with endpoints.override(conda=[live, dead_url]):
+        with pytest.raises(OSError, match="404"):
+            repodata.fetch_repodata(
+                subdirs=("linux-64",), cache_dir=tmp_path, label="main"
+            )
+    assert endpoints._failed_at == {}
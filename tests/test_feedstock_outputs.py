@@ -1,11 +1,47 @@
-from conda_forge_metadata.feedstock_outputs import package_to_feedstock
+from fnmatch import fnmatch
 
+from conda_forge_metadata.feedstock_outputs import (
+    AutoregGlobMatcher,
+    package_to_feedstock,
+)
 
-def test_feedstock_outputs():
+
+def test_feedstock_outputs(data_source):
     assert package_to_feedstock("conda-forge-pinning") == ["conda-forge-pinning"]
     assert package_to_feedstock("tk") == ["tk"]
     assert "python" in package_to_feedstock("python")
 
 
-def test_feedstock_outputs_autoreg():
+def test_feedstock_outputs_autoreg(data_source):
     assert package_to_feedstock("libllvm29") == ["llvmdev"]
+
+
+def test_autoreg_glob_matcher():
+    globs = {
+        "llvmdev": ["libllvm[0-9]*", "llvm-tools"],
+        "clangdev": ["libclang*", "clang-[0-9]*"],
+        "everything": ["*"],
+        "maybe": ["lib?lvm2*"],
+        "empty": [],
+    }
+    names = [
+        "libllvm29",
+        "libllvm",
+        "llvm-tools",
+        "llvm-tools2",
+        "libclang-cpp",
+        "clang-17",
+        "clang",
+        "libxllvm22",
+        "",
+    ]
+    matcher = AutoregGlobMatcher(globs)
+    for name in names:
+        expected = sorted(
+            fs for fs, pats in globs.items() if any(fnmatch(name, p) for p in pats)
+        )
+        assert matcher.match(name) == expected, name
+
+    assert AutoregGlobMatcher({"llvmdev": ["libllvm[0-9]*"]}).match_many(names) == {
+        "libllvm29": ["llvmdev"]
+    }
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+from conda_forge_metadata.artifact_info import file_index
+from conda_forge_metadata.artifact_info.file_index import FileIndex
+
+
+def test_file_index_queries(tmp_path: Path):
+    with FileIndex(tmp_path / "files.db") as index:
+        index.add_artifact(
+            "conda-forge/linux-64/openssl-3.3.1-h0_0.conda",
+            ["lib/libssl.so.3", "lib/libcrypto.so.3", "include/openssl/ssl.h"],
+        )
+        index.add_artifact(
+            "conda-forge/linux-64/libopenssl-static-3.3.1-h0_0.conda",
+            ["lib/libssl.a"],
+        )
+        index.add_artifact(
+            "conda-forge/linux-64/other-1.0-h0_0.conda",
+            ["lib/libssl.so.3"],
+        )
+
+        assert len(index) == 3
+        assert "conda-forge/linux-64/other-1.0-h0_0.conda" in index
+        assert index.artifacts_for_path("lib/libssl.so.3") == [
+            "conda-forge/linux-64/openssl-3.3.1-h0_0.conda",
+            "conda-forge/linux-64/other-1.0-h0_0.conda",
+        ]
+        assert index.artifacts_for_path("lib/nope") == []
+        assert list(index.search_prefix("lib/libssl")) == [
+            "lib/libssl.a",
+            "lib/libssl.so.3",
+        ]
+        assert list(index.search_prefix("lib/", limit=1)) == ["lib/libcrypto.so.3"]
+        assert list(index.search_suffix(".so.3")) == [
+            "lib/libcrypto.so.3",
+            "lib/libssl.so.3",
+        ]
+
+        # re-adding an artifact replaces its files
+        index.add_artifact("conda-forge/linux-64/other-1.0-h0_0.conda", [])
+        assert index.artifacts_for_path("lib/libssl.so.3") == [
+            "conda-forge/linux-64/openssl-3.3.1-h0_0.conda",
+        ]
+
+    # the index persists
+    with FileIndex(tmp_path / "files.db") as index:
+        assert len(index) == 3
+
+
+def test_file_index_update_from_repodata(tmp_path: Path, monkeypatch):
+    repodata_json = tmp_path / "noarch.main.json"
+    repodata_json.write_text(
+        json.dumps(
+            {
+                "packages": {"a-1-0.tar.bz2": {}},
+                "packages.conda": {"b-1-0.conda": {}, "c-1-0.conda": {}},
+            }
+        )
+    )
+    fetched = []
+
+    def fake_info(channel, subdir, artifact, **kwargs):
+        fetched.append(artifact)
+        if artifact.startswith("c-"):
+            return None
+        return {"files": [f"share/{artifact}"]}
+
+    monkeypatch.setattr(file_index, "get_artifact_info_as_json", fake_info)
+    with FileIndex(tmp_path / "files.db") as index:
+        assert index.update_from_repodata([repodata_json]) == 3
+        assert sorted(fetched) == ["a-1-0.tar.bz2", "b-1-0.conda", "c-1-0.conda"]
+        assert index.artifacts_for_path("share/b-1-0.conda") == [
+            "conda-forge/noarch/b-1-0.conda"
+        ]
+
+        # only new artifacts are fetched
+        assert index.update_from_repodata([repodata_json]) == 0
+        assert len(fetched) == 3
@@ -0,0 +1,124 @@
+import subprocess
+import sys
+
+import pytest
+
+from conda_forge_metadata import caches, http_cache
+from conda_forge_metadata.conda_forge_bot import map_pypi_to_conda
+from conda_forge_metadata.conda_forge_bot.pypi_to_conda import get_pypi_name_mapping
+from conda_forge_metadata.feedstock_outputs import package_to_feedstock
+from conda_forge_metadata.instrumentation import Recorder, observing
+from conda_forge_metadata.testing import FakeChannelServer
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(http_cache, "_clock", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    yield http_cache.enable(tmp_path / "http", ttl=100)
+    http_cache.disable()
+
+
+def test_http_cache(clock, disk_cache, fake_channel: FakeChannelServer):
+    fake_channel.add_bot_data(
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}]
+    )
+    assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert [r.status for r in fake_channel.requests] == [200]
+
+    # a new process only has the disk cache
+    caches.clear()
+    assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert len(fake_channel.requests) == 1
+
+    clock[0] += 100
+    caches.clear()
+    with observing(Recorder()) as recorder:
+        assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert [r.status for r in fake_channel.requests] == [200, 304]
+    assert recorder.summary()["cache", "http"]["revalidated"] == 1
+
+    # the revalidated entry is fresh again, and errors fall back to it
+    caches.clear()
+    assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert len(fake_channel.requests) == 2
+    clock[0] += 100
+    caches.clear()
+    fake_channel.error_status = 503
+    with observing(Recorder()) as recorder:
+        assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert recorder.summary()["cache", "http"]["stale"] == 1
+
+    # errors are not cached
+    caches.clear()
+    disk_cache.clear()
+    with pytest.raises(Exception, match="503"):
+        map_pypi_to_conda("PyYAML")
+
+
+def test_http_cache_shared_between_processes(
+    tmp_path, fake_channel: FakeChannelServer, monkeypatch: pytest.MonkeyPatch
+):
+    fake_channel.add_feedstock_outputs({"tk": ["tk"]})
+    monkeypatch.setenv("CONDA_FORGE_METADATA_HTTP_CACHE_DIR", str(tmp_path))
+    code = (
+        "from conda_forge_metadata.feedstock_outputs import package_to_feedstock\n"
+        "assert package_to_feedstock('tk') == ['tk']\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+    # the config, the autoreg allowlist and the shard of tk
+    fetched = len(fake_channel.requests)
+    assert fetched == 3
+    assert package_to_feedstock("tk") == ["tk"]
+    assert len(fake_channel.requests) == fetched
+    assert http_cache.active().cache_dir == tmp_path
+
+
+def test_parsed_snapshot(
+    clock, disk_cache, fake_channel: FakeChannelServer, monkeypatch
+):
+    fake_channel.add_bot_data(
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}]
+    )
+    with observing(Recorder()) as recorder:
+        get_pypi_name_mapping()
+        caches.clear()
+        mapping = get_pypi_name_mapping()
+    summary = recorder.summary()
+    assert summary["parse", "yaml"]["count"] == 1
+    assert summary["parse", "snapshot"]["count"] == 1
+    assert mapping[0]["conda_name"] == "pyyaml"
+
+    # a new version of the document is parsed again
+    clock[0] += 100
+    caches.clear()
+    fake_channel.add_bot_data(
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "yaml"}]
+    )
+    with observing(Recorder()) as recorder:
+        assert get_pypi_name_mapping()[0]["conda_name"] == "yaml"
+    assert ("parse", "snapshot") not in recorder.summary()
+
+
+def test_warm_process(disk_cache, fake_channel: FakeChannelServer, monkeypatch):
+    fake_channel.add_bot_data(
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}]
+    )
+    assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    fetched = len(fake_channel.requests)
+
+    # a new process neither downloads nor parses YAML
+    monkeypatch.setenv("CONDA_FORGE_METADATA_HTTP_CACHE_DIR", str(disk_cache.cache_dir))
+    code = (
+        "import sys\n"
+        "from conda_forge_metadata.conda_forge_bot import map_pypi_to_conda\n"
+        "assert map_pypi_to_conda('PyYAML') == 'pyyaml'\n"
+        "assert 'ruamel' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+    assert len(fake_channel.requests) == fetched
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+import pytest
+
+MODULES = [
+    "conda_forge_metadata.artifact_info",
+    "conda_forge_metadata.conda_forge_bot",
+    "conda_forge_metadata.feedstock_outputs",
+    "conda_forge_metadata.repodata",
+]
+HEAVY_MODULES = [
+    "conda_oci_mirror",
+    "conda_package_streaming",
+    "requests",
+    "ruamel",
+]
+# generous enough for slow CI machines; importing requests alone blows it
+IMPORT_TIME_BUDGET_US = 75_000
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """Import ``module`` in a fresh interpreter and return cumulative import times."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_no_heavy_imports(module: str):
+    imported = _import_times(module)
+    for heavy in HEAVY_MODULES:
+        assert heavy not in imported, f"importing {module} imports {heavy}"
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_time_budget(module: str):
+    # take the best of a few runs to reduce noise
+    elapsed = min(_import_times(module)[module] for _ in range(3))
+    assert elapsed < IMPORT_TIME_BUDGET_US, f"importing {module} took {elapsed} us"
@@ -1,18 +1,49 @@
+import io
+import json
+import tarfile
 from unittest.mock import MagicMock
 
 import pytest
 import requests
 
 from conda_forge_metadata.artifact_info import info_json
+from conda_forge_metadata.artifact_info.paths_json import PackedPaths
 
 
-@pytest.mark.parametrize("backend", info_json.VALID_BACKENDS)
-def test_info_json_tar_bz2(backend: str):
+def _live(*backends: str) -> list:
+    """Parameters to run with some backends, or all, on the live data sources."""
+    return [
+        pytest.param(backend, "live", marks=pytest.mark.network, id=f"{backend}-live")
+        for backend in backends or info_json.VALID_BACKENDS
+    ]
+
+
+LIVE = _live()
+# the recorded artifacts are served by the fake channel, which the streamed
+# backend can read; the others need the live OCI registry
+RECORDED = [pytest.param("streamed", "recorded", id="streamed-recorded")]
+
+
+def _artifact_info(
+    request: pytest.FixtureRequest, source: str, subdir: str, artifact: str, **kwargs
+):
+    if source == "recorded":
+        request.getfixturevalue("recorded_artifact")(
+            subdir, artifact.removesuffix(".conda")
+        )
+    return info_json.get_artifact_info_as_json(
+        "conda-forge", subdir, artifact, **kwargs
+    )
+
+
+@pytest.mark.parametrize(("backend", "source"), LIVE)
+def test_info_json_tar_bz2(request, backend: str, source: str):
     if backend == "streamed":
         pytest.xfail("streamed backend does not support .tar.bz2 artifacts")
 
-    info = info_json.get_artifact_info_as_json(
-        "conda-forge",
+    info = _artifact_info(
+        request,
+        source,
         "osx-64",
         "21cmfast-3.0.2-py36h13dd421_0.tar.bz2",
         backend=backend,
@@ -38,10 +69,11 @@ def test_info_json_tar_bz2(backend: str):
     assert "bin/21cmfast" in info["files"]
 
 
-@pytest.mark.parametrize("backend", info_json.VALID_BACKENDS)
-def test_info_json_conda(backend: str):
-    info = info_json.get_artifact_info_as_json(
-        "conda-forge",
+@pytest.mark.parametrize(("backend", "source"), RECORDED + LIVE)
+def test_info_json_conda(request, backend: str, source: str):
+    info = _artifact_info(
+        request,
+        source,
         "noarch",
         "abipy-0.9.6-pyhd8ed1ab_0.conda",
         backend=backend,
@@ -67,10 +99,11 @@ def test_info_json_conda(backend: str):
     assert "site-packages/abipy/__init__.py" in info["files"]
 
 
-@pytest.mark.parametrize("backend", info_json.VALID_BACKENDS)
-def test_info_json_rattler_build(backend: str):
-    info = info_json.get_artifact_info_as_json(
-        "conda-forge",
+@pytest.mark.parametrize(("backend", "source"), RECORDED + LIVE)
+def test_info_json_rattler_build(request, backend: str, source: str):
+    info = _artifact_info(
+        request,
+        source,
         "linux-64",
         "jolt-physics-5.1.0-hff21bea_0.conda",
         backend=backend,
@@ -96,15 +129,16 @@ def test_info_json_rattler_build(backend: str):
     assert "include/Jolt/AABBTree/AABBTreeBuilder.h" in info["files"]
 
 
-@pytest.mark.parametrize("backend", info_json.VALID_BACKENDS)
-def test_info_json_conda_unlucky_test_file(backend: str):
+@pytest.mark.parametrize(("backend", "source"), RECORDED + LIVE)
+def test_info_json_conda_unlucky_test_file(request, backend: str, source: str):
     """See https://github.com/conda-forge/conda-forge-metadata/pull/36
 
     This artifact has test/xxxx/something_index.json,
     which tripped the original info/ parsing logic.
     """
-    info = info_json.get_artifact_info_as_json(
-        "conda-forge",
+    info = _artifact_info(
+        request,
+        source,
         "noarch",
         "nodeenv-1.9.1-pyhd8ed1ab_0.conda",
         backend=backend,
@@ -119,12 +153,14 @@ def test_info_json_conda_unlucky_test_file(backend: str):
     assert info["index"]["subdir"] == "noarch"
 
 
-def test_info_json_custom_session_object():
+@pytest.mark.parametrize(("backend", "source"), RECORDED + _live("streamed"))
+def test_info_json_custom_session_object(request, backend: str, source: str):
     session = MagicMock()
     session.get.side_effect = requests.get
 
-    info_json.get_artifact_info_as_json(
-        "conda-forge",
+    _artifact_info(
+        request,
+        source,
         "noarch",
         "nodeenv-1.9.1-pyhd8ed1ab_0.conda",
         backend="streamed",
@@ -134,13 +170,14 @@ def test_info_json_custom_session_object():
     session.get.assert_called()
 
 
-@pytest.mark.parametrize("backend", info_json.VALID_BACKENDS)
-def test_missing_conda_build_tar_bz2(backend: str):
+@pytest.mark.parametrize(("backend", "source"), LIVE)
+def test_missing_conda_build_tar_bz2(request, backend: str, source: str):
     if backend == "streamed":
         pytest.xfail("streamed backend does not support .tar.bz2 artifacts")
 
-    info = info_json.get_artifact_info_as_json(
-        "conda-forge",
+    info = _artifact_info(
+        request,
+        source,
         "linux-64",
         "jinja2-2.10-py36_0.tar.bz2",
         backend=backend,
@@ -149,12 +186,26 @@ def test_missing_conda_build_tar_bz2(backend: str):
     assert info["conda_build_config"] == {}
 
 
-def test_files_skip_suffixes():
+def test_missing_conda_build_config(recorded_artifact):
+    recorded_artifact("noarch", "nodeenv-1.9.1-pyhd8ed1ab_0")
     info = info_json.get_artifact_info_as_json(
         "conda-forge",
         "noarch",
+        "nodeenv-1.9.1-pyhd8ed1ab_0.conda",
+        backend="streamed",
+    )
+    assert info is not None
+    assert info["conda_build_config"] == {}
+
+
+@pytest.mark.parametrize(("backend", "source"), RECORDED + _live("oci"))
+def test_files_skip_suffixes(request, backend: str, source: str):
+    info = _artifact_info(
+        request,
+        source,
+        "noarch",
         "abipy-0.9.6-pyhd8ed1ab_0.conda",
-        backend="oci",
+        backend=backend,
     )
     assert info is not None
     assert "site-packages/abipy/__init__.py" in info["files"]
@@ -162,19 +213,161 @@ def test_files_skip_suffixes():
         "conda-forge",
         "noarch",
         "abipy-0.9.6-pyhd8ed1ab_0.conda",
-        backend="oci",
+        backend=backend,
         skip_files_suffixes=(".py",),
     )
     assert info is not None
     assert "site-packages/abipy/__init__.py" not in info["files"]
 
 
-@pytest.mark.parametrize("backend", info_json.VALID_BACKENDS)
-def test_duplicate_keys_allowed(backend: str):
-    info = info_json.get_artifact_info_as_json(
-        "conda-forge",
+@pytest.mark.parametrize(("backend", "source"), RECORDED + LIVE)
+def test_duplicate_keys_allowed(request, backend: str, source: str):
+    info = _artifact_info(
+        request,
+        source,
         "linux-64",
         "clangxx_osx-64-16.0.6-h027b494_6.conda",
         backend=backend,
     )
     assert info is not None
+
+
+def _tar_tuples(files: dict):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, content in files.items():
+            data = content.encode()
+            member = tarfile.TarInfo(name)
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+    buf.seek(0)
+    with tarfile.open(fileobj=buf) as tar:
+        for member in tar:
+            yield tar, member
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_info_json_from_tar_generator_paths_json(packed: bool):
+    paths = {
+        "paths_version": 1,
+        "paths": [
+            {"_path": "bin/foo", "sha256": "ab" * 32, "size_in_bytes": 3},
+            {"_path": "lib/foo.pyc", "sha256": "cd" * 32, "size_in_bytes": 4},
+            {"_path": "lib/foo.py", "sha256": "ef" * 32, "size_in_bytes": 5},
+        ],
+    }
+    info = info_json.info_json_from_tar_generator(
+        _tar_tuples(
+            {
+                "info/index.json": json.dumps({"name": "foo", "version": "1.0"}),
+                "info/paths.json": json.dumps(paths),
+                "info/files": "bin/foo\nlib/foo.pyc\nlib/foo.py\nbin/other\n",
+            }
+        ),
+        packed_files_metadata=packed,
+    )
+    assert info is not None
+    assert info["name"] == "foo"
+    assert info["files"] == ["bin/foo", "lib/foo.py"]
+    if packed:
+        assert isinstance(info["files"], PackedPaths)
+        assert info["files"].sha256(1) == "ef" * 32
+        assert info["files"].size_in_bytes(1) == 5
+    else:
+        assert isinstance(info["files"], list)
+
+
+def test_oci_fallback_to_streamed(monkeypatch: pytest.MonkeyPatch):
+    from conda_forge_metadata import oci, streaming
+
+    oci_calls, streamed_calls = [], []
+
+    def fake_oci(channel, subdir, artifact, check_tags=False):
+        oci_calls.append((artifact, check_tags))
+        return iter(())
+
+    def fake_streamed(channel, subdir, artifact, session=None):
+        streamed_calls.append(artifact)
+        return _tar_tuples({"info/index.json": json.dumps({"name": "foo"})})
+
+    monkeypatch.setattr(oci, "get_oci_artifact_data", fake_oci)
+    monkeypatch.setattr(streaming, "get_streamed_artifact_data", fake_streamed)
+
+    args = ("conda-forge", "noarch", "foo-1-0.conda")
+    assert info_json.get_artifact_info_as_json(*args, check_oci_tags=True) is None
+    info = info_json.get_artifact_info_as_json(*args, fallback_to_streamed=True)
+    assert info is not None and info["name"] == "foo"
+    assert oci_calls == [("foo-1-0.conda", True), ("foo-1-0.conda", False)]
+    assert streamed_calls == ["foo-1-0.conda"]
+
+
+def test_auto_backend(monkeypatch: pytest.MonkeyPatch):
+    from conda_forge_metadata import oci, streaming
+    from conda_forge_metadata.artifact_info import _routing
+
+    now = [0.0]
+    monkeypatch.setattr(_routing, "_clock", lambda: now[0])
+    monkeypatch.setattr(_routing, "STATS", _routing.BackendStats(explore_after=60))
+    calls = []
+    latency = {"oci": 1.0, "streamed": 1.0}
+    failing = set()
+
+    def fake_backend(name):
+        def fetch(channel, subdir, artifact, **kwargs):
+            calls.append(name)
+            now[0] += latency[name]
+            if name in failing:
+                raise requests.ConnectionError(name)
+            return _tar_tuples({"info/index.json": json.dumps({"name": name})})
+
+        return fetch
+
+    monkeypatch.setattr(oci, "get_oci_artifact_data", fake_backend("oci"))
+    monkeypatch.setattr(
+        streaming, "get_streamed_artifact_data", fake_backend("streamed")
+    )
+
+    def get(artifact):
+        info = info_json.get_artifact_info_as_json(
+            "conda-forge", "noarch", artifact, backend="auto"
+        )
+        assert info is not None
+        return info["name"]
+
+    # .tar.bz2 artifacts only come from OCI, .conda ones are streamed first
+    assert get("a-1-0.tar.bz2") == "oci"
+    assert get("a-1-0.conda") == "streamed"
+
+    # when streaming fails, OCI is used and then preferred
+    failing.add("streamed")
+    assert get("a-1-0.conda") == "oci"
+    assert calls[-2:] == ["streamed", "oci"]
+    assert get("a-1-0.conda") == "oci"
+    assert calls[-1] == "oci"
+
+    # streaming is tried again after a while, and preferred again once it
+    # recovered and OCI got slower
+    failing.clear()
+    latency["oci"] = 5.0
+    now[0] += 61
+    assert get("a-1-0.conda") == "streamed"
+    for _ in range(10):
+        get("a-1-0.conda")
+    assert calls[-3:] == ["streamed"] * 3
+
+    failing.update(["oci", "streamed"])
+    with pytest.raises(requests.ConnectionError):
+        get("a-1-0.conda")
+
+    # a faster OCI mirror is found even though streaming never fails
+    monkeypatch.setattr(_routing, "STATS", _routing.BackendStats(explore_after=60))
+    failing.clear()
+    latency.update(oci=0.5, streamed=2.0)
+    del calls[:]
+    assert [get("b-1-0.conda") for _ in range(4)] == [
+        "streamed",
+        "oci",
+        "oci",
+        "oci",
+    ]
+    assert calls == ["streamed", "oci", "oci", "oci"]
@@ -0,0 +1,109 @@
+from collections import Counter
+
+from conda_forge_metadata import instrumentation, repodata
+from conda_forge_metadata.artifact_info.info_json import get_artifact_info_as_json
+from conda_forge_metadata.feedstock_outputs import package_to_feedstock
+from conda_forge_metadata.instrumentation import Recorder, observing
+from conda_forge_metadata.testing import FakeChannelServer
+
+
+def test_disabled():
+    assert not instrumentation.enabled()
+    span = instrumentation.span("fetch", "x")
+    assert not span
+    with span as s:
+        s.set(bytes=1)
+    with observing(Recorder()) as recorder:
+        assert instrumentation.enabled()
+        with instrumentation.span("fetch", "x", url="u") as s:
+            s.add("bytes", 2)
+            s.add("bytes", 3)
+    assert not instrumentation.enabled()
+    (event,) = recorder.events
+    assert event.attrs == {"url": "u", "bytes": 5}
+
+
+def test_feedstock_outputs_events(fake_channel: FakeChannelServer):
+    fake_channel.add_feedstock_outputs(
+        {"tk": ["tk"]}, autoreg={"llvmdev": ["libllvm*"]}
+    )
+    with observing(Recorder()) as recorder:
+        assert package_to_feedstock("tk") == ["tk"]
+        assert package_to_feedstock("tk") == ["tk"]
+
+    summary = recorder.summary()
+    # the config, the autoreg allowlist and the shard of tk
+    assert summary["fetch", "feedstock_outputs"]["count"] == 3
+    assert summary["fetch", "feedstock_outputs"]["bytes"] > 0
+    assert summary["call", "package_to_feedstock"]["count"] == 2
+    assert summary["cache", "_package_to_feedstock"]["miss"] == 1
+    assert summary["cache", "_package_to_feedstock"]["hit"] == 1
+    assert summary["parse", "yaml"]["count"] == 1
+
+    calls = [e for e in recorder.events if e.kind == "call"]
+    fetches = [e for e in recorder.events if e.kind == "fetch"]
+    assert {e.parent for e in fetches} == {calls[0].id}
+    assert all(e.duration >= 0 for e in recorder.events)
+
+
+def test_streamed_and_repodata_events(fake_channel: FakeChannelServer, tmp_path):
+    fn, record = fake_channel.add_conda_package(
+        "a", files={"a.txt": b"a"}, extra_info={"recipe/meta.yaml": b"a: 1"}
+    )
+    fake_channel.add_repodata({fn: record})
+    with observing(Recorder()) as recorder:
+        get_artifact_info_as_json("conda-forge", "noarch", fn, backend="streamed")
+        repodata.fetch_repodata(subdirs=("noarch",), cache_dir=tmp_path)
+        list(repodata.list_artifacts(tmp_path.glob("*.json")))
+
+    summary = recorder.summary()
+    streamed = summary["fetch", "streamed"]
+    assert streamed["count"] == 1
+    assert streamed["bytes"] == sum(
+        r.nbytes for r in fake_channel.requests if r.path.endswith(".conda")
+    )
+    assert summary["parse", "yaml"]["count"] == 1
+    assert summary["parse", "paths_json"]["count"] == 1
+    assert summary["fetch", "download"]["bytes"] > 0
+    assert summary["decompress", "bz2"]["count"] == 1
+    assert summary["parse", "repodata"]["count"] == 1
+    kinds = Counter(e.kind for e in recorder.events)
+    assert kinds["call"] == 2
+
+
+def test_failing_observer(caplog):
+    def broken(event):
+        raise RuntimeError("boom")
+
+    with observing(broken), observing(Recorder()) as recorder:
+        instrumentation.emit("cache", "x", result="hit")
+    assert len(recorder.events) == 1
+    assert "Observer" in caplog.text
+
+
+def test_opentelemetry_observer():
+    spans = []
+
+    class FakeSpan:
+        def __init__(self, name, start_time, attributes):
+            self.record = {"name": name, "start": start_time, "attrs": attributes}
+            spans.append(self.record)
+
+        def end(self, end_time):
+            self.record["end"] = end_time
+
+    class FakeTracer:
+        def start_span(self, name, start_time, attributes):
+            return FakeSpan(name, start_time, attributes)
+
+    observer = instrumentation.opentelemetry_observer(FakeTracer())
+    with observing(observer):
+        with instrumentation.span("fetch", "bot_data", url="u", extra=object()):
+            pass
+    (span,) = spans
+    assert span["name"] == "fetch bot_data"
+    assert span["attrs"] == {
+        "conda_forge_metadata.url": "u",
+        "conda_forge_metadata.kind": "fetch",
+    }
+    assert span["end"] >= span["start"]
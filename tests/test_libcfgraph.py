@@ -1,3 +1,6 @@
+import pytest
+
+from conda_forge_metadata import libcfgraph
 from conda_forge_metadata.libcfgraph import (
     get_libcfgraph_artifact_data,
     get_libcfgraph_index,
@@ -5,7 +8,13 @@ from conda_forge_metadata.libcfgraph import (
 )
 
 
-def test_get_libcfgraph_index():
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch: pytest.MonkeyPatch):
+    # the index is kept in a global rather than in a registered cache
+    monkeypatch.setattr(libcfgraph, "_LIBCFGRAPH_INDEX", None)
+
+
+def test_get_libcfgraph_index(data_source):
     lcfi = get_libcfgraph_index()
     assert len(lcfi) > 0
     assert isinstance(lcfi, list)
@@ -13,7 +22,7 @@ def test_get_libcfgraph_index():
     assert lcfi[0].startswith("artifacts/")
 
 
-def test_get_libcfgraph_artifact_data():
+def test_get_libcfgraph_artifact_data(data_source):
     data = get_libcfgraph_artifact_data(
         "conda-forge",
         "noarch",
@@ -24,16 +33,17 @@ def test_get_libcfgraph_artifact_data():
     assert data["version"] == "6.0.0"
 
 
-def test_get_libcfgraph_artifact_data_none():
+def test_get_libcfgraph_artifact_data_none(data_source):
     data = get_libcfgraph_artifact_data(
         "conda-forge",
         "noarchhh",
         "flake8-6.0.0-pyhd8ed1ab_0.conda",
     )
     assert data is None
+    assert get_libcfgraph_artifact_data("conda-forge", "noarch", "flake8.conda") is None
 
 
-def test_get_libcfgraph_pkgs_for_import():
+def test_get_libcfgraph_pkgs_for_import(data_source):
     pkgs, nm = get_libcfgraph_pkgs_for_import("numpy")
     assert pkgs is not None
     assert nm == "numpy"
@@ -1,10 +1,15 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
 from conda_forge_metadata.conda_forge_bot import (
     get_pkgs_for_import,
+    import_to_pkg,
     map_import_to_package,
 )
 
 
-def test_map_import_to_package():
+def test_map_import_to_package(data_source):
     assert map_import_to_package("numpy") == "numpy"
     assert map_import_to_package("numpy.linalg") == "numpy"
 
@@ -14,7 +19,7 @@ def test_map_import_to_package():
     assert map_import_to_package("scipy") == "scipy"
 
 
-def test_get_pkgs_for_import():
+def test_get_pkgs_for_import(data_source):
     pkgs, nm = get_pkgs_for_import("numpy")
     assert pkgs is not None
     assert nm == "numpy"
@@ -36,3 +41,45 @@ def test_get_pkgs_for_import():
     assert pkgs is not None
     assert nm == "scipy"
     assert "scipy" in pkgs
+
+
+def test_map_import_to_package_coalesces_fetches(monkeypatch):
+    urls = []
+
+    def fake_get(url, *args, **kwargs):
+        urls.append(url)
+        time.sleep(0.1)
+        resp = MagicMock()
+        if url.endswith("import_to_pkg_maps_meta.json"):
+            resp.json.return_value = {"num_letters": 2, "num_dirs": 5}
+        elif url.endswith("ranked_hubs_authorities.json"):
+            resp.json.return_value = ["foo-bar"]
+        else:
+            resp.json.return_value = {"foo": {"elements": ["foo-bar", "foo-baz"]}}
+        return resp
+
+    monkeypatch.setattr("requests.get", fake_get)
+    caches = [
+        import_to_pkg._import_to_pkg_maps_meta,
+        import_to_pkg._import_to_pkg_maps_cache,
+        import_to_pkg._ranked_hubs_authorities,
+    ]
+    for cache in caches:
+        cache.cache_clear()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(map_import_to_package("foo")))
+        for _ in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for cache in caches:
+        cache.cache_clear()
+
+    assert results == ["foo-bar"] * 20
+    # meta, one shard and the ranking are each downloaded exactly once
+    assert len(urls) == 3
@@ -4,13 +4,13 @@ from conda_forge_metadata.conda_forge_bot import (
 )
 
 
-def test_map_pypi_to_conda():
+def test_map_pypi_to_conda(data_source):
     assert map_pypi_to_conda("numpy") == "numpy"
     assert map_pypi_to_conda("scipy") == "scipy"
     assert map_pypi_to_conda("21cmFAST") == "21cmfast"
 
 
-def test_get_pypi_name_mapping():
+def test_get_pypi_name_mapping(data_source):
     nmap = get_pypi_name_mapping()
     assert nmap is not None
     assert "conda_name" in nmap[0]
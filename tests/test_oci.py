@@ -0,0 +1,186 @@
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+from oras.container import Container
+
+from conda_forge_metadata import oci
+
+
+class FakeResponse:
+    def __init__(self, url, status_code, tags=(), next_link=None):
+        self.url = url
+        self.status_code = status_code
+        self._tags = list(tags)
+        self.links = {"next": {"url": next_link}} if next_link else {}
+
+    def json(self):
+        return {"name": "x", "tags": self._tags}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for {self.url}")
+
+
+class FakeClient:
+    prefix = "https"
+    headers = {}
+    # tags by package reference, listed two per page; others are 404
+    tags = {}
+    requested = []
+
+    def __init__(self):
+        self.resets = 0
+
+    def reset_basic_auth(self):
+        self.resets += 1
+
+    def get_container(self, uri):
+        return Container(uri)
+
+    def do_request(self, url, method="GET", headers=None):
+        self.requested.append(url)
+        parts = urlsplit(url)
+        name = parts.path.split("/")[-3]
+        if name not in self.tags:
+            # what oras' get_tags turns into a ValueError
+            return FakeResponse(url, 404)
+        last = parse_qs(parts.query).get("last", [""])[0]
+        tags = self.tags[name]
+        start = tags.index(last) + 1 if last else 0
+        page = tags[start : start + 2]
+        next_link = None
+        if start + 2 < len(tags):
+            next_link = f"{parts.path}?n=2&last={page[-1]}"
+        return FakeResponse(url, 200, page, next_link)
+
+
+class FakeRepo:
+    created = []
+
+    def __init__(self, channel, subdir, cache_dir, registry=None):
+        self.key = (registry, channel, subdir)
+        self.client = FakeClient()
+        self.created.append(self)
+
+    def get_info(self, package):
+        raise ValueError(f"Cannot pull {package}")
+
+
+@pytest.fixture
+def fake_repo(monkeypatch: pytest.MonkeyPatch):
+    FakeRepo.created = []
+    monkeypatch.setattr(oci, "PackageRepo", FakeRepo)
+    monkeypatch.setattr(oci, "_POOL", oci.OCIClientPool())
+    yield FakeRepo
+
+
+def test_client_pool_reuses_repos(fake_repo):
+    pool = oci.OCIClientPool()
+    with pool.repo("conda-forge", "noarch") as repo:
+        pass
+    with pool.repo("conda-forge", "noarch") as repo2:
+        assert repo2 is repo
+        # a repo is never shared by two threads at once
+        with pool.repo("conda-forge", "noarch") as repo3:
+            assert repo3 is not repo
+    with pool.repo("conda-forge", "linux-64") as repo4:
+        assert repo4.key == (oci.DEFAULT_REGISTRY, "conda-forge", "linux-64")
+    assert len(fake_repo.created) == 3
+
+    pool.clear()
+    with pool.repo("conda-forge", "noarch") as repo5:
+        assert repo5 not in (repo, repo3)
+
+
+def test_client_pool_token_max_age(fake_repo, monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(oci, "_clock", lambda: now[0])
+    pool = oci.OCIClientPool(token_max_age=60)
+    with pool.repo("conda-forge", "noarch") as repo:
+        pass
+    now[0] += 30
+    with pool.repo("conda-forge", "noarch") as repo:
+        assert repo.client.resets == 0
+    now[0] += 61
+    with pool.repo("conda-forge", "noarch") as repo:
+        assert repo.client.resets == 1
+
+
+def test_get_oci_artifact_data_uses_pool(fake_repo):
+    pool = oci.OCIClientPool()
+
+    def fetch():
+        for _ in range(5):
+            assert (
+                list(
+                    oci.get_oci_artifact_data(
+                        "conda-forge", "noarch", "a-1-0.conda", pool=pool
+                    )
+                )
+                == []
+            )
+
+    threads = [threading.Thread(target=fetch) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 1 <= len(fake_repo.created) <= 3
+
+
+def test_list_oci_tags(fake_repo, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        FakeClient, "tags", {"foo": ["1.0-h0_0", "1.0__p__local-h0_0", "3.0-h0_0"]}
+    )
+    monkeypatch.setattr(FakeClient, "requested", [])
+    oci._oci_tags.cache_clear()
+
+    assert oci.list_oci_tags("conda-forge", "noarch", "foo") == {
+        "1.0-h0_0",
+        "1.0+local-h0_0",
+        "3.0-h0_0",
+    }
+    assert oci.is_oci_mirrored("conda-forge", "noarch", "foo-1.0-h0_0.conda")
+    assert not oci.is_oci_mirrored("conda-forge", "noarch", "foo-2.0-h0_0.conda")
+    assert oci.missing_oci_artifacts(
+        "conda-forge",
+        "noarch",
+        [
+            "foo-1.0-h0_0.tar.bz2",
+            "foo-2.0-h0_0.conda",
+            "_libgcc_mutex-0.1-main.tar.bz2",
+        ],
+    ) == {"foo-2.0-h0_0.conda", "_libgcc_mutex-0.1-main.tar.bz2"}
+    # tags are listed once per package, following the pages
+    assert [urlsplit(url).path for url in FakeClient.requested] == [
+        "/v2/channel-mirrors/conda-forge/noarch/foo/tags/list",
+        "/v2/channel-mirrors/conda-forge/noarch/foo/tags/list",
+        "/v2/channel-mirrors/conda-forge/noarch/zzz_libgcc_mutex/tags/list",
+    ]
+
+    # unmirrored artifacts are skipped without trying to fetch them, also
+    # when the registry does not know the package at all
+    for artifact in ("foo-2.0-h0_0.conda", "bar-1.0-h0_0.conda"):
+        assert (
+            list(
+                oci.get_oci_artifact_data(
+                    "conda-forge", "noarch", artifact, check_tags=True
+                )
+            )
+            == []
+        )
+    assert len(fake_repo.created) == 1
+    oci._oci_tags.cache_clear()
+
+
+def test_list_oci_tags_errors(fake_repo, monkeypatch: pytest.MonkeyPatch):
+    def do_request(self, url, method="GET", headers=None):
+        return FakeResponse(url, 500)
+
+    monkeypatch.setattr(FakeClient, "do_request", do_request)
+    oci._oci_tags.cache_clear()
+    with pytest.raises(requests.HTTPError, match="500"):
+        oci.list_oci_tags("conda-forge", "noarch", "foo", registry="ghcr.io/x")
+    oci._oci_tags.cache_clear()
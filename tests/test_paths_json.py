@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from conda_forge_metadata.artifact_info.paths_json import PackedPaths, iter_paths_json
+
+
+def test_iter_paths_json():
+    doc = {
+        "paths_version": 1,
+        "paths": [
+            {"_path": "bin/foo", "sha256": "00" * 32, "size_in_bytes": 3},
+            {"_path": "lib/libfoo.so", "path_type": "hardlink"},
+        ],
+        "extra": {"nested": [1, 2]},
+    }
+    meta = {}
+    assert list(iter_paths_json(json.dumps(doc, indent=2), meta)) == doc["paths"]
+    assert meta == {"paths_version": 1, "extra": {"nested": [1, 2]}}
+
+    assert list(iter_paths_json('{"paths": []}')) == []
+    assert list(iter_paths_json("{}")) == []
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_paths_json('{"paths": [{}'))
+
+
+def test_packed_paths():
+    paths = [f"lib/python3.12/site-packages/pkg/mod{i}.py" for i in range(100)]
+    paths += ["share/ünïcödé/file", "z"]
+    packed = PackedPaths(paths)
+
+    assert len(packed) == len(paths)
+    assert list(packed) == paths
+    assert packed == paths
+    assert packed[0] == paths[0]
+    assert packed[17] == paths[17]
+    assert packed[-1] == "z"
+    assert packed[3:40:7] == paths[3:40:7]
+    assert "share/ünïcödé/file" in packed
+    assert "nope" not in packed
+    assert packed.nbytes < sum(len(p) for p in paths) / 2
+    with pytest.raises(IndexError):
+        packed[len(paths)]
+    with pytest.raises(ValueError):
+        packed.sha256(0)
+
+
+def test_packed_paths_metadata():
+    packed = PackedPaths(with_metadata=True)
+    packed.append("a", "ab" * 32, 10)
+    packed.append("b")
+    assert packed.with_metadata
+    assert packed.sha256(0) == "ab" * 32
+    assert packed.size_in_bytes(0) == 10
+    assert packed.sha256(-1) is None
+    assert packed.size_in_bytes(1) is None
@@ -0,0 +1,110 @@
+import json
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from conda_forge_metadata.artifact_info import prefetch
+from conda_forge_metadata.artifact_info.prefetch import (
+    ArtifactInfoCache,
+    Prefetcher,
+    resolve_artifacts,
+)
+from conda_forge_metadata.types import ArtifactKey
+
+
+@pytest.fixture
+def repodata_cache(tmp_path: Path):
+    def record(name, timestamp):
+        return {"name": name, "version": "1", "build": "0", "timestamp": timestamp}
+
+    data = {
+        "packages": {"old-1-0.tar.bz2": record("old", 1_500_000_000)},
+        "packages.conda": {
+            "a-1-0.conda": record("a", 1_700_000_000_000),
+            "b-1-0.conda": record("b", 1_710_000_000_000),
+        },
+    }
+    cache = tmp_path / "repodata"
+    cache.mkdir()
+    (cache / "noarch.main.json").write_text(json.dumps(data))
+    yield cache
+
+
+def test_resolve_artifacts(repodata_cache: Path):
+    kwargs = dict(subdirs=("noarch",), cache_dir=repodata_cache)
+    assert [k.filename for k in resolve_artifacts(names=["a", "old"], **kwargs)] == [
+        "a-1-0.conda",
+        "old-1-0.tar.bz2",
+    ]
+    since = datetime(2023, 12, 1, tzinfo=timezone.utc)
+    assert resolve_artifacts(since=since, **kwargs) == [
+        ArtifactKey("conda-forge", "main", "noarch", "b", "1", "0", ".conda")
+    ]
+    assert len(resolve_artifacts(since=0, **kwargs)) == 3
+
+
+def test_resolve_artifacts_malformed(tmp_path: Path):
+    packages = {
+        "a-1-0.conda": {"name": "a", "version": "1", "build": "0"},
+        "a.conda": {"name": "a", "version": "1", "build": "0"},
+    }
+    (tmp_path / "noarch.main.json").write_text(json.dumps({"packages.conda": packages}))
+    keys = resolve_artifacts(subdirs=("noarch",), cache_dir=tmp_path)
+    assert [k.filename for k in keys] == ["a-1-0.conda"]
+
+
+def test_prefetcher(
+    repodata_cache: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    calls = []
+    release = threading.Event()
+
+    def fake_get_artifact_info_as_json(channel, subdir, artifact, backend):
+        calls.append(artifact)
+        release.wait(5)
+        if artifact.startswith("old"):
+            return None
+        return {"name": artifact.split("-")[0], "files": ("x", "y")}
+
+    monkeypatch.setattr(
+        prefetch, "get_artifact_info_as_json", fake_get_artifact_info_as_json
+    )
+
+    class InFlight(dict):
+        # the fetches are released once get found the queued one
+        def get(self, key, default=None):
+            future = super().get(key, default)
+            release.set()
+            return future
+
+    keys = resolve_artifacts(subdirs=("noarch",), cache_dir=repodata_cache)
+    with Prefetcher(tmp_path / "info", max_workers=2) as prefetcher:
+        prefetcher._in_flight = InFlight()
+        futures = prefetcher.prefetch(keys)
+        assert len(futures) == 3
+        # already queued artifacts are not queued twice
+        assert prefetcher.prefetch(keys) == []
+        assert not release.is_set()
+        # waits for the queued fetch instead of fetching again, and gets the
+        # same data as from the cache
+        assert prefetcher.get("conda-forge", "noarch", "a-1-0.conda") == {
+            "name": "a",
+            "files": ["x", "y"],
+        }
+        for future in futures:
+            future.result()
+    assert sorted(calls) == ["a-1-0.conda", "b-1-0.conda", "old-1-0.tar.bz2"]
+
+    cache = ArtifactInfoCache(tmp_path / "info")
+    assert all(key in cache for key in keys)
+    assert cache.load(ArtifactKey.parse("old-1-0.tar.bz2", "noarch")) is None
+    with pytest.raises(KeyError):
+        cache.load(ArtifactKey.parse("c-1-0.conda", "noarch"))
+
+    # cached artifacts, including those without metadata, are not fetched again
+    with Prefetcher(cache) as prefetcher:
+        assert prefetcher.prefetch(keys) == []
+        assert prefetcher.get("conda-forge", "noarch", "b-1-0.conda")["name"] == "b"
+    assert len(calls) == 3
@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from conda_forge_metadata import repodata
+from conda_forge_metadata.record_store import RecordStore
+from conda_forge_metadata.testing import FakeChannelServer
+
+
+def _record(name: str, version: str, size: int = 10) -> dict:
+    return {"name": name, "version": version, "size": size, "sha256": name * 4}
+
+
+@pytest.fixture
+def label_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    main = {
+        "packages.conda": {
+            "a-1-0.conda": _record("a", "1"),
+            "b-1-0.conda": _record("b", "1"),
+        },
+        "removed": ["c-1-0.conda"],
+    }
+    dev = {
+        "packages.conda": {
+            "a-1-0.conda": _record("a", "1"),
+            "a-2-0.conda": _record("a", "2", size=20),
+        },
+    }
+    for subdir in repodata.SUBDIRS:
+        for label, data in (("main", main), ("dev", dev)):
+            if subdir != "noarch":
+                data = {}
+            (tmp_path / f"{subdir}.{label}.json").write_text(json.dumps(data))
+    monkeypatch.setattr(repodata, "CACHE_DIR", tmp_path)
+    yield tmp_path
+
+
+def test_record_store(label_cache: Path, tmp_path: Path):
+    with RecordStore(tmp_path / "store" / "records.db") as store:
+        assert store.add_repodata(label_cache / "noarch.main.json")
+        assert store.add_repodata(label_cache / "noarch.dev.json")
+        assert not store.add_repodata(label_cache / "noarch.dev.json")
+        # a-1-0 is shared by both labels
+        assert len(store) == 4
+        assert store.manifests() == [("dev", "noarch"), ("main", "noarch")]
+        assert list(store.records("main", "noarch")) == [
+            ("a-1-0.conda", _record("a", "1")),
+            ("b-1-0.conda", _record("b", "1")),
+            ("c-1-0.conda", {}),
+        ]
+        assert [fn for fn, _ in store.records("main", "noarch", False)] == [
+            "a-1-0.conda",
+            "b-1-0.conda",
+        ]
+        assert store.aggregated(
+            ["artifacts", "unique_artifacts"], labels=("main", "dev")
+        ) == {"artifacts": 5, "unique_artifacts": 4}
+
+        # replacing a manifest leaves unreferenced records until pruned
+        (label_cache / "noarch.dev.json").write_text(json.dumps({}))
+        assert store.add_repodata(label_cache / "noarch.dev.json")
+        assert store.prune() == 1
+        assert len(store) == 3
+
+
+@pytest.mark.parametrize("include_broken", [True, False])
+def test_aggregated_with_store(label_cache: Path, tmp_path: Path, include_broken):
+    reports = ["artifacts", "names", "size"]
+    labels = ("main", "dev")
+    expected = repodata.aggregated(reports, labels, include_broken)  # type: ignore
+    with RecordStore(tmp_path / "records.db") as store:
+        result = repodata.aggregated(
+            reports,  # type: ignore
+            labels,
+            include_broken,
+            store=store,
+        )
+        # the cached repodata files are left alone
+        assert len(list(label_cache.glob("*.json"))) == 2 * len(repodata.SUBDIRS)
+    assert result == expected
+    assert list(result) == reports
+
+
+def test_aggregated_with_store_downloads(
+    fake_channel: FakeChannelServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    for subdir in repodata.SUBDIRS:
+        packages = {"a-1-0.conda": _record("a", "1")} if subdir == "noarch" else {}
+        fake_channel.add_repodata(packages, subdir=subdir, label="dev")
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(repodata, "CACHE_DIR", cache_dir)
+    with RecordStore(tmp_path / "records.db") as store:
+        result = repodata.aggregated(["artifacts"], ("dev",), store=store)
+        assert result == {"artifacts": 1}
+        # the downloads only live in the store, and are not fetched again
+        assert list(cache_dir.iterdir()) == []
+        fetched = len(fake_channel.requests)
+        assert repodata.aggregated(["artifacts"], ("dev",), store=store) == result
+        assert len(fake_channel.requests) == fetched
@@ -1,4 +1,7 @@
+import bz2
 import json
+import os
+import threading
 from pathlib import Path
 
 import pytest
@@ -6,6 +9,7 @@ import pytest
 from conda_forge_metadata import repodata
 
 
+@pytest.mark.network
 @pytest.mark.xfail(
     reason="See https://github.com/conda-forge/conda-forge-metadata/issues/97"
 )
@@ -17,8 +21,20 @@ def test_labels_anaconda_org(monkeypatch):  # type: ignore
     assert "broken" in labels
 
 
-@pytest.fixture
-def hsp2_dev_with_removed_cache(tmp_path: Path):
+@pytest.fixture(params=["recorded", pytest.param("live", marks=pytest.mark.network)])
+def hsp2_dev_with_removed_cache(request: pytest.FixtureRequest, tmp_path: Path):
+    if request.param == "recorded":
+        fake_channel = request.getfixturevalue("fake_channel")
+        recorded = Path(__file__).parent / "data" / "recorded" / "repodata"
+        noarch = json.loads((recorded / "hsp2_dev" / "noarch.json").read_text())
+        for subdir in repodata.SUBDIRS:
+            fake_channel.add_repodata(
+                {**noarch["packages"], **noarch["packages.conda"]}
+                if subdir == "noarch"
+                else {},
+                subdir=subdir,
+                label="hsp2_dev",
+            )
     repodata.fetch_repodata(label="hsp2_dev", force_download=True, cache_dir=tmp_path)
     noarch_json = tmp_path / "noarch.hsp2_dev.json"
     if noarch_json.is_file():
@@ -49,3 +65,220 @@ def test_aggregated(hsp2_dev_with_removed_cache: Path, monkeypatch: pytest.Monke
         include_broken=False,
     )
     assert result["artifacts"] == (result2["artifacts"] + 1)
+
+
+@pytest.fixture
+def local_repodata_cache(tmp_path: Path):
+    def record(name, version, build, depends=()):
+        return {
+            "name": name,
+            "version": version,
+            "build": build,
+            "depends": list(depends),
+            "size": 100,
+            "sha256": "00" * 32,
+        }
+
+    linux = {
+        "packages": {
+            "openssl-1.1.1w-hd590300_0.tar.bz2": record(
+                "openssl", "1.1.1w", "hd590300_0"
+            ),
+        },
+        "packages.conda": {
+            "openssl-3.3.1-h4ab18f5_0.conda": record("openssl", "3.3.1", "h4ab18f5_0"),
+            "curl-8.8.0-he654da7_0.conda": record(
+                "curl", "8.8.0", "he654da7_0", ["openssl >=3.3.0,<4.0a0"]
+            ),
+            "curl-7.88.1-h0_0.conda": record(
+                "curl", "7.88.1", "h0_0", ["openssl >=1.1.1t,<1.1.2a"]
+            ),
+            "python-3.12.4-h0_0_cpython.conda": record(
+                "python", "3.12.4", "h0_0_cpython", ["openssl >=3.3.1,<4.0a0"]
+            ),
+        },
+    }
+    noarch = {
+        "packages.conda": {
+            "requests-2.32.3-pyhd8ed1ab_0.conda": record(
+                "requests", "2.32.3", "pyhd8ed1ab_0", ["python >=3.8"]
+            ),
+        },
+    }
+    (tmp_path / "linux-64.main.json").write_text(json.dumps(linux))
+    (tmp_path / "noarch.main.json").write_text(json.dumps(noarch))
+    yield tmp_path
+
+
+def test_query(local_repodata_cache: Path):
+    def fns(**kwargs):
+        return sorted(
+            fn
+            for _, _, fn, _ in repodata.query(
+                subdirs=("linux-64", "noarch"),
+                cache_dir=local_repodata_cache,
+                **kwargs,
+            )
+        )
+
+    assert fns(name="openssl") == [
+        "openssl-1.1.1w-hd590300_0.tar.bz2",
+        "openssl-3.3.1-h4ab18f5_0.conda",
+    ]
+    assert fns(name="openssl", version_spec="3.*") == ["openssl-3.3.1-h4ab18f5_0.conda"]
+    assert fns(name="python", build="*_cpython") == ["python-3.12.4-h0_0_cpython.conda"]
+    assert fns(depends_on="openssl") == [
+        "curl-7.88.1-h0_0.conda",
+        "curl-8.8.0-he654da7_0.conda",
+        "python-3.12.4-h0_0_cpython.conda",
+    ]
+    assert fns(depends_on="openssl 3.3.0") == ["curl-8.8.0-he654da7_0.conda"]
+    assert fns(name="curl", depends_on="openssl 1.1.1w") == ["curl-7.88.1-h0_0.conda"]
+    assert fns(depends_on="python") == ["requests-2.32.3-pyhd8ed1ab_0.conda"]
+    assert len(fns()) == 6
+    assert fns(name="nope") == []
+
+    results = repodata.query(
+        name="requests", subdirs=("noarch",), cache_dir=local_repodata_cache
+    )
+    assert [r[:3] for r in results] == [
+        ("main", "noarch", "requests-2.32.3-pyhd8ed1ab_0.conda")
+    ]
+
+    # the subdirs may be a generator, used for every label
+    (local_repodata_cache / "noarch.dev.json").write_text(
+        (local_repodata_cache / "noarch.main.json").read_text()
+    )
+    results = repodata.query(
+        name="requests",
+        subdirs=(subdir for subdir in ["noarch"]),
+        labels=("main", "dev"),
+        cache_dir=local_repodata_cache,
+    )
+    assert sorted(r[0] for r in results) == ["dev", "main"]
+
+
+@pytest.fixture
+def local_channel(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    channel = tmp_path / "conda-forge"
+    for subdir, label in [("noarch", "main"), ("linux-64", "main"), ("noarch", "dev")]:
+        data = {"packages.conda": {f"{subdir}-{label}-1-0.conda": {"name": "x"}}}
+        if label == "main":
+            path = channel / subdir / "repodata.json.bz2"
+        else:
+            path = channel / "label" / label / subdir / "repodata.json.bz2"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bz2.compress(json.dumps(data).encode()))
+    monkeypatch.setenv("CONDA_FORGE_METADATA_CONDA_URL", tmp_path.as_uri())
+    yield channel
+
+
+def test_fetch_repodata_atomic(local_channel: Path, tmp_path: Path):
+    cache = tmp_path / "cache"
+    (path,) = repodata.fetch_repodata(subdirs=("noarch",), cache_dir=cache)
+    assert json.loads(path.read_text())["packages.conda"]
+    (local_channel / "noarch" / "repodata.json.bz2").write_bytes(b"BZh9 truncated")
+    with pytest.raises(Exception):
+        repodata.fetch_repodata(
+            subdirs=("noarch",), cache_dir=cache, force_download=True
+        )
+    # the previous file is left untouched and no temporary file remains
+    assert json.loads(path.read_text())["packages.conda"]
+    assert not list(cache.glob("*.part"))
+
+
+def test_mirror(local_channel: Path, tmp_path: Path):
+    cache = tmp_path / "cache"
+    kwargs = dict(subdirs=("noarch", "linux-64"), cache_dir=cache, jobs=2)
+    summary = repodata.mirror(labels=("main", "dev"), **kwargs)
+    # there is no linux-64 repodata for the dev label
+    assert summary["fetched"] == 3
+    assert summary["failed"] == 1
+    assert summary["bytes"] > 0
+    manifest = json.loads((cache / "mirror-manifest.json").read_text())
+    assert sorted(manifest) == [
+        "linux-64.main.json",
+        "noarch.dev.json",
+        "noarch.main.json",
+    ]
+
+    # completed files are not fetched again
+    summary = repodata.mirror(labels=("main", "dev"), **kwargs)
+    assert (summary["fetched"], summary["skipped"], summary["failed"]) == (0, 3, 1)
+    summary = repodata.mirror(labels=("main",), max_age=0, **kwargs)
+    assert (summary["fetched"], summary["skipped"]) == (2, 0)
+
+    assert (
+        repodata.main(
+            [
+                "mirror",
+                "--labels",
+                "dev",
+                "--subdirs",
+                "noarch",
+                "--cache-dir",
+                str(cache),
+                "--max-rate",
+                "10",
+            ]
+        )
+        == 0
+    )
+
+
+def test_default_cache_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    monkeypatch.setenv("CONDA_FORGE_METADATA_CACHE_DIR", str(tmp_path / "a"))
+    assert repodata._default_cache_dir() == tmp_path / "a"
+    monkeypatch.delenv("CONDA_FORGE_METADATA_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert repodata._default_cache_dir() == (
+        tmp_path / "xdg" / "conda-forge-metadata" / "repodata"
+    )
+
+
+def test_fetch_repodata_concurrent(
+    local_channel: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    downloads = []
+    download = repodata.download
+
+    def counting_download(*args, **kwargs):
+        downloads.append(args[0])
+        return download(*args, **kwargs)
+
+    monkeypatch.setattr(repodata, "download", counting_download)
+    monkeypatch.setattr(repodata, "CACHE_DIR", tmp_path / "cache")
+    barrier = threading.Barrier(4)
+
+    def fetch():
+        barrier.wait()
+        repodata.fetch_repodata(subdirs=("noarch",))
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(downloads) == 1
+    assert json.loads((tmp_path / "cache" / "noarch.main.json").read_text())
+
+
+def test_evict_cache(tmp_path: Path):
+    for i, label in enumerate(["main", "old", "newer", "newest"]):
+        for subdir in ("noarch", "linux-64"):
+            path = tmp_path / f"{subdir}.{label}.json"
+            path.write_text("x" * 100)
+            os.utime(path, (1000 + i, 1000 + i))
+    (tmp_path / "mirror-manifest.json").write_text("{}")
+
+    assert repodata.evict_cache(500, cache_dir=tmp_path) == ["old", "newer"]
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == [
+        "linux-64.main.json",
+        "linux-64.newest.json",
+        "mirror-manifest.json",
+        "noarch.main.json",
+        "noarch.newest.json",
+    ]
+    # main is kept even if the cache is still too large
+    assert repodata.evict_cache(0, cache_dir=tmp_path) == ["newest"]
+    assert len(list(tmp_path.glob("*.main.json"))) == 2
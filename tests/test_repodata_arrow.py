@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from conda_forge_metadata import repodata_arrow  # noqa: E402
+
+
+@pytest.fixture
+def repodata_cache(tmp_path: Path):
+    linux = {
+        "packages": {
+            "zlib-1.2.13-h0_0.tar.bz2": {
+                "name": "zlib",
+                "version": "1.2.13",
+                "build": "h0_0",
+                "build_number": 0,
+                "timestamp": 1_680_000_000,
+                "size": 100,
+                "sha256": "aa" * 32,
+                "depends": [],
+            },
+        },
+        "packages.conda": {
+            "curl-8.8.0-h0_1.conda": {
+                "name": "curl",
+                "version": "8.8.0",
+                "build": "h0_1",
+                "build_number": 1,
+                "timestamp": 1_717_000_000_000,
+                "size": 300,
+                "sha256": "bb" * 32,
+                "depends": ["zlib >=1.2.13,<2.0a0", "openssl"],
+            },
+        },
+        "removed": ["old-1-0.tar.bz2"],
+    }
+    noarch = {
+        "packages.conda": {
+            "requests-2.32.3-py_0.conda": {
+                "name": "requests",
+                "version": "2.32.3",
+                "build": "py_0",
+                "timestamp": 1_717_100_000_000,
+                "size": 50,
+                "depends": ["python"],
+            },
+        },
+    }
+    (tmp_path / "linux-64.main.json").write_text(json.dumps(linux))
+    (tmp_path / "noarch.main.json").write_text(json.dumps(noarch))
+    yield tmp_path
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export(repodata_cache: Path, tmp_path: Path, format):
+    dest = tmp_path / f"repodata.{format}"
+    n_rows = repodata_arrow.export(
+        dest,
+        subdirs=("linux-64", "noarch"),
+        cache_dir=repodata_cache,
+        format=format,
+        batch_size=2,
+    )
+    assert n_rows == 4
+    table = repodata_arrow.read_table(dest)
+    assert table.schema == repodata_arrow.repodata_schema()
+    rows = {row["fn"]: row for row in table.to_pylist()}
+    assert rows["curl-8.8.0-h0_1.conda"]["depends"] == [
+        "zlib >=1.2.13,<2.0a0",
+        "openssl",
+    ]
+    # timestamps in seconds are normalized to ms
+    assert rows["zlib-1.2.13-h0_0.tar.bz2"]["timestamp"].year == 2023
+    assert rows["old-1-0.tar.bz2"]["broken"]
+    assert rows["old-1-0.tar.bz2"]["name"] == "old"
+    assert rows["old-1-0.tar.bz2"]["size"] is None
+
+    assert not list(tmp_path.glob(".*.part"))
+
+
+def test_load_table(repodata_cache: Path):
+    table = repodata_arrow.load_table(
+        subdirs=("linux-64", "noarch"),
+        cache_dir=repodata_cache,
+        include_broken=False,
+    )
+    assert table.num_rows == 3
+    assert pa.compute.sum(table["size"]).as_py() == 450
+
+    # the subdirs may be a generator, used for every label
+    (repodata_cache / "noarch.dev.json").write_text(
+        (repodata_cache / "noarch.main.json").read_text()
+    )
+    table = repodata_arrow.load_table(
+        labels=("main", "dev"),
+        subdirs=(subdir for subdir in ["noarch"]),
+        cache_dir=repodata_cache,
+    )
+    assert sorted(table["label"].to_pylist()) == ["dev", "main"]
+
+
+def test_reports(repodata_cache: Path):
+    result = repodata_arrow.reports(
+        group_by=("subdir", "month"),
+        top_n=2,
+        subdirs=("linux-64", "noarch"),
+        cache_dir=repodata_cache,
+    )
+    assert result["total"].to_pylist() == [{"artifacts": 4, "names": 4, "size": 450}]
+    assert result["subdir"].to_pylist() == [
+        {"subdir": "linux-64", "artifacts": 3, "names": 3, "size": 400},
+        {"subdir": "noarch", "artifacts": 1, "names": 1, "size": 50},
+    ]
+    assert result["month"].to_pylist() == [
+        {"month": "2023-03", "artifacts": 1, "names": 1, "size": 100},
+        {"month": "2024-05", "artifacts": 2, "names": 2, "size": 350},
+        {"month": None, "artifacts": 1, "names": 1, "size": 0},
+    ]
+    assert result["top_packages"].to_pylist() == [
+        {"name": "curl", "artifacts": 1, "size": 300},
+        {"name": "zlib", "artifacts": 1, "size": 100},
+    ]
+
+    table = repodata_arrow.load_table(
+        subdirs=("linux-64", "noarch"), cache_dir=repodata_cache
+    )
+    result = repodata_arrow.reports(
+        group_by=(), top_n=0, table=table, include_broken=False
+    )
+    assert list(result) == ["total"]
+    assert result["total"].to_pylist() == [{"artifacts": 3, "names": 3, "size": 450}]
@@ -0,0 +1,87 @@
+import json
+import random
+
+import requests
+
+from conda_forge_metadata import repodata
+from conda_forge_metadata.artifact_info.info_json import get_artifact_info_as_json
+from conda_forge_metadata.conda_forge_bot import (
+    map_import_to_package,
+    map_pypi_to_conda,
+)
+from conda_forge_metadata.feedstock_outputs import package_to_feedstock
+from conda_forge_metadata.testing import FakeChannelServer
+
+
+def test_fake_channel_ranges(fake_channel: FakeChannelServer):
+    fake_channel.add_file("data.bin", bytes(range(100)))
+    url = f"{fake_channel.url}/data.bin"
+    r = requests.get(url, headers={"Range": "bytes=10-19"})
+    assert r.status_code == 206
+    assert r.content == bytes(range(10, 20))
+    assert r.headers["Content-Range"] == "bytes 10-19/100"
+    r = requests.get(url, headers={"Range": "bytes=-5"})
+    assert r.content == bytes(range(95, 100))
+    assert requests.get(url, headers={"Range": "bytes=200-"}).status_code == 416
+    etag = requests.head(url).headers["ETag"]
+    assert requests.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert requests.get(f"{fake_channel.url}/../etc/passwd").status_code == 404
+    assert [r.status for r in fake_channel.requests] == [206, 206, 416, 200, 304, 404]
+
+
+def test_fake_channel_repodata(fake_channel: FakeChannelServer, tmp_path):
+    fake_channel.add_repodata({"a-1-0.conda": {"name": "a"}}, subdir="noarch")
+    fake_channel.add_repodata({"b-1-0.tar.bz2": {"name": "b"}}, label="dev")
+    (main,) = repodata.fetch_repodata(subdirs=("noarch",), cache_dir=tmp_path)
+    (dev,) = repodata.fetch_repodata(
+        subdirs=("noarch",), cache_dir=tmp_path, label="dev"
+    )
+    assert list(json.loads(main.read_text())["packages.conda"]) == ["a-1-0.conda"]
+    assert list(json.loads(dev.read_text())["packages"]) == ["b-1-0.tar.bz2"]
+    assert repodata.all_labels(use_remote_cache=True) == ["dev", "main"]
+
+
+def test_fake_channel_streamed(fake_channel: FakeChannelServer):
+    files = {
+        "lib/python3/site-packages/a.so": random.Random(0).randbytes(100_000),
+        "a.pyc": b".",
+    }
+    fn, record = fake_channel.add_conda_package(
+        "a", version="2.0", build="py_1", files=files, about={"license": "MIT"}
+    )
+    assert fn == "a-2.0-py_1.conda"
+    assert record["build_number"] == 1
+    for build, build_number in [("py310h1", 0), ("py310h1_2", 2), ("3", 3)]:
+        _, other = fake_channel.add_conda_package("b", build=build)
+        assert other["build_number"] == build_number
+    data = get_artifact_info_as_json("conda-forge", "noarch", fn, backend="streamed")
+    assert data["name"] == "a"
+    assert data["version"] == "2.0"
+    assert data["about"] == {"license": "MIT"}
+    assert data["files"] == ["lib/python3/site-packages/a.so"]
+    # only the info component was transferred
+    assert any(r.status == 206 for r in fake_channel.requests)
+    transferred = sum(r.nbytes for r in fake_channel.requests)
+    assert transferred < record["size"]
+
+
+def test_fake_channel_feedstock_outputs(fake_channel: FakeChannelServer):
+    fake_channel.add_feedstock_outputs(
+        {"tk": ["tk"], "libpython": ["python"]}, autoreg={"llvmdev": ["libllvm*"]}
+    )
+    assert package_to_feedstock("tk") == ["tk"]
+    assert package_to_feedstock("libpython") == ["python"]
+    assert package_to_feedstock("libllvm29") == ["llvmdev"]
+
+
+def test_fake_channel_bot_data(fake_channel: FakeChannelServer):
+    fake_channel.add_bot_data(
+        import_to_pkg={"yaml": ["pyyaml", "ruamel.yaml"], "scipy": ["scipy"]},
+        pypi_mapping=[{"pypi_name": "PyYAML", "conda_name": "pyyaml"}],
+        ranked_hubs_authorities=["pyyaml", "ruamel.yaml"],
+    )
+    assert map_import_to_package("yaml.loader") == "pyyaml"
+    assert map_import_to_package("scipy") == "scipy"
+    assert map_import_to_package("scikit") == "scikit"
+    assert map_pypi_to_conda("PyYAML") == "pyyaml"
+    assert map_pypi_to_conda("Other") == "other"
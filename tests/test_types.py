@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from conda_forge_metadata.repodata import iter_artifact_keys
+from conda_forge_metadata.types import ArtifactKey, split_artifact_filename
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        (
+            "openssl-3.3.1-h4ab18f5_0.conda",
+            ("openssl", "3.3.1", "h4ab18f5_0", ".conda"),
+        ),
+        (
+            "ca-certificates-2024.7.4-hbcca054_0.tar.bz2",
+            ("ca-certificates", "2024.7.4", "hbcca054_0", ".tar.bz2"),
+        ),
+        ("removed-package-1-0", ("removed-package", "1", "0", "")),
+        ("weird", ("weird", "", "", "")),
+    ],
+)
+def test_split_artifact_filename(filename, expected):
+    assert split_artifact_filename(filename) == expected
+
+
+def test_artifact_key(tmp_path: Path):
+    key = ArtifactKey.parse("openssl-3.3.1-h4ab18f5_0.conda", "linux-64")
+    assert key == (
+        "conda-forge",
+        "main",
+        "linux-64",
+        "openssl",
+        "3.3.1",
+        "h4ab18f5_0",
+        ".conda",
+    )
+    assert key.stem == "openssl-3.3.1-h4ab18f5_0"
+    assert key.filename == "openssl-3.3.1-h4ab18f5_0.conda"
+    assert str(key) == "conda-forge/linux-64/openssl-3.3.1-h4ab18f5_0.conda"
+    assert len({key, ArtifactKey.parse(key.filename, "linux-64")}) == 1
+    dev = ArtifactKey.parse(key.filename, "linux-64", label="dev")
+    assert str(dev) == "conda-forge/label/dev/linux-64/openssl-3.3.1-h4ab18f5_0.conda"
+    assert dev != key
+
+    # the parts are never padded, so the filename is always rebuilt as is
+    for malformed in ("foo-1.0.conda", "weird.tar.bz2", "foo--0.conda"):
+        with pytest.raises(ValueError, match="name-version-build"):
+            ArtifactKey.parse(malformed, "noarch")
+
+    (tmp_path / "noarch.dev.json").write_text(
+        json.dumps(
+            {
+                "packages.conda": {"a-1-0.conda": {}},
+                "removed": ["b-2-1.tar.bz2", "malformed.conda"],
+            }
+        )
+    )
+    keys = list(iter_artifact_keys([tmp_path / "noarch.dev.json"]))
+    assert keys == [
+        ArtifactKey("conda-forge", "dev", "noarch", "a", "1", "0", ".conda"),
+        ArtifactKey("conda-forge", "dev", "noarch", "b", "2", "1", ".tar.bz2"),
+    ]